@@ -1,573 +1,173 @@
-from flask import Flask, render_template, redirect, url_for, request, flash, session,jsonify
-from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import Integer, String, func, desc
-from flask_socketio import SocketIO
-from flask_wtf import FlaskForm
-from wtforms import StringField, SubmitField
-from wtforms.validators import DataRequired
-from datetime import datetime, date
-from forms import BookingForm, Namakwa_Users, DriverSignupForm,TOWNS
-from booking import Booking
-from werkzeug.security import generate_password_hash, check_password_hash
+import os
+
+from flask import Flask
+from jinja2 import FileSystemBytecodeCache
+
+import fragment_cache
+import services
+from assets import Assets
+from config import load_config
+from database import tune_sqlite
+from extensions import db, socketio, response_cache, limiter
+from jobs import COMMANDS, create_test_data, start_assignment_scheduler, start_rollover_scheduler
+from metrics import Registry, instrument_app, socketio_timer
+from migrations import run_migrations
+import ratelimit
+from response_cache import make_backend
+from views import BLUEPRINTS
+
+
+# Rate limit rule per Socket.IO event (see config RATE_LIMITS); connect and
+# disconnect are never refused
+SOCKET_RATE_RULES = {
+    "private_message": "messages",
+    "reserve_seat": "booking",
+    "mark_read": "events",
+    "unread_count": "events",
+    "chat_history": "events",
+    "watch_routes": "events",
+    "subscribe_presence": "events",
+}
+
+
+# --------------------------
+# Application Factory
+# --------------------------
+def create_app(config=None):
+    """Build the app. The schema is not touched here; run `flask --app app migrate`."""
+    app = Flask(__name__)
+    load_config(app)
+    app.config.update(config or {})
+
+    db.init_app(app)
+    socketio.init_app(app, message_queue=app.config['SOCKETIO_MESSAGE_QUEUE'])
+    response_cache.backend = make_backend(app.config['RESPONSE_CACHE_URL'], app.config['RESPONSE_CACHE_SIZE'])
+    limiter.backend = ratelimit.make_backend(app.config['RATE_LIMIT_URL'])
+    services.init_app(app)
 
-
-# --------------------------
-# Initialize App & DB
-# --------------------------
-app = Flask(__name__)
-app.config['SECRET_KEY'] = '8BYkEfBA6O6donzWlSihBXox7C0sKR6b'
-app.config['SQLALCHEMY_DATABASE_URI'] = "sqlite:///namax.db"
-
-socketio = SocketIO(app)
-
-# Base model for SQLAlchemy
-class Base(DeclarativeBase):
-    pass
-
-db = SQLAlchemy(model_class=Base)
-db.init_app(app)
-
-
-# --------------------------
-# Database Models
-# --------------------------
-class Namakwaland(db.Model):
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    user_name: Mapped[str] = mapped_column(String(250), nullable=False)
-    pickup: Mapped[str] = mapped_column(Integer, nullable=True)
-    dropoff: Mapped[str] = mapped_column(String(500), nullable=False)
-    status: Mapped[str] = mapped_column(Integer, nullable=True)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow())
-
-
-class NamakwaUsers(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), unique=True, nullable=False)
-    password = db.Column(db.String(200), nullable=False)
-
-
-    def __repr__(self):
-        return f"<NamakwaUsers {self.name}>"
-
-
-class RiderBooking(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    user_name = db.Column(db.String(100))
-    pickup = db.Column(db.String(100))
-    dropoff = db.Column(db.String(100))
-    seats = db.Column(db.Integer)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
-    date = db.Column(db.Date, default=date.today)
-
-class Driver(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    user_name = db.Column(db.String(100), unique=True)
-    pickup = db.Column(db.String(100))
-    dropoff = db.Column(db.String(100))
-    seats = db.Column(db.Integer)
-    is_available = db.Column(db.Boolean, default=True)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
-
-class ChatMessage(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    sender = db.Column(db.String(100), nullable=False)
-    recipient = db.Column(db.String(100), nullable=False)
-    message = db.Column(db.Text, nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
-
-
-class Feedback(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    user_name = db.Column(db.String(100))
-    message = db.Column(db.Text, nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
-
-
-
-# Create all tables
-with app.app_context():
-    db.create_all()
-
-
-# --------------------------
-# Global Variables
-# --------------------------
-online_users = 0
-connected_users = {}  # Mapping of connected users to Socket.IO session IDs
-
-# --------------------------
-# Test Data Function
-# --------------------------
-def create_test_data():
-
-    # Create test users if they don't exist
-    if not NamakwaUsers.query.filter_by(name="Rider1").first():
-        rider = NamakwaUsers(name="Rider1", password=generate_password_hash("Pass123"))
-        driver = NamakwaUsers(name="Driver1", password=generate_password_hash("Pass123"))
-        db.session.add_all([rider, driver])
-        db.session.commit()
-
-    # Create a booking for Rider1 if it doesn't exist
-    if not Namakwaland.query.filter_by(user_name="Rider1", dropoff="Nababeep").first():
-        booking = Namakwaland(user_name="Rider1", pickup="Steinkopf", dropoff="Nababeep", status="Pending")
-        db.session.add(booking)
-        db.session.commit()
-
-
-# --------------------------
-# Routes: Home & Signup
-# --------------------------
-@app.route("/")
-def home():
-    return render_template("index.html")
-
-
-@app.route("/signup", methods=["GET", "POST"])
-def signup():
-    session["first_time"] = True
-    next_page = request.args.get('next')
-    if "user_id" in session:
-        return redirect(next_page or url_for("namax"))
-
-    user = Namakwa_Users()
-    if user.validate_on_submit():
-        new_name = user.name.data.strip()
-        password = user.password.data.strip()
-
-        # Validate password
-        if len(password) < 4:
-            flash("Wagwoord moet minstens 4 karakters wees.", "danger")
-            return redirect(url_for("signup"))
-
-        existing_user = NamakwaUsers.query.filter_by(name=new_name).first()
-
-        if existing_user:
-            if check_password_hash(existing_user.password, password):
-                session.permanent = True
-                session["user_id"] = existing_user.id
-                session["user_name"] = existing_user.name
-
-                session["show_intro"] = True   # <-- ADD THIS
-
-                flash(f"Awe, {existing_user.name}! Jy is klaar deel van Nama X Press 👋", "success")
-                return redirect(next_page or url_for("namax"))
-            else:
-                flash("Oeps! Verkeerde wagwoord. Probeer asseblief weer.", "danger")
-                return redirect(url_for("signup"))
-        else:
-            hashed_pw = generate_password_hash(password)
-            new_user = NamakwaUsers(name=new_name, password=hashed_pw)
-            db.session.add(new_user)
-            db.session.commit()
-
-            session.permanent = True
-            session["user_id"] = new_user.id
-            session["user_name"] = new_user.name
-
-            session["show_intro"] = True
-
-            flash(f"Welkom by Nama X Press, {new_name}! 🚀 Jy is suksesvol geregistreer.", "success")
-
-            return redirect(next_page or url_for("namax"))
-
-    return render_template("signup.html", user=user)
-
-
-@app.route("/clear_intro", methods=["POST"])
-def clear_intro():
-    session["show_intro"] = False
-    return "", 204
-
-
-@app.route("/logout")
-def logout():
-    session.clear()
-    return redirect(url_for("signup"))
-
-@app.route("/feedback", methods=["GET", "POST"])
-def feedback():
-    user_name = session.get("user_name", "Anonymous")
-
-    if request.method == "POST":
-        msg = request.form.get("message").strip()
-
-        if msg:
-            new_feedback = Feedback(user_name=user_name, message=msg)
-            db.session.add(new_feedback)
-            db.session.commit()
-            flash("Thanks for your feedback! 😊", "success")
-            return redirect(url_for("feedback"))
-
-        flash("Please write something first.", "danger")
-
-    feedback_list = Feedback.query.order_by(desc(Feedback.timestamp)).all()
-    return render_template("feedback.html", feedback_list=feedback_list)
-
-
-
-
-# --------------------------
-# Routes: Booking
-# --------------------------
-@app.route("/booking", methods=['GET', 'POST'])
-def namax():
-    form = BookingForm()
-    user_name = session.get("user_name")
-
-    if not user_name:
-        flash("Jy moet eers aanmeld om bestuurder te word.", "warning")
-        return redirect(url_for("signup", next=url_for('be_a_driver')))
-
-    user_bookings = Namakwaland.query.filter_by(user_name=user_name).order_by(desc(Namakwaland.timestamp)).all()
-    show_button = bool(user_bookings)
-
-    # Check if user already booked today
-    booking_today = Namakwaland.query.filter(
-        Namakwaland.user_name == user_name,
-        func.date(Namakwaland.timestamp) == date.today()
-    ).first()
-
-    if booking_today:
-        flash("Jy het reeds vandag ’n rit bespreek.", "warning")
-        formatted_time = booking_today.timestamp.strftime("%H:%M:%S")
-        return render_template(
-            "booking.html",
-            form=form,
-            tyd=formatted_time,
-            information=[booking_today],
-            show_button=True,
-            form_submitted=True,
-            user_name=user_name
+    with app.app_context():
+        binds = dict(db.engines)
+    engines = list(binds.values())
+    for engine in engines:
+        tune_sqlite(
+            engine,
+            busy_timeout_ms=app.config['SQLITE_BUSY_TIMEOUT_MS'],
+            synchronous=app.config['SQLITE_SYNCHRONOUS'],
+            mmap_size=app.config['SQLITE_MMAP_SIZE']
         )
 
-    # Handle new booking
-    if form.validate_on_submit():
-        pickup = form.pickup.data
-        dropoff = form.dropoff.data
+    init_metrics(app, {bind or "primary": engine for bind, engine in binds.items()})
+    socketio.use(limiter.socketio_middleware(socketio, SOCKET_RATE_RULES), name="ratelimit")
+    socketio.use(data_versions_middleware, name="data_versions")
+    app.before_request(poll_data_versions)
+    init_templates(app)
+    Assets(app)
 
-        if pickup == dropoff:
-            flash("Pickup en Drop-off kan nie dieselfde wees nie!", "danger")
-            return render_template(
-                "booking.html",
-                form=form,
-                tyd=None,
-                information=[],
-                show_button=show_button,
-                form_submitted=False,
-                user_name=user_name
-            )
+    for blueprint in BLUEPRINTS:
+        app.register_blueprint(blueprint)
+    for command in COMMANDS:
+        app.cli.add_command(command)
 
-        new_booking = Namakwaland(user_name=user_name, pickup=pickup, dropoff=dropoff, status="Pending")
-        db.session.add(new_booking)
-        db.session.commit()
+    global _forked_app
+    _forked_app = app
+    return app
 
-        flash("Booking successful!", "success")
-        user_bookings = Namakwaland.query.filter_by(user_name=user_name).order_by(desc(Namakwaland.timestamp)).all()
-        show_button = bool(user_bookings)
-
-        formatted_time = new_booking.timestamp.strftime("%H:%M:%S")
-        return render_template(
-            "booking.html",
-            form=form,
-            tyd=formatted_time,
-            information=[new_booking],
-            show_button=show_button,
-            form_submitted=True,
-            user_name=user_name
-        )
-
-    return render_template(
-        "booking.html",
-        form=form,
-        tyd=None,
-        information=[],
-        show_button=show_button,
-        form_submitted=False,
-        user_name=user_name
-    )
-
-
-# --------------------------
-# Routes: Driver Signup & Info
-# --------------------------
-@app.route("/be_a_driver", methods=["GET", "POST"])
-def be_a_driver():
-    if "user_name" not in session:
-        flash("Jy moet eers aanmeld om 'n bestuurder te word.", "danger")
-        return redirect(url_for("signup"))
 
-    user_name = session["user_name"]
-    form = DriverSignupForm()
-    driver = Driver.query.filter_by(user_name=user_name).first()
-    show_riders_button = bool(driver)
+# The process-wide objects (services, caches, limiter) belong to the app
+# built last; that is the one a forked worker rebuilds them for
+_forked_app = None
 
-    bookings = Namakwaland.query.order_by(desc(Namakwaland.timestamp)).all()
-
-    def normalize_list(main_val, extras):
-        """Return deduped list with main_val first, max length 5."""
-        vals = []
-        if main_val and str(main_val).strip():
-            vals.append(str(main_val).strip())
-        for v in extras:
-            if v and str(v).strip() and str(v).strip() not in vals:
-                vals.append(str(v).strip())
-        return vals[:5]
-
-    if request.method == "POST":
-        main_pickup = request.form.get("pickup") or (form.pickup.data if form.pickup.data else "")
-        main_dropoff = request.form.get("dropoff") or (form.dropoff.data if form.dropoff.data else "")
-        extra_pickups = request.form.getlist("pickup[]")
-        extra_dropoffs = request.form.getlist("dropoff[]")
-
-        pickups_list = normalize_list(main_pickup, extra_pickups)
-        dropoffs_list = normalize_list(main_dropoff, extra_dropoffs)
-
-        try:
-            seats_val = int(request.form.get("seats") or (form.seats.data if form.seats.data else 0))
-        except Exception:
-            seats_val = 0
-
-        if not pickups_list or not dropoffs_list:
-            flash("Kies asseblief ten minste een afhaal- en een aflaai-plek.", "danger")
-            return render_template(
-                "be_a_driver.html",
-                user_name=user_name,
-                form=form,
-                driver=driver,
-                show_riders_button=show_riders_button,
-                bookings=bookings,
-                TOWNS=TOWNS
-            )
-
-        pickups_csv = ",".join(pickups_list)
-        dropoffs_csv = ",".join(dropoffs_list)
-
-        if driver:
-            driver.pickup = pickups_csv
-            driver.dropoff = dropoffs_csv
-            driver.seats = seats_val
-            driver.is_available = True
-            driver.timestamp = datetime.utcnow()
-        else:
-            driver = Driver(
-                user_name=user_name,
-                pickup=pickups_csv,
-                dropoff=dropoffs_csv,
-                seats=seats_val,
-                is_available=True
-            )
-            db.session.add(driver)
-
-        db.session.commit()
-        flash("Jy is nou beskikbaar as bestuurder!", "success")
-        return redirect(url_for("be_a_driver"))
-
-    return render_template(
-        "be_a_driver.html",
-        user_name=user_name,
-        form=form,
-        driver=driver,
-        show_riders_button=show_riders_button,
-        bookings=bookings,
-        TOWNS=TOWNS
-    )
-
-
-@app.route("/my_driver_bookings")
-def my_driver_bookings():
-    user_name = session.get("user_name")
-    if not user_name:
-        flash("Jy moet eers aanmeld om jou bestuurder besprekings te sien.", "danger")
-        return redirect(url_for("signup"))
-
-    # Fetch driver booking from database for the logged-in user
-    driver = Driver.query.filter_by(user_name=user_name).first()
-
-    return render_template(
-        "my_driver_bookings.html",
-        driver=driver,  # pass driver directly
-        user_name=user_name
-    )
-
-
-@app.route("/delete_driver_booking/<int:booking_id>", methods=["POST"])
-def delete_driver_booking(booking_id):
-    user_name = session.get("user_name")
-    if not user_name:
-        flash("Jy moet eers aanmeld.", "danger")
-        return redirect(url_for("signup"))
-
-    driver = Driver.query.get_or_404(booking_id)
-    if driver.user_name != user_name:
-        flash("Jy kan net jou eie besprekings verwyder.", "danger")
-        return redirect(url_for("my_driver_bookings"))
-
-    db.session.delete(driver)
-    db.session.commit()
-    flash("Driver booking deleted successfully.", "success")
-    return redirect(url_for("my_driver_bookings"))
-
-
-# --------------------------
-# Routes: View Riders & Drivers
-# --------------------------
-@app.route("/riders_today")
-def riders_today():
-    pickup = request.args.get("pickup")
-    dropoff = request.args.get("dropoff")
-
-    if not pickup or not dropoff:
-        flash("Geen ritinligting beskikbaar nie.", "warning")
-        return redirect(url_for("be_a_driver"))
-
-    # Correct query using func.date
-    riders = Namakwaland.query.filter(
-        Namakwaland.pickup == pickup,
-        Namakwaland.dropoff == dropoff,
-        func.date(Namakwaland.timestamp) == date.today()
-    ).all()
-
-    return render_template("riders_today.html", riders=riders, pickup=pickup, dropoff=dropoff)
 
+def after_fork():
+    """A forked worker must not reuse the parent's pooled connections, SQLite handles or threads."""
+    app = _forked_app
+    if app is None:
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    response_cache.backend = make_backend(app.config['RESPONSE_CACHE_URL'], app.config['RESPONSE_CACHE_SIZE'])
+    limiter.backend = ratelimit.make_backend(app.config['RATE_LIMIT_URL'])
+    services.reopen(app)
 
-@app.route("/drivers_today")
-def drivers_today():
-    user_name = session.get("user_name")
-    if not user_name:
-        flash("Jy moet eers aanmeld om bestuurders te sien.", "danger")
-        return redirect(url_for("signup"))
 
-    # Fetch all drivers available today (exclude current user)
-    drivers = Driver.query.filter(
-        Driver.is_available == True,
-        Driver.user_name != user_name,
-        func.date(Driver.timestamp) == date.today()
-    ).all()
+os.register_at_fork(after_in_child=after_fork)
 
-    if not drivers:
-        flash("Geen bestuurders beskikbaar vandag nie.", "info")
 
-    return render_template("drivers_today.html", drivers=drivers, user_name=user_name)
+def poll_data_versions():
+    """Pick up writes made by other processes (see data_version.py)."""
+    services.data_versions.poll(db.engine)
 
-# --------------------------
-# Routes: My Bookings
-# --------------------------
-@app.route("/my_bookings")
-def my_bookings():
-    user_name = request.args.get('user_name') or session.get("user_name")
-    if not user_name:
-        flash("Jy moet eers aanmeld om jou besprekings te sien.", "danger")
-        return redirect(url_for("signup"))
 
-    user_bookings = Namakwaland.query.filter_by(user_name=user_name).order_by(desc(Namakwaland.timestamp)).all()
-    return render_template("my_bookings.html", show_drivers_button=True, bookings=user_bookings, user_name=user_name)
+def data_versions_middleware(event, handler, *args):
+    poll_data_versions()
+    return handler(*args)
 
 
-@app.route("/delete_booking/<int:booking_id>", methods=["POST"])
-def delete_booking(booking_id):
-    booking = Namakwaland.query.get(booking_id)
-    if booking:
-        db.session.delete(booking)
-        db.session.commit()
-        flash("Booking deleted successfully!", "success")
-    else:
-        flash("Booking not found.", "danger")
-    return redirect(url_for("my_bookings", user_name=session.get("user_name")))
+def init_templates(app):
+    """Bytecode cache for compiled templates and the ``{% cache %}`` fragment tag."""
+    if app.config['JINJA_BYTECODE_CACHE']:
+        os.makedirs(app.config['JINJA_BYTECODE_CACHE'], exist_ok=True)
+        app.jinja_options = {
+            **app.jinja_options, "bytecode_cache": FileSystemBytecodeCache(app.config['JINJA_BYTECODE_CACHE'])
+        }
+    fragment_cache.init_app(app, versions=lambda scope: response_cache.backend.version(scope))
 
 
 # --------------------------
-# Socket.IO: Real-time Users & Messaging
+# Metrics
 # --------------------------
-@socketio.on("connect")
-def handle_connect():
-    global online_users
-    online_users += 1
-    session_name = session.get("user_name")
-    if session_name:
-        connected_users[session_name] = request.sid
-    socketio.emit("update_users", {"count": online_users}, to=None)
-
-
-@socketio.on("disconnect")
-def handle_disconnect():
-    global online_users
-    online_users -= 1 if online_users > 0 else 0
-    session_name = session.get("user_name")
-    if session_name and session_name in connected_users:
-        connected_users.pop(session_name)
-    socketio.emit("update_users", {"count": online_users}, to=None)
-
-
-@socketio.on("private_message")
-def handle_private_message(data):
-    sender = session.get("user_name")
-    recipient = data.get("to")
-    message = data.get("message")
-
-    if not sender or not recipient or not message:
-        return
-
-    # Save message in database
-    chat_message = ChatMessage(sender=sender, recipient=recipient, message=message)
-    db.session.add(chat_message)
-    db.session.commit()
-
-    # Emit message to recipient if online
-    if recipient in connected_users:
-        socketio.emit("private_message", {
-            "from": sender,
-            "message": message,
-            "id": chat_message.id
-        }, to=connected_users[recipient])
-
-    # Emit message back to sender so it appears instantly
-    socketio.emit("private_message", {
-        "from": sender,
-        "message": message,
-        "id": chat_message.id
-    }, to=request.sid)
-
-@app.route("/chat/<driver_name>/<rider_name>")
-def chat(driver_name, rider_name):
-    user_name = session.get("user_name")
-    if not user_name:
-        flash("Jy moet eers aanmeld om te kan gesels.", "danger")
-        return redirect(url_for("signup"))
-
-    # Fetch all messages between the driver and rider
-    messages = ChatMessage.query.filter(
-        ((ChatMessage.sender == driver_name) & (ChatMessage.recipient == rider_name)) |
-        ((ChatMessage.sender == rider_name) & (ChatMessage.recipient == driver_name))
-    ).order_by(ChatMessage.timestamp).all()
-
-    return render_template(
-        "chat.html",
-        messages=messages,
-        user_name=user_name,
-        chatting_with=driver_name if user_name == rider_name else rider_name
+def init_metrics(app, engines):
+    metrics = app.extensions["metrics"] = Registry()
+    instrument_app(
+        app, engines, metrics,
+        n_plus_one=app.config['N_PLUS_ONE_THRESHOLD'],
+        timing_header=app.config['METRICS_TIMING_HEADER']
     )
-
-@app.route("/delete_message/<int:msg_id>", methods=["POST"])
-def delete_message(msg_id):
-    message = ChatMessage.query.get(msg_id)
-    current_user = session.get("user_name")
-
-    if message and message.sender == current_user:
-        db.session.delete(message)
-        db.session.commit()
-        flash("Message deleted!", "success")
-    else:
-        flash("You can only delete your own messages.", "danger")
-    return redirect(request.referrer or url_for("home"))
-
+    socketio.use(socketio_timer(metrics), name="metrics")
+
+    metrics.gauge("namax_socketio_connected_clients", "Connected Socket.IO clients.",
+                  lambda: services.presence.count())
+    metrics.gauge("namax_password_hash_in_flight", "Password hashes running or queued.",
+                  lambda: services.password_hasher.in_flight)
+    metrics.counter_from("namax_password_hash_rejected_total", "Logins shed because the hash queue was full.",
+                         lambda: services.password_hasher.rejected)
+    metrics.counter_from("namax_password_rehashed_total", "Stored hashes upgraded on login.",
+                         lambda: services.password_hasher.rehashed)
+    metrics.counter_from("namax_response_cache_total", "Page cache lookups by result.",
+                         lambda: {("hit",): response_cache.hits, ("miss",): response_cache.misses,
+                                  ("not_modified",): response_cache.not_modified},
+                         labels=("result",))
+    metrics.counter_from("namax_user_state_cache_total", "Per-user state cache lookups by result.",
+                         lambda: {("hit",): services.user_state.cache.hits,
+                                  ("miss",): services.user_state.cache.misses},
+                         labels=("result",))
+    metrics.counter_from("namax_rate_limited_total", "Requests and events shed by the rate limiter, by rule.",
+                         lambda: {(rule,): count for rule, count in limiter.dropped.items()},
+                         labels=("rule",))
+    if app.config['CHAT_WRITE_BEHIND']:
+        metrics.counter_from("namax_chat_messages_written_total",
+                             "Chat messages persisted by the write-behind queue.",
+                             lambda: services.chat_writer.written)
+        metrics.counter_from("namax_chat_messages_dropped_total",
+                             "Chat messages the write-behind queue gave up on.",
+                             lambda: services.chat_writer.dropped)
+
+    @app.route("/metrics")
+    def metrics_endpoint():
+        return metrics.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
 
 
 # --------------------------
 # Run App
 # --------------------------
 if __name__ == "__main__":
+    app = create_app()
     with app.app_context():
-        db.create_all()
+        run_migrations(db)
         create_test_data()
-    socketio.run(app, host="0.0.0.0", port=8000, debug=True, allow_unsafe_werkzeug=True)
\ No newline at end of file
+    if app.config['ASSIGN_INTERVAL']:
+        start_assignment_scheduler(app, app.config['ASSIGN_INTERVAL'])
+    if app.config['ROLLOVER_DAILY']:
+        start_rollover_scheduler(app)
+    socketio.run(app, host="0.0.0.0", port=8000, debug=True, allow_unsafe_werkzeug=True)
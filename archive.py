@@ -0,0 +1,74 @@
+"""Daily rollover of past rows from the hot tables into archive tables.
+
+Each archive table (``<name>_archive``) has the hot table's columns plus a
+surrogate ``archive_id`` key and the day the row was archived. The
+original ``id`` is kept. The hot tables are AUTOINCREMENT, so an id is
+never handed out again once its row was archived; it repeats only in
+``driver_archive``, which holds one snapshot of a listing per day.
+
+``move_rows`` copies and deletes in batches, each batch in one
+transaction, so a crash never loses or duplicates a row and writers are
+only blocked for one batch at a time. ``snapshot_rows`` copies rows that
+stay in the hot table (a driver's listing) and resets them.
+"""
+from datetime import date
+
+from sqlalchemy import Column, Date, Index, Integer, Table, literal, select
+
+
+def archive_table(table, metadata, indexes=()):
+    """Declare ``<table>_archive`` with the same columns and the given indexes."""
+    archive = Table(
+        f"{table.name}_archive", metadata,
+        Column("archive_id", Integer, primary_key=True),
+        Column("archived_on", Date, nullable=False, default=date.today),
+        *[Column(c.name, c.type) for c in table.columns]
+    )
+    for columns in indexes:
+        Index(f"ix_{archive.name}_{'_'.join(columns)}", *[archive.c[name] for name in columns])
+    return archive
+
+
+def _copy(hot, archive, condition):
+    columns = [c.name for c in hot.columns]
+    return archive.insert().from_select(
+        columns + ["archived_on"],
+        select(*hot.c, literal(date.today(), Date)).where(condition)
+    )
+
+
+def move_rows(engine, hot, archive, condition, batch_size=1000):
+    """Move rows of ``hot`` matching ``condition`` into ``archive``; returns how many."""
+    moved = 0
+    while True:
+        with engine.begin() as conn:
+            ids = conn.execute(
+                select(hot.c.id).where(condition).order_by(hot.c.id).limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                return moved
+            conn.execute(_copy(hot, archive, hot.c.id.in_(ids)))
+            conn.execute(hot.delete().where(hot.c.id.in_(ids)))
+        moved += len(ids)
+
+
+def snapshot_rows(engine, hot, archive, condition, **reset):
+    """Copy matching rows into ``archive`` and apply ``reset`` to them; returns how many."""
+    with engine.begin() as conn:
+        copied = conn.execute(_copy(hot, archive, condition)).rowcount
+        conn.execute(hot.update().where(condition).values(**reset))
+    return copied
+
+
+def read_archive(session, archive, condition, order_by, limit):
+    """Up to ``limit`` archived rows (all with None) for a history view, to follow its hot rows.
+
+    Archived rows carry ``archived = True`` so templates can tell them
+    apart (their ``id`` may no longer identify a hot row).
+    """
+    if limit is not None and limit <= 0:
+        return []
+    query = select(archive, literal(True).label("archived"))
+    if condition is not None:
+        query = query.where(condition)
+    return session.execute(query.order_by(*order_by).limit(limit)).all()
@@ -0,0 +1,144 @@
+"""Fingerprinted, precompressed static assets.
+
+``build`` copies every file in ``static/`` to ``static/dist/`` under a
+content-hashed name (``css/style.3f2a9c1e0b.css``), writes ``.gz`` (and
+``.br`` when the ``brotli`` package is installed) next to text assets,
+and records the mapping in ``static/dist/assets.json``.
+
+At runtime ``Assets`` rewrites ``url_for('static', filename=...)`` to
+the hashed name when one exists, so templates need no changes. Hashed
+files never change, so they are served with a year-long immutable
+Cache-Control and the best precompressed variant the client accepts.
+Byte ranges (video seeking) come from werkzeug's ``send_file``, which
+answers ``Range`` requests with 206 straight from the file.
+
+The service worker is rendered from ``templates/service-worker.js``: its
+cache name is the build's digest, so a new build replaces the old cache.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from flask import current_app, render_template, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+DIST = "dist"
+MANIFEST = "assets.json"
+COMPRESSIBLE = {".css", ".js", ".json", ".svg", ".html", ".txt", ".map", ".webmanifest"}
+PRECACHE = COMPRESSIBLE | {".png", ".jpg", ".ico", ".webp"}  # not the videos
+SKIP = {"service-worker.js"}
+ONE_YEAR = 365 * 24 * 3600
+
+
+def fingerprint(path, digest):
+    root, ext = os.path.splitext(path)
+    return f"{root}.{digest}{ext}"
+
+
+def _compress(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path + ".gz", "wb") as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + ".br", "wb") as f:
+            f.write(brotli.compress(data, quality=11))
+
+
+def build(static_folder):
+    """Fingerprint and precompress ``static_folder``; returns the manifest."""
+    dist = os.path.join(static_folder, DIST)
+    shutil.rmtree(dist, ignore_errors=True)
+    files = {}
+    for root, dirs, names in os.walk(static_folder):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != dist)
+        for name in sorted(names):
+            source = os.path.join(root, name)
+            logical = os.path.relpath(source, static_folder).replace(os.sep, "/")
+            if logical in SKIP:
+                continue
+            with open(source, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()[:10]
+            hashed = fingerprint(logical, digest)
+            target = os.path.join(dist, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(source, target)
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE:
+                _compress(target)
+            files[logical] = f"{DIST}/{hashed}"
+
+    version = hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest()[:10]
+    manifest = {"version": version, "files": files}
+    with open(os.path.join(dist, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class Assets:
+    def __init__(self, app=None):
+        self.version = "dev"
+        self.files = {}
+        self.hashed = set()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.load(app.static_folder)
+        app.extensions["assets"] = self
+        app.url_defaults(self._url_defaults)
+        app.view_functions["static"] = self.send_static
+        app.add_url_rule("/service-worker.js", "service_worker", self.service_worker)
+
+    def load(self, static_folder):
+        """Read the build manifest; without one, assets are served as-is."""
+        try:
+            with open(os.path.join(static_folder, DIST, MANIFEST)) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return
+        self.version = manifest["version"]
+        self.files = manifest["files"]
+        self.hashed = set(self.files.values())
+
+    def _url_defaults(self, endpoint, values):
+        if endpoint == "static":
+            filename = values.get("filename")
+            values["filename"] = self.files.get(filename, filename)
+
+    def send_static(self, filename):
+        folder = current_app.static_folder
+        if filename not in self.hashed:
+            return send_from_directory(folder, filename)
+
+        accepted = request.accept_encodings
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if accepted[encoding] and os.path.isfile(os.path.join(folder, filename + suffix)):
+                response = send_from_directory(
+                    folder, filename + suffix, max_age=ONE_YEAR,
+                    mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream"
+                )
+                response.headers["Content-Encoding"] = encoding
+                break
+        else:
+            response = send_from_directory(folder, filename, max_age=ONE_YEAR)
+        response.vary.add("Accept-Encoding")
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    def service_worker(self):
+        precache = [
+            f"/static/{hashed}" for logical, hashed in sorted(self.files.items())
+            if os.path.splitext(logical)[1].lower() in PRECACHE
+        ]
+        body = render_template("service-worker.js", version=self.version, precache=precache)
+        response = current_app.response_class(body, mimetype="application/javascript")
+        response.cache_control.no_cache = True
+        return response
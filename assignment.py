@@ -0,0 +1,61 @@
+"""Seat-constrained batch assignment of pending bookings to drivers.
+
+Bookings are grouped by (pickup, dropoff); there are at most a few
+hundred such routes however many bookings there are, so the detour of
+every driver for every route is one ``TownMatrix.detours`` call per
+route. Routes with the fewest feasible drivers are filled first (so
+scarce seats go where nothing else can serve), each from its cheapest
+drivers, and bookings within a route are served first come, first
+served. This is a greedy approximation, not an exact optimum.
+"""
+from collections import defaultdict, namedtuple
+
+import numpy as np
+
+
+Assignment = namedtuple("Assignment", "booking_id driver_id detour_km")
+
+
+def assign(bookings, drivers, matrix, max_detour_km):
+    """Assign ``bookings`` (in priority order) to ``drivers``.
+
+    ``drivers`` need ``id``, ``pickup``, ``dropoff`` and ``free_seats``.
+    Returns ``(assignments, seats_used)`` where ``seats_used`` maps
+    driver id to the number of seats this run filled.
+    """
+    drivers = [d for d in drivers if d.free_seats > 0]
+    if not bookings or not drivers:
+        return [], {}
+
+    queues = defaultdict(list)
+    for booking in bookings:
+        queues[(booking.pickup, booking.dropoff)].append(booking.id)
+    routes = list(queues)
+
+    route = matrix.route_array(drivers)
+    costs = np.vstack([matrix.detours(drivers, pickup, dropoff, route) for pickup, dropoff in routes])
+    feasible = costs <= max_detour_km
+    free = np.array([d.free_seats for d in drivers])
+
+    assignments = []
+    for r in np.argsort(feasible.sum(axis=1), kind="stable"):
+        waiting = queues[routes[r]]
+        if not feasible[r].any():
+            continue
+        order = np.argsort(costs[r], kind="stable")
+        order = order[feasible[r, order] & (free[order] > 0)]
+        taken = 0
+        for d in order.tolist():
+            if taken == len(waiting):
+                break
+            seats = min(int(free[d]), len(waiting) - taken)
+            free[d] -= seats
+            for booking_id in waiting[taken:taken + seats]:
+                assignments.append(Assignment(booking_id, drivers[d].id, float(costs[r, d])))
+            taken += seats
+
+    seats_used = {
+        drivers[i].id: int(drivers[i].free_seats - free[i])
+        for i in np.nonzero(free != np.array([d.free_seats for d in drivers]))[0]
+    }
+    return assignments, seats_used
@@ -0,0 +1,59 @@
+"""Batch assignment of a full day's synthetic demand over TOWNS.
+
+    python benchmarks/assignment.py --bookings 30000 --drivers 3000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from assignment import assign  # noqa: E402
+from forms import TOWNS  # noqa: E402
+from geo import TownMatrix  # noqa: E402
+
+Booking = namedtuple("Booking", "id pickup dropoff")
+DriverSeats = namedtuple("DriverSeats", "id pickup dropoff free_seats")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=30000)
+    parser.add_argument("--drivers", type=int, default=3000)
+    parser.add_argument("--max-detour-km", type=float, default=40)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    bookings = [Booking(i, *rng.sample(TOWNS, 2)) for i in range(args.bookings)]
+    drivers = [
+        DriverSeats(
+            i,
+            ",".join(rng.sample(TOWNS, rng.randint(1, 5))),
+            ",".join(rng.sample(TOWNS, rng.randint(1, 5))),
+            rng.randint(1, 6),
+        )
+        for i in range(args.drivers)
+    ]
+    matrix = TownMatrix.build()
+
+    start = time.perf_counter()
+    assignments, seats_used = assign(bookings, drivers, matrix, args.max_detour_km)
+    elapsed = time.perf_counter() - start
+
+    capacity = sum(d.free_seats for d in drivers)
+    used = sum(seats_used.values())
+    assert used == len(assignments)
+    assert all(seats_used[d.id] <= d.free_seats for d in drivers if d.id in seats_used)
+    assert len({a.booking_id for a in assignments}) == len(assignments)
+
+    print(f"{args.bookings:,} bookings, {args.drivers:,} drivers ({capacity:,} seats)")
+    print(f"  assigned:     {len(assignments):,} ({used / capacity:.0%} of seats)")
+    if assignments:
+        print(f"  mean detour:  {sum(a.detour_km for a in assignments) / len(assignments):.1f} km")
+    print(f"  time:         {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Chat message write throughput: one commit per message vs write-behind batches.
+
+Writes the same number of messages into a throwaway SQLite file twice.
+The first run mirrors the synchronous path in handle_private_message,
+one INSERT and COMMIT per message. The second run submits to ChatWriter
+and waits for the final flush.
+
+    python benchmarks/chat_writes.py --messages 5000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, MetaData, Table, Column, Integer, String, Text, DateTime
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from chat_writer import ChatWriter, IdAllocator  # noqa: E402
+
+
+def make_tables():
+    metadata = MetaData()
+    chat = Table(
+        "chat_message", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("sender", String(100), nullable=False),
+        Column("recipient", String(100), nullable=False),
+        Column("message", Text, nullable=False),
+        Column("timestamp", DateTime),
+    )
+    blocks = Table(
+        "id_block", metadata,
+        Column("name", String(50), primary_key=True),
+        Column("next_id", Integer, nullable=False),
+    )
+    return metadata, chat, blocks
+
+
+def fresh_engine():
+    path = os.path.join(tempfile.mkdtemp(), "chat.db")
+    engine = create_engine(f"sqlite:///{path}")
+    metadata, chat, blocks = make_tables()
+    metadata.create_all(engine)
+    return engine, chat, blocks
+
+
+def run_sync(n):
+    engine, chat, _ = fresh_engine()
+    start = time.perf_counter()
+    with Session(engine) as session:
+        for i in range(n):
+            session.execute(chat.insert().values(sender="Rider1", recipient="Driver1", message=f"msg {i}"))
+            session.commit()
+    return time.perf_counter() - start
+
+
+def run_batched(n, batch_size, flush_interval):
+    engine, chat, blocks = fresh_engine()
+    writer = ChatWriter(engine, chat, IdAllocator(engine, blocks, chat),
+                        batch_size=batch_size, flush_interval=flush_interval)
+    start = time.perf_counter()
+    for i in range(n):
+        writer.submit("Rider1", "Driver1", f"msg {i}")
+    emitted = time.perf_counter() - start
+    writer.close()
+    elapsed = time.perf_counter() - start
+    with engine.connect() as conn:
+        assert len(conn.execute(chat.select()).all()) == n
+    return emitted, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--flush-interval", type=float, default=0.05)
+    args = parser.parse_args()
+
+    n = args.messages
+    sync_s = run_sync(n)
+    emitted_s, batched_s = run_batched(n, args.batch_size, args.flush_interval)
+
+    print(f"{n:,} messages")
+    print(f"  sync (commit per message): {n / sync_s:10,.0f} msg/s  ({sync_s:.2f} s)")
+    print(f"  write-behind, durable:     {n / batched_s:10,.0f} msg/s  ({batched_s:.2f} s)")
+    print(f"  write-behind, ready to emit: {n / emitted_s:8,.0f} msg/s  ({emitted_s:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Chat latency on an eventlet worker while a burst of logins is verified.
+
+A "chat" green thread wakes every ``--tick`` ms, the way a Socket.IO
+handler would be scheduled, and records how late it ran. Meanwhile
+``--logins`` green threads verify passwords, first inline (as signup
+used to) and then through ``PasswordHasher``.
+
+    python benchmarks/login_storm.py --logins 100 --concurrency 50
+"""
+import eventlet
+eventlet.monkey_patch()
+
+import argparse  # noqa: E402
+import os  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+
+from werkzeug.security import check_password_hash, generate_password_hash  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from passwords import PasswordHasher, HashQueueFull  # noqa: E402
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def storm(verify, logins, concurrency, tick):
+    lateness = []
+    done = []
+
+    def chat():
+        while not done:
+            scheduled = time.perf_counter() + tick
+            eventlet.sleep(tick)
+            lateness.append((time.perf_counter() - scheduled) * 1000)
+
+    def login(_):
+        try:
+            verify()
+            return True
+        except HashQueueFull:
+            return False
+
+    ticker = eventlet.spawn(chat)
+    eventlet.sleep(tick * 5)  # baseline ticks before the storm
+    pool = eventlet.GreenPool(concurrency)
+    start = time.perf_counter()
+    accepted = sum(pool.imap(login, range(logins)))
+    elapsed = time.perf_counter() - start
+    done.append(True)
+    ticker.wait()
+    return lateness, accepted, elapsed
+
+
+def report(name, lateness, accepted, elapsed):
+    print(f"{name}")
+    print(f"  logins:       {accepted} verified in {elapsed:.2f} s ({accepted / elapsed:,.0f}/s)")
+    print(f"  chat latency: p50 {percentile(lateness, 50):.1f} ms, p99 {percentile(lateness, 99):.1f} ms, "
+          f"max {max(lateness):.1f} ms over {len(lateness)} ticks")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--queue", type=int, default=1000)
+    parser.add_argument("--method", default="scrypt")
+    parser.add_argument("--tick", type=float, default=10, help="chat tick in ms")
+    args = parser.parse_args()
+
+    tick = args.tick / 1000
+    pwhash = generate_password_hash("Pass123", args.method)
+
+    report("inline check_password_hash",
+           *storm(lambda: check_password_hash(pwhash, "Pass123"), args.logins, args.concurrency, tick))
+
+    hasher = PasswordHasher(args.method, workers=args.workers, max_queue=args.queue)
+    report(f"PasswordHasher (tpool, {args.workers} workers)",
+           *storm(lambda: hasher.verify(pwhash, "Pass123"), args.logins, args.concurrency, tick))
+    print(f"  hasher stats: {hasher.stats()}")
+
+
+if __name__ == "__main__":
+    main()
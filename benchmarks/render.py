@@ -0,0 +1,144 @@
+"""Template cost per page: compiling, loading from the bytecode cache, rendering.
+
+For each template it reports:
+
+- compile: Jinja source -> code object, what a worker pays on the first
+  render without a bytecode cache
+- bytecode: the same template loaded from a warm FileSystemBytecodeCache
+- render: the median render with the fragment cache off and with warm
+  ``{% cache %}`` blocks (pages without cache blocks render the same)
+
+The drivers and riders lists are built from synthetic rows; no database
+is touched.
+
+    python benchmarks/render.py --rows 50 --runs 200
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("NAMAX_DATABASE_URL", "sqlite://")
+os.environ["NAMAX_JINJA_BYTECODE_CACHE"] = ""  # measured separately below
+
+from flask import render_template, session  # noqa: E402
+from jinja2 import Environment, FileSystemBytecodeCache  # noqa: E402
+
+from app import create_app  # noqa: E402
+from forms import TOWNS, DriverSignupForm, TOWNS_JSON, town_options  # noqa: E402
+from fragment_cache import FragmentCache  # noqa: E402
+from user_state import TTLCache  # noqa: E402
+
+
+def drivers(rows):
+    now = datetime.utcnow()
+    return [
+        SimpleNamespace(
+            id=i, user_name=f"driver{i}", name=None, seats=4, timestamp=now,
+            pickup=",".join(TOWNS[i % 20:i % 20 + 3]), dropoff=",".join(TOWNS[i % 7:i % 7 + 2]),
+        )
+        for i in range(rows)
+    ]
+
+
+def riders(rows):
+    now = datetime.utcnow()
+    return [
+        SimpleNamespace(id=i, user_name=f"rider{i}", pickup=TOWNS[i % 24], dropoff=TOWNS[(i + 5) % 24],
+                        seats=None, timestamp=now, status="Pending")
+        for i in range(rows)
+    ]
+
+
+def pages(rows):
+    """(template, context factory) for the pages worth measuring."""
+    driver = SimpleNamespace(id=1, pickup=",".join(TOWNS[:5]), dropoff=",".join(TOWNS[5:10]), seats=4)
+    listed = drivers(rows)
+    return [
+        ("be_a_driver.html", lambda: dict(
+            user_name="bench", form=DriverSignupForm(), driver=None, show_riders_button=False,
+            town_options=town_options, towns_json=TOWNS_JSON)),
+        ("be_a_driver.html (4+4 extra stops)", lambda: dict(
+            user_name="bench", form=DriverSignupForm(), driver=driver, show_riders_button=True,
+            town_options=town_options, towns_json=TOWNS_JSON)),
+        ("drivers_today.html", lambda: dict(
+            drivers=listed, detours={d.id: 3.0 for d in listed[::2]}, user_name="bench",
+            pickup="Springbok", dropoff="Garies")),
+        ("riders_today.html", lambda: dict(
+            riders=riders(rows), pickup="Springbok,Okiep", dropoff="Garies")),
+        ("feedback.html", lambda: dict(feedback_list=[], older_cursor=None, q="", stats=None)),
+    ]
+
+
+def median_ms(fn, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def load_times(loader, names):
+    """Per template: compile from source, then load from a warm bytecode cache."""
+    cache_dir = tempfile.mkdtemp()
+    try:
+        warm = Environment(loader=loader, extensions=[FragmentCache],
+                           bytecode_cache=FileSystemBytecodeCache(cache_dir))
+        compile_ms = {}
+        for name in names:
+            start = time.perf_counter()
+            warm.get_template(name)
+            compile_ms[name] = (time.perf_counter() - start) * 1000
+
+        fresh = Environment(loader=loader, extensions=[FragmentCache],
+                            bytecode_cache=FileSystemBytecodeCache(cache_dir))
+        bytecode_ms = {}
+        for name in names:
+            start = time.perf_counter()
+            fresh.get_template(name)
+            bytecode_ms[name] = (time.perf_counter() - start) * 1000
+        return compile_ms, bytecode_ms
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50, help="drivers/riders listed")
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    app = create_app({"WTF_CSRF_ENABLED": False})
+    env = app.jinja_env
+    names = sorted(name for name in env.list_templates() if name.endswith(".html"))
+    compile_ms, bytecode_ms = load_times(env.loader, names)
+
+    print(f"{'template':38} {'compile':>9} {'bytecode':>9}")
+    for name in names:
+        print(f"{name:38} {compile_ms[name]:8.2f}ms {bytecode_ms[name]:8.2f}ms")
+    print(f"{'all':38} {sum(compile_ms.values()):8.2f}ms {sum(bytecode_ms.values()):8.2f}ms")
+
+    print(f"\nrender, median of {args.runs} ({args.rows} drivers/riders)")
+    print(f"{'template':38} {'no cache':>9} {'fragments':>9}")
+    with app.test_request_context("/"):
+        session["user_name"] = "bench"
+        for label, context in pages(args.rows):
+            name = label.split(" ")[0]
+            ctx = context()
+            env.fragment_cache = None
+            plain = median_ms(lambda: render_template(name, **ctx), args.runs)
+            env.fragment_cache = TTLCache(app.config['FRAGMENT_CACHE_SIZE'] or 5000, 3600)
+            render_template(name, **ctx)  # fill the fragments
+            cached = median_ms(lambda: render_template(name, **ctx), args.runs)
+            print(f"{label:38} {plain:8.3f}ms {cached:8.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Concurrency stress test for reserve_seats: many riders, one popular driver.
+
+Starts ``--riders`` threads that all try to claim seats in the same car
+at once (some replaying their request key), then checks that the car was
+never overbooked and reports reservations per second.
+
+    python benchmarks/reservation_stress.py --riders 50 --seats 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date
+
+from sqlalchemy import (create_engine, MetaData, Table, Column, Integer, String, Boolean, Date, DateTime,
+                        UniqueConstraint, select, func)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from reservations import reserve_seats  # noqa: E402
+
+
+def make_tables(metadata):
+    drivers = Table(
+        "driver", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("user_name", String(100)),
+        Column("seats", Integer),
+        Column("seats_taken", Integer, nullable=False, default=0),
+        Column("is_available", Boolean, default=True),
+        Column("service_date", Date, default=date.today),
+    )
+    bookings = Table(
+        "rider_booking", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("user_name", String(100)),
+        Column("pickup", String(100)),
+        Column("dropoff", String(100)),
+        Column("seats", Integer),
+        Column("timestamp", DateTime),
+        Column("date", Date, default=date.today),
+        Column("driver_id", Integer),
+        Column("request_key", String(64)),
+        UniqueConstraint("user_name", "request_key"),
+    )
+    return drivers, bookings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--riders", type=int, default=50)
+    parser.add_argument("--seats", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=20, help="fresh cars to fight over")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "reserve.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 30}, pool_size=args.riders)
+    metadata = MetaData()
+    drivers, bookings = make_tables(metadata)
+    metadata.create_all(engine)
+
+    outcomes = Counter()
+    lock = threading.Lock()
+    total_time = 0.0
+
+    for round_no in range(args.rounds):
+        with engine.begin() as conn:
+            driver_id = conn.execute(
+                drivers.insert().values(user_name=f"Springbok{round_no}", seats=args.seats, seats_taken=0)
+                .returning(drivers.c.id)
+            ).scalar()
+
+        barrier = threading.Barrier(args.riders)
+
+        def rider(n):
+            # Every fifth request replays the previous rider's, as a flaky network would
+            rider_no = n - 1 if n % 5 == 0 and n else n
+            barrier.wait()
+            result = reserve_seats(engine, drivers, bookings, driver_id, f"Rider{rider_no}", 1,
+                                   f"{round_no}-{rider_no}")
+            with lock:
+                outcomes[result.status] += 1
+
+        threads = [threading.Thread(target=rider, args=(n,)) for n in range(args.riders)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        total_time += time.perf_counter() - start
+
+        with engine.connect() as conn:
+            taken = conn.execute(select(drivers.c.seats_taken).where(drivers.c.id == driver_id)).scalar()
+            booked = conn.execute(
+                select(func.coalesce(func.sum(bookings.c.seats), 0)).where(bookings.c.driver_id == driver_id)
+            ).scalar()
+        assert taken <= args.seats, f"overbooked: {taken} > {args.seats}"
+        assert taken == booked, f"seat count {taken} != reservations {booked}"
+
+    attempts = args.riders * args.rounds
+    print(f"{args.rounds} cars x {args.seats} seats, {args.riders} concurrent riders each")
+    print(f"  outcomes: {dict(outcomes)}")
+    print(f"  no overbooking: seats_taken == reserved seats <= {args.seats} for every car")
+    print(f"  throughput: {attempts / total_time:,.0f} requests/s, "
+          f"{outcomes['reserved'] / total_time:,.0f} reservations/s")
+
+
+if __name__ == "__main__":
+    main()
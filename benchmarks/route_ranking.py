@@ -0,0 +1,73 @@
+"""Ranking drivers by detour: vectorized TownMatrix.rank vs a per-pair Python loop.
+
+    python benchmarks/route_ranking.py --drivers 500
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from geo import TownMatrix  # noqa: E402
+from matching import split_stops  # noqa: E402
+
+Candidate = namedtuple("Candidate", "id pickup dropoff")
+
+
+def python_detour(matrix, driver, a, b):
+    """Same cost model as TownMatrix.detours, one driver at a time."""
+    stops = split_stops(driver.pickup) + split_stops(driver.dropoff)
+    route = [None] + stops + [None]
+
+    def d(x, y):
+        return 0.0 if x is None or y is None else matrix.distance(x, y)
+
+    best = float("inf")
+    legs = list(zip(route, route[1:]))
+    for i, (s, e) in enumerate(legs):
+        best = min(best, d(s, a) + d(a, b) + d(b, e) - d(s, e))
+        for s2, e2 in legs[i + 1:]:
+            best = min(best, d(s, a) + d(a, e) - d(s, e) + d(s2, b) + d(b, e2) - d(s2, e2))
+    return max(best, 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--drivers", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    matrix = TownMatrix.build()
+    rng = random.Random(7)
+    towns = matrix.towns
+    drivers = [
+        Candidate(i, ",".join(rng.sample(towns, rng.randint(1, 5))), ",".join(rng.sample(towns, rng.randint(1, 5))))
+        for i in range(args.drivers)
+    ]
+    pickup, dropoff = "Springbok", "Garies"
+
+    matrix.rank(drivers, pickup, dropoff)  # warm the path cache
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        ranked = matrix.rank(drivers, pickup, dropoff)
+    vector_us = (time.perf_counter() - start) / args.repeat * 1e6
+
+    loops = max(args.repeat // 20, 1)
+    start = time.perf_counter()
+    for _ in range(loops):
+        slow = sorted(drivers, key=lambda drv: python_detour(matrix, drv, pickup, dropoff))
+    python_us = (time.perf_counter() - start) / loops * 1e6
+
+    fast_costs = [round(km, 6) for _, km, _ in ranked]
+    slow_costs = [round(python_detour(matrix, drv, pickup, dropoff), 6) for drv in slow]
+    assert fast_costs == slow_costs, "vectorized and loop rankings disagree"
+
+    print(f"Ranking {args.drivers} drivers for {pickup} -> {dropoff}")
+    print(f"  vectorized:  {vector_us:10.1f} us")
+    print(f"  python loop: {python_us:10.1f} us  ({python_us / vector_us:.0f}x slower)")
+
+
+if __name__ == "__main__":
+    main()
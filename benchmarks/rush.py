@@ -0,0 +1,398 @@
+"""End-to-end load test: a Namakwaland morning rush against a local server.
+
+Seeds a scratch SQLite database with background riders, drivers and
+bookings over ``forms.TOWNS``, starts the app in a subprocess (eventlet
+when installed, as in production) and lets ``--riders`` + ``--drivers``
+concurrent simulated users hit it over real HTTP and Socket.IO:
+
+* riders log in (``/signup``), book (``/booking``), look at
+  ``/drivers_today`` for their route, connect to Socket.IO, message a
+  driver (``private_message``) and open the chat page;
+* drivers log in, update their listing (``/be_a_driver``), poll
+  ``/riders_today`` for their route and connect to Socket.IO.
+
+Reads are repeated ``--rounds`` times. Only the standard library is used
+on the client side; Socket.IO is spoken over Engine.IO long-polling.
+Reports count, errors, throughput and p50/p95/p99/max latency per
+endpoint and event as JSON; ``--baseline`` compares with an earlier run.
+
+    python benchmarks/rush.py --riders 50 --drivers 10 --out rush.json
+    python benchmarks/rush.py --baseline rush.json
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PASSWORD = "Rush123"
+
+SERVER = """
+try:
+    import eventlet
+    eventlet.monkey_patch()
+except ImportError:
+    pass
+from app import create_app
+from extensions import socketio
+app = create_app()
+socketio.run(app, host="127.0.0.1", port={port}, log_output=False, allow_unsafe_werkzeug=True)
+"""
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def add(self, name, seconds, ok=True):
+        with self._lock:
+            if ok:
+                self.samples[name].append(seconds * 1000)
+            else:
+                self.errors[name] += 1
+
+    def summary(self, wall):
+        names = sorted(set(self.samples) | set(self.errors))
+        result = {}
+        for name in names:
+            ms = self.samples.get(name) or [0.0]
+            result[name] = {
+                "count": len(self.samples.get(name, ())),
+                "errors": self.errors.get(name, 0),
+                "per_second": round(len(self.samples.get(name, ())) / wall, 1),
+                "p50_ms": round(percentile(ms, 50), 1),
+                "p95_ms": round(percentile(ms, 95), 1),
+                "p99_ms": round(percentile(ms, 99), 1),
+                "max_ms": round(max(ms), 1),
+            }
+        return result
+
+
+# --------------------------
+# Seeding
+# --------------------------
+def seed(background_riders, drivers, riders, rng):
+    """Fill the scratch database; returns (rider names, driver rows as (name, pickups, dropoffs))."""
+    from werkzeug.security import generate_password_hash
+
+    from app import create_app
+    from extensions import db
+    from forms import TOWNS
+    from migrations import run_migrations
+    from models import NamakwaUsers, Namakwaland, Driver
+
+    app = create_app()
+    with app.app_context():
+        run_migrations(db)
+        pwhash = generate_password_hash(PASSWORD, app.config['PASSWORD_HASH_METHOD'])
+
+        rider_names = [f"rider{i:04d}" for i in range(riders)]
+        driver_routes = []
+        users = [f"bg{i:05d}" for i in range(background_riders)] + rider_names
+        for i in range(drivers):
+            pickups = rng.sample(TOWNS, rng.randint(1, 3))
+            dropoffs = rng.sample([t for t in TOWNS if t not in pickups], rng.randint(1, 3))
+            driver_routes.append((f"driver{i:04d}", pickups, dropoffs))
+        users += [name for name, _, _ in driver_routes]
+        db.session.add_all(NamakwaUsers(name=name, password=pwhash) for name in users)
+
+        for i in range(background_riders):
+            pickup, dropoff = rng.sample(TOWNS, 2)
+            db.session.add(Namakwaland(user_name=f"bg{i:05d}", pickup=pickup, dropoff=dropoff, status="Pending"))
+        for name, pickups, dropoffs in driver_routes:
+            driver = Driver(user_name=name, seats=rng.randint(2, 6), is_available=True)
+            driver.set_stops(pickups, dropoffs)
+            db.session.add(driver)
+        db.session.commit()
+    return rider_names, driver_routes
+
+
+# --------------------------
+# Clients
+# --------------------------
+class HttpClient:
+    """One keep-alive connection with a cookie jar of one (the Flask session)."""
+
+    def __init__(self, port, recorder):
+        self.port = port
+        self.recorder = recorder
+        self.cookie = None
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+
+    def request(self, method, path, name=None, form=None, expect=(200, 302)):
+        headers = {"Cookie": self.cookie} if self.cookie else {}
+        body = None
+        if form is not None:
+            body = urlencode(form, doseq=True)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        start = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+            self.recorder.add(name or f"{method} {path}", time.perf_counter() - start, ok=False)
+            return None
+        self.recorder.add(name or f"{method} {path}", time.perf_counter() - start, ok=response.status in expect)
+        cookie = response.getheader("Set-Cookie")
+        if cookie:
+            self.cookie = cookie.split(";", 1)[0]
+        return data
+
+    def csrf_token(self, path):
+        page = self.request("GET", path) or b""
+        match = re.search(rb'name="csrf_token" type="hidden" value="([^"]+)"', page)
+        return match.group(1).decode() if match else ""
+
+    def login(self, name):
+        token = self.csrf_token("/signup")
+        self.request("POST", "/signup", form={"csrf_token": token, "name": name, "password": PASSWORD})
+
+
+class SocketClient:
+    """Just enough Socket.IO (Engine.IO v4, polling transport) to connect and emit."""
+
+    def __init__(self, port, cookie, recorder, user_name):
+        self.port = port
+        self.cookie = cookie
+        self.recorder = recorder
+        self.user_name = user_name
+        self.sid = None
+        self.connected = threading.Event()
+        self.closed = False
+        self.pending = {}  # message text -> send time, until our own echo arrives
+        self._lock = threading.Lock()
+        self._poller = None
+
+    def _http(self, method, body=None):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+        query = {"EIO": "4", "transport": "polling", "t": uuid.uuid4().hex[:8]}
+        if self.sid:
+            query["sid"] = self.sid
+        headers = {"Cookie": self.cookie, "Content-Type": "text/plain;charset=UTF-8"}
+        try:
+            conn.request(method, "/socket.io/?" + urlencode(query), body=body, headers=headers)
+            return conn.getresponse().read().decode()
+        finally:
+            conn.close()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            handshake = self._http("GET")
+            self.sid = json.loads(handshake[handshake.index("{"):])["sid"]
+            self._http("POST", "40")
+            self._poller = threading.Thread(target=self._poll, daemon=True)
+            self._poller.start()
+            ok = self.connected.wait(30)
+        except (OSError, ValueError, http.client.HTTPException):
+            ok = False
+        self.recorder.add("event connect", time.perf_counter() - start, ok=ok)
+        return ok
+
+    def _poll(self):
+        while not self.closed:
+            try:
+                payload = self._http("GET")
+            except (OSError, http.client.HTTPException):
+                return
+            for packet in payload.split("\x1e"):
+                self._handle(packet)
+
+    def _handle(self, packet):
+        if packet == "2":  # ping
+            self._http("POST", "3")
+        elif packet.startswith("40"):
+            self.connected.set()
+        elif packet.startswith("42"):
+            name, data = json.loads(packet[2:])[:2]
+            if name == "private_message" and data.get("from") == self.user_name:
+                with self._lock:
+                    sent = self.pending.pop(data.get("message"), None)
+                if sent is not None:
+                    self.recorder.add("event private_message", time.perf_counter() - sent)
+        elif packet.startswith("1"):
+            self.closed = True
+
+    def emit_message(self, to):
+        text = f"msg-{uuid.uuid4().hex[:12]}"
+        with self._lock:
+            self.pending[text] = time.perf_counter()
+        self._http("POST", "42" + json.dumps(["private_message", {"to": to, "message": text}]))
+
+    def close(self, wait=10):
+        deadline = time.time() + wait
+        while self.pending and time.time() < deadline:
+            time.sleep(0.05)
+        for _ in self.pending:
+            self.recorder.add("event private_message", 0, ok=False)
+        self.closed = True
+        try:
+            self._http("POST", "41")
+            self._http("POST", "1")
+        except (OSError, http.client.HTTPException):
+            pass
+
+
+def rider_session(port, recorder, name, drivers, rounds, rng):
+    from forms import TOWNS
+
+    client = HttpClient(port, recorder)
+    client.login(name)
+    pickup, dropoff = rng.sample(TOWNS, 2)
+    token = client.csrf_token("/booking")
+    client.request("POST", "/booking", form={"csrf_token": token, "pickup": pickup, "dropoff": dropoff})
+    for _ in range(rounds):
+        client.request("GET", "/drivers_today?" + urlencode({"pickup": pickup, "dropoff": dropoff}),
+                       name="GET /drivers_today")
+
+    driver_name = rng.choice(drivers)[0]
+    sock = SocketClient(port, client.cookie, recorder, name)
+    if sock.connect():
+        for _ in range(rounds):
+            sock.emit_message(driver_name)
+        client.request("GET", f"/chat/{driver_name}/{name}", name="GET /chat/<driver>/<rider>")
+        sock.close()
+
+
+def driver_session(port, recorder, route, rounds, rng):
+    name, pickups, dropoffs = route
+    client = HttpClient(port, recorder)
+    client.login(name)
+    client.request("POST", "/be_a_driver", form={
+        "pickup": pickups[0], "pickup[]": pickups[1:], "dropoff": dropoffs[0], "dropoff[]": dropoffs[1:],
+        "seats": rng.randint(2, 6)
+    })
+    sock = SocketClient(port, client.cookie, recorder, name)
+    sock.connect()
+    for _ in range(rounds):
+        client.request("GET", "/riders_today?" + urlencode({"pickup": ",".join(pickups), "dropoff": ",".join(dropoffs)}),
+                       name="GET /riders_today")
+    sock.close()
+
+
+# --------------------------
+# Run
+# --------------------------
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(port, server, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"server exited with {server.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit("server did not start")
+
+
+def compare(current, baseline, tolerance):
+    print(f"{'endpoint':36} {'p95 ms':>16} {'per second':>18}")
+    regressions = 0
+    for name, stats in current.items():
+        before = baseline.get(name)
+        if not before:
+            print(f"{name:36} {stats['p95_ms']:>16} {stats['per_second']:>18}  (new)")
+            continue
+        change = (stats["p95_ms"] - before["p95_ms"]) / before["p95_ms"] if before["p95_ms"] else 0.0
+        flag = "  REGRESSION" if change > tolerance else ""
+        regressions += bool(flag)
+        print(f"{name:36} {before['p95_ms']:>7} -> {stats['p95_ms']:<7} "
+              f"{before['per_second']:>8} -> {stats['per_second']:<8}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--riders", type=int, default=50, help="concurrent simulated riders")
+    parser.add_argument("--drivers", type=int, default=10, help="concurrent simulated drivers")
+    parser.add_argument("--background-riders", type=int, default=500, help="bookings seeded for today")
+    parser.add_argument("--background-drivers", type=int, default=40, help="driver listings seeded for today")
+    parser.add_argument("--rounds", type=int, default=5, help="repeated reads/messages per client")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report of an earlier run to compare p95s against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="p95 increase flagged as a regression")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    scratch = tempfile.mkdtemp()
+    os.environ["NAMAX_DATABASE_URL"] = f"sqlite:///{os.path.join(scratch, 'rush.db')}"
+    os.environ.pop("NAMAX_DATABASE_REPLICA_URL", None)
+    os.environ.setdefault("NAMAX_RATE_LIMIT_SIGNUP_IP", "")  # every simulated client is 127.0.0.1
+
+    riders, drivers = seed(args.background_riders, args.background_drivers + args.drivers, args.riders, rng)
+    sim_drivers = drivers[args.background_drivers:]
+
+    port = free_port()
+    server = subprocess.Popen([sys.executable, "-c", SERVER.format(port=port)], cwd=ROOT, env=os.environ,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for(port, server)
+        recorder = Recorder()
+        threads = [
+            threading.Thread(target=rider_session, args=(port, recorder, name, drivers, args.rounds,
+                                                         random.Random(rng.random())))
+            for name in riders
+        ] + [
+            threading.Thread(target=driver_session, args=(port, recorder, route, args.rounds,
+                                                          random.Random(rng.random())))
+            for route in sim_drivers
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = {
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "baseline")},
+        "wall_seconds": round(wall, 2),
+        "endpoints": recorder.summary(wall),
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report["endpoints"], json.load(f)["endpoints"], args.tolerance)
+        sys.exit(1 if regressions else 0)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Mixed read/write load on one SQLite file, default settings vs. database.tune_sqlite.
+
+``--writers`` threads insert bookings and chat messages (one commit each)
+while ``--readers`` threads run the "today's bookings" and chat-page
+queries. Reports throughput, p50/p99 latency and how many operations
+failed with "database is locked".
+
+    python benchmarks/sqlite_contention.py --writers 8 --readers 16 --seconds 5
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+
+from sqlalchemy import (create_engine, MetaData, Table, Column, Integer, String, Date, DateTime, Text,
+                        select, insert)
+from sqlalchemy.exc import OperationalError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import engine_options, tune_sqlite  # noqa: E402
+from forms import TOWNS  # noqa: E402
+
+
+def make_tables(metadata):
+    bookings = Table(
+        "namakwaland", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("user_name", String(250)),
+        Column("pickup", String(250)),
+        Column("dropoff", String(250)),
+        Column("status", String(20)),
+        Column("service_date", Date, index=True),
+    )
+    messages = Table(
+        "chat_message", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("conversation", String(201), index=True),
+        Column("sender", String(100)),
+        Column("message", Text),
+        Column("timestamp", DateTime),
+    )
+    return bookings, messages
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else 0.0
+
+
+def run(engine, bookings, messages, writers, readers, seconds):
+    stop = threading.Event()
+    lock = threading.Lock()
+    stats = {"read": [], "write": [], "locked": 0}
+
+    def timed(kind, fn):
+        start = time.perf_counter()
+        try:
+            fn()
+        except OperationalError as exc:
+            if "locked" not in str(exc):
+                raise
+            with lock:
+                stats["locked"] += 1
+            return
+        with lock:
+            stats[kind].append(time.perf_counter() - start)
+
+    def writer(n):
+        rng = random.Random(n)
+        while not stop.is_set():
+            def write():
+                with engine.begin() as conn:
+                    if rng.random() < 0.5:
+                        conn.execute(insert(bookings).values(
+                            user_name=f"Rider{rng.randrange(1000)}", pickup=rng.choice(TOWNS),
+                            dropoff=rng.choice(TOWNS), status="Pending", service_date=date.today()))
+                    else:
+                        conn.execute(insert(messages).values(
+                            conversation=f"d{rng.randrange(50)}|r{rng.randrange(50)}", sender="x",
+                            message="Is jy al op pad?", timestamp=datetime.utcnow()))
+            timed("write", write)
+
+    def reader(n):
+        rng = random.Random(1000 + n)
+        while not stop.is_set():
+            def read():
+                with engine.connect() as conn:
+                    if rng.random() < 0.5:
+                        conn.execute(select(bookings).where(
+                            bookings.c.service_date == date.today(), bookings.c.status == "Pending"
+                        ).limit(200)).all()
+                    else:
+                        conn.execute(select(messages).where(
+                            messages.c.conversation == f"d{rng.randrange(50)}|r{rng.randrange(50)}"
+                        ).order_by(messages.c.id.desc()).limit(50)).all()
+            timed("read", read)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    threads += [threading.Thread(target=reader, args=(n,)) for n in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--timeout", type=float, default=0.5,
+                        help="pysqlite lock timeout (s) for the untuned run")
+    args = parser.parse_args()
+
+    for label in ("default", "tuned"):
+        path = os.path.join(tempfile.mkdtemp(), "contention.db")
+        url = f"sqlite:///{path}"
+        if label == "default":
+            engine = create_engine(url, connect_args={"timeout": args.timeout},
+                                   pool_size=args.writers + args.readers)
+        else:
+            engine = create_engine(url, **engine_options(url, pool_size=args.writers + args.readers))
+            tune_sqlite(engine)
+        metadata = MetaData()
+        bookings, messages = make_tables(metadata)
+        metadata.create_all(engine)
+
+        stats = run(engine, bookings, messages, args.writers, args.readers, args.seconds)
+        engine.dispose()
+        print(f"{label}:")
+        for kind in ("write", "read"):
+            lat = stats[kind]
+            print(f"  {kind}s: {len(lat) / args.seconds:8,.0f}/s  p50 {percentile(lat, 50) * 1000:6.1f} ms  "
+                  f"p99 {percentile(lat, 99) * 1000:7.1f} ms")
+        print(f"  'database is locked' errors: {stats['locked']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Worker startup cost: time and peak memory to import the app and build it.
+
+Each run is a fresh interpreter (as a gunicorn worker without --preload
+would be), pointed at a scratch database, that executes ``--stmt`` and
+reports its wall time, peak RSS and how many modules it loaded.
+
+    python benchmarks/startup.py --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import resource, sys, time
+start = time.perf_counter()
+exec({stmt!r})
+elapsed = time.perf_counter() - start
+print(__import__("json").dumps({{
+    "seconds": elapsed,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+}}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--stmt", default="from app import create_app; create_app()")
+    parser.add_argument("--root", default=ROOT, help="tree to import the app from")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp()
+    env = dict(os.environ, NAMAX_DATABASE_URL=f"sqlite:///{os.path.join(scratch, 'startup.db')}",
+               PYTHONPATH=args.root, PYTHONDONTWRITEBYTECODE="")
+    results = []
+    for _ in range(args.runs):
+        out = subprocess.run(
+            [sys.executable, "-c", CHILD.format(stmt=args.stmt)],
+            cwd=args.root, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+
+    seconds = [r["seconds"] for r in results]
+    print(f"{args.stmt!r} x {args.runs}")
+    print(f"  time:    median {statistics.median(seconds) * 1000:.0f} ms, min {min(seconds) * 1000:.0f} ms")
+    print(f"  memory:  {statistics.median(r['rss_mb'] for r in results):.1f} MB peak RSS")
+    print(f"  modules: {results[-1]['modules']}")
+
+
+if __name__ == "__main__":
+    main()
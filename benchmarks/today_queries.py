@@ -0,0 +1,139 @@
+"""Query plans and latency of the "today" queries, before and after service_date.
+
+Builds a throwaway SQLite database shaped like ``namakwaland`` and
+``driver`` and times the old ``date(timestamp) = ?`` filters against the
+indexed ``service_date`` filters that app.py now uses.
+
+    python benchmarks/today_queries.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from forms import TOWNS  # noqa: E402
+
+
+SCHEMA = """
+CREATE TABLE namakwaland (
+    id INTEGER PRIMARY KEY, user_name VARCHAR(250) NOT NULL, pickup INTEGER,
+    dropoff VARCHAR(500) NOT NULL, status INTEGER, timestamp DATETIME, service_date DATE
+);
+CREATE TABLE driver (
+    id INTEGER PRIMARY KEY, user_name VARCHAR(100) UNIQUE, pickup VARCHAR(100),
+    dropoff VARCHAR(100), seats INTEGER, is_available BOOLEAN, timestamp DATETIME, service_date DATE
+);
+"""
+
+INDEXES = """
+CREATE INDEX ix_namakwaland_day_route ON namakwaland (service_date, pickup, dropoff);
+CREATE INDEX ix_namakwaland_user_day ON namakwaland (user_name, service_date);
+CREATE INDEX ix_driver_day_available ON driver (service_date, is_available);
+"""
+
+# (label, old SQL, new SQL) -- the filters namax, riders_today and drivers_today issue
+QUERIES = [
+    (
+        "namax: booking today",
+        "SELECT * FROM namakwaland WHERE user_name = :user AND date(timestamp) = :today LIMIT 1",
+        "SELECT * FROM namakwaland WHERE user_name = :user AND service_date = :today LIMIT 1",
+    ),
+    (
+        "riders_today: pending on route",
+        "SELECT * FROM namakwaland WHERE pickup = :pickup AND dropoff = :dropoff "
+        "AND date(timestamp) = :today AND status = 'Pending'",
+        "SELECT * FROM namakwaland WHERE service_date = :today AND pickup = :pickup "
+        "AND dropoff = :dropoff AND status = 'Pending'",
+    ),
+    (
+        "drivers_today: available",
+        "SELECT * FROM driver WHERE is_available = 1 AND date(timestamp) = :today",
+        "SELECT * FROM driver WHERE service_date = :today AND is_available = 1",
+    ),
+]
+
+
+def seed(conn, rows, days):
+    rng = random.Random(42)
+    today = datetime.combine(date.today(), datetime.min.time())
+    drivers = max(rows // 100, 10)
+
+    def stamp():
+        ts = today - timedelta(days=rng.randrange(days), seconds=rng.randrange(86400))
+        return ts.isoformat(" "), ts.date().isoformat()
+
+    batch = []
+    for i in range(rows):
+        ts, day = stamp()
+        pickup, dropoff = rng.sample(TOWNS, 2)
+        batch.append((f"Rider{i % (rows // 3 + 1)}", pickup, dropoff, "Pending", ts, day))
+        if len(batch) == 50000:
+            conn.executemany("INSERT INTO namakwaland (user_name, pickup, dropoff, status, timestamp, service_date) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", batch)
+            batch.clear()
+    conn.executemany("INSERT INTO namakwaland (user_name, pickup, dropoff, status, timestamp, service_date) "
+                     "VALUES (?, ?, ?, ?, ?, ?)", batch)
+
+    conn.executemany(
+        "INSERT INTO driver (user_name, pickup, dropoff, seats, is_available, timestamp, service_date) "
+        "VALUES (?, ?, ?, ?, 1, ?, ?)",
+        [(f"Driver{i}", ",".join(rng.sample(TOWNS, 2)), ",".join(rng.sample(TOWNS, 2)), 4, *stamp())
+         for i in range(drivers)]
+    )
+    conn.commit()
+
+
+def plan(conn, sql, params):
+    rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return "; ".join(row[-1] for row in rows)
+
+
+def timed(conn, sql, params, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        conn.execute(sql, params).fetchall()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="booking rows to seed")
+    parser.add_argument("--days", type=int, default=365, help="days of history to spread rows over")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per query")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+
+    print(f"Seeding {args.rows:,} bookings over {args.days} days...")
+    seed(conn, args.rows, args.days)
+
+    params = {"user": "Rider7", "today": date.today().isoformat(), "pickup": "Springbok", "dropoff": "Garies"}
+
+    before = {}
+    for label, old_sql, _ in QUERIES:
+        before[label] = (plan(conn, old_sql, params), timed(conn, old_sql, params, args.repeat))
+
+    conn.executescript(INDEXES)
+    conn.execute("ANALYZE")
+
+    for label, _, new_sql in QUERIES:
+        old_plan, old_ms = before[label]
+        new_plan, new_ms = plan(conn, new_sql, params), timed(conn, new_sql, params, args.repeat)
+        print(f"\n{label}")
+        print(f"  before: {old_ms:9.3f} ms  | {old_plan}")
+        print(f"  after:  {new_ms:9.3f} ms  | {new_plan}")
+        print(f"  speedup: {old_ms / new_ms if new_ms else float('inf'):.0f}x")
+
+    conn.close()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
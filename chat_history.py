@@ -0,0 +1,57 @@
+"""Keyset pagination over one driver/rider conversation.
+
+Every ChatMessage carries a ``conversation`` key that is the same for
+both directions, and the (conversation, timestamp, id) index serves
+"newest N before this cursor" directly, however long the thread is.
+"""
+from datetime import datetime
+
+from sqlalchemy import select, tuple_
+
+
+PAGE_SIZE = 50
+
+
+def conversation_key(a, b):
+    """Order-independent key for the conversation between two users."""
+    return "|".join(sorted((a, b)))
+
+
+def encode_cursor(message):
+    return f"{message.timestamp.isoformat()}_{message.id}"
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; returns None for anything malformed."""
+    try:
+        stamp, message_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(stamp), int(message_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def fetch_page(model, key, before=None, limit=PAGE_SIZE, archive=None):
+    """Messages older than ``before`` (oldest first) and the cursor for the next page.
+
+    With an ``archive`` table (see archive.py) the page continues into
+    archived messages once the hot table runs out; those are all older
+    than any hot message. The returned cursor is None once the start of
+    the conversation is reached.
+    """
+    query = model.query.filter(model.conversation == key)
+    position = decode_cursor(before) if before else None
+    if position:
+        query = query.filter(tuple_(model.timestamp, model.id) < tuple_(*position))
+
+    rows = query.order_by(model.timestamp.desc(), model.id.desc()).limit(limit + 1).all()
+    if archive is not None and len(rows) <= limit:
+        older = select(archive).where(archive.c.conversation == key)
+        if position:
+            older = older.where(tuple_(archive.c.timestamp, archive.c.id) < tuple_(*position))
+        rows += model.query.session.execute(
+            older.order_by(archive.c.timestamp.desc(), archive.c.id.desc()).limit(limit + 1 - len(rows))
+        ).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    rows.reverse()
+    return rows, (encode_cursor(rows[0]) if has_more else None)
@@ -0,0 +1,201 @@
+"""Write-behind persistence for chat messages.
+
+In write-behind mode a message gets its primary key up front from an
+``IdAllocator`` (which reserves blocks of IDs in the ``id_block`` table),
+is emitted right away, and is queued for a background thread that
+inserts whole batches in one transaction. A batch is written when it
+reaches ``batch_size`` messages or ``flush_interval`` seconds after its
+first message, whichever comes first. ``after_write(conn, rows)`` runs
+in the same transaction as each insert, for data derived from the
+messages (the inbox summaries).
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import select, func, case
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+
+log = logging.getLogger(__name__)
+
+
+class IdAllocator:
+    """Hands out primary keys for ``table`` from blocks reserved in ``block_table``.
+
+    Each reservation is a single UPDATE, so several workers can allocate
+    from the same table without handing out the same ID twice. Rows that
+    were inserted with autoincrement IDs are skipped over.
+    """
+
+    def __init__(self, engine, block_table, table, block_size=100):
+        self.engine = engine
+        self.block_table = block_table
+        self.table = table
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+
+    def _reserve(self):
+        blocks = self.block_table
+        first_free = select(func.coalesce(func.max(self.table.c.id), 0) + 1).scalar_subquery()
+        start = case((blocks.c.next_id > first_free, blocks.c.next_id), else_=first_free)
+        with self.engine.begin() as conn:
+            end = conn.execute(
+                blocks.update()
+                .where(blocks.c.name == self.table.name)
+                .values(next_id=start + self.block_size)
+                .returning(blocks.c.next_id)
+            ).scalar()
+            if end is None:
+                try:
+                    with conn.begin_nested():
+                        first = conn.execute(select(first_free)).scalar()
+                        end = first + self.block_size
+                        conn.execute(blocks.insert().values(name=self.table.name, next_id=end))
+                except IntegrityError:
+                    # Another worker created the row first; reserve from it
+                    return self._reserve()
+        return end - self.block_size, end
+
+    def next_id(self):
+        with self._lock:
+            if self._next >= self._end:
+                self._next, self._end = self._reserve()
+            value = self._next
+            self._next += 1
+            return value
+
+
+class ChatWriter:
+    """Queue chat rows and insert them in batches from a background thread."""
+
+    def __init__(self, engine, table, allocator, batch_size=200, flush_interval=0.05,
+                 max_retries=3, retry_backoff=0.2, after_write=None):
+        self.engine = engine
+        self.table = table
+        self.allocator = allocator
+        self.after_write = after_write
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stopping = False
+
+    def _ensure_started(self):
+        # Started lazily so the thread is created in the worker, not before fork
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="chat-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def submit(self, sender, recipient, message, **columns):
+        """Queue a message and return its ID; it is written shortly after."""
+        if self._stopping:
+            raise RuntimeError("ChatWriter is closed")
+        row = {
+            "id": self.allocator.next_id(),
+            "sender": sender,
+            "recipient": recipient,
+            "message": message,
+            "timestamp": datetime.utcnow(),
+            **columns,
+        }
+        self._ensure_started()
+        self._queue.put(row)
+        return row["id"]
+
+    def flush(self):
+        """Block until every queued message has been written (or dropped)."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        """Stop accepting messages and write out everything still queued."""
+        if self._stopping:
+            return
+        self._stopping = True
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+
+    # --------------------------
+    # Background thread
+    # --------------------------
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                self._queue.task_done()
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    row = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if row is None:
+                    stop = True
+                    break
+                batch.append(row)
+
+            # On shutdown, drain whatever is left into this last write
+            if stop:
+                while True:
+                    try:
+                        row = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if row is not None:
+                        batch.append(row)
+                    else:
+                        self._queue.task_done()
+                self._queue.task_done()
+
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch):
+        for attempt in range(self.max_retries):
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(self.table.insert(), batch)
+                    if self.after_write is not None:
+                        self.after_write(conn, batch)
+                self.written += len(batch)
+                return
+            except SQLAlchemyError:
+                log.warning("Chat batch of %d failed (attempt %d)", len(batch), attempt + 1, exc_info=True)
+                time.sleep(self.retry_backoff * 2 ** attempt)
+
+        # Fall back to one row at a time so one bad row can't sink the batch
+        for row in batch:
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(self.table.insert(), row)
+                    if self.after_write is not None:
+                        self.after_write(conn, [row])
+                self.written += 1
+            except SQLAlchemyError:
+                self.dropped += 1
+                log.error("Dropping chat message %s after retries", row["id"], exc_info=True)
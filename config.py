@@ -0,0 +1,116 @@
+"""Application settings, read from NAMAX_* environment variables."""
+import os
+
+from database import REPLICA, engine_options
+
+
+def load_config(app):
+    app.config['SECRET_KEY'] = '8BYkEfBA6O6donzWlSihBXox7C0sKR6b'
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get("NAMAX_DATABASE_URL", "sqlite:///namax.db")
+
+    # Connection pool per worker; SQLite files additionally get WAL,
+    # busy_timeout, synchronous=NORMAL and mmap_size (see database.py)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+        app.config['SQLALCHEMY_DATABASE_URI'],
+        pool_size=int(os.environ.get("NAMAX_DB_POOL_SIZE", 10)),
+        max_overflow=int(os.environ.get("NAMAX_DB_MAX_OVERFLOW", 20)),
+        pool_pre_ping=os.environ.get("NAMAX_DB_POOL_PRE_PING", "1") == "1",
+        pool_recycle=int(os.environ.get("NAMAX_DB_POOL_RECYCLE", 1800))
+    )
+    app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.environ.get("NAMAX_SQLITE_BUSY_TIMEOUT_MS", 5000))
+    app.config['SQLITE_SYNCHRONOUS'] = os.environ.get("NAMAX_SQLITE_SYNCHRONOUS", "NORMAL")
+    app.config['SQLITE_MMAP_SIZE'] = int(os.environ.get("NAMAX_SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+
+    # Optional read replica for read-only views; a client that just wrote
+    # reads from the primary for this many seconds
+    if os.environ.get("NAMAX_DATABASE_REPLICA_URL"):
+        app.config['SQLALCHEMY_BINDS'] = {REPLICA: {
+            "url": os.environ["NAMAX_DATABASE_REPLICA_URL"],
+            **engine_options(os.environ["NAMAX_DATABASE_REPLICA_URL"])
+        }}
+    app.config['DATABASE_REPLICA_PIN_SECONDS'] = float(os.environ.get("NAMAX_DATABASE_REPLICA_PIN_SECONDS", 5))
+
+    # Multi-worker deployments: share presence through one SQLite file
+    # (e.g. sqlite:////tmp/namax-presence.db) and route emits through a
+    # message queue (e.g. redis://localhost:6379/0) so every worker sees them.
+    app.config['PRESENCE_URL'] = os.environ.get("NAMAX_PRESENCE_URL", "memory://")
+    app.config['SOCKETIO_MESSAGE_QUEUE'] = os.environ.get("NAMAX_SOCKETIO_MESSAGE_QUEUE")
+    app.config['PRESENCE_BROADCAST_INTERVAL'] = float(os.environ.get("NAMAX_PRESENCE_BROADCAST_INTERVAL", 1.0))
+    # A worker sharing presence stamps itself this often (seconds); the
+    # sessions of one silent for three heartbeats are treated as gone
+    app.config['PRESENCE_HEARTBEAT'] = float(os.environ.get("NAMAX_PRESENCE_HEARTBEAT", 15))
+
+    # Drivers further out of the way than this are not offered for a route
+    app.config['MAX_DETOUR_KM'] = float(os.environ.get("NAMAX_MAX_DETOUR_KM", 40))
+
+    # Writes by other workers and by `flask ...` jobs reach this worker's
+    # route index, user-state and memory:// page caches through shared
+    # version rows, read at most this often (seconds)
+    app.config['DATA_VERSION_INTERVAL'] = float(os.environ.get("NAMAX_DATA_VERSION_INTERVAL", 1.0))
+    # ...and today's route index is reloaded at least this often regardless
+    app.config['ROUTE_INDEX_MAX_AGE'] = float(os.environ.get("NAMAX_ROUTE_INDEX_MAX_AGE", 60))
+
+    # Seconds between in-process runs of the booking assignment job (0 = off;
+    # use `flask assign-bookings` from cron instead, whose writes reach the
+    # workers through the data versions above)
+    app.config['ASSIGN_INTERVAL'] = float(os.environ.get("NAMAX_ASSIGN_INTERVAL", 0))
+
+    # Daily rollover (`flask rollover`, or in-process just after midnight with
+    # NAMAX_ROLLOVER_DAILY=1): past days' bookings move to the archive tables
+    # at once, chat and feedback after this many days
+    app.config['ROLLOVER_DAILY'] = os.environ.get("NAMAX_ROLLOVER_DAILY") == "1"
+    app.config['ARCHIVE_CHAT_AFTER_DAYS'] = int(os.environ.get("NAMAX_ARCHIVE_CHAT_AFTER_DAYS", 7))
+    app.config['ARCHIVE_FEEDBACK_AFTER_DAYS'] = int(os.environ.get("NAMAX_ARCHIVE_FEEDBACK_AFTER_DAYS", 30))
+
+    # Per-user page state (bookings, today's booking, driver row) is cached per
+    # process; writes in this process invalidate it, the TTL bounds how stale
+    # another worker's copy can get
+    app.config['USER_STATE_TTL'] = float(os.environ.get("NAMAX_USER_STATE_TTL", 30))
+    app.config['USER_STATE_SIZE'] = int(os.environ.get("NAMAX_USER_STATE_SIZE", 10000))
+
+    # Rendered drivers/riders/feedback/my-bookings pages, served with ETags until
+    # a write bumps their data version; sqlite:///path shares them across workers
+    app.config['RESPONSE_CACHE_URL'] = os.environ.get("NAMAX_RESPONSE_CACHE_URL", "memory://")
+    app.config['RESPONSE_CACHE_SIZE'] = int(os.environ.get("NAMAX_RESPONSE_CACHE_SIZE", 2000))
+
+    # {% cache %} template fragments (see fragment_cache.py), per process;
+    # 0 turns them off. Compiled templates are kept as bytecode in this
+    # directory so a new worker skips Jinja compilation (empty = off)
+    app.config['FRAGMENT_CACHE_SIZE'] = int(os.environ.get("NAMAX_FRAGMENT_CACHE_SIZE", 5000))
+    app.config['FRAGMENT_CACHE_TTL'] = float(os.environ.get("NAMAX_FRAGMENT_CACHE_TTL", 3600))
+    app.config['JINJA_BYTECODE_CACHE'] = os.environ.get(
+        "NAMAX_JINJA_BYTECODE_CACHE", os.path.join(app.instance_path, "jinja_cache")
+    )
+
+    # Token-bucket limits ("<count>/<second|minute|hour>", empty = off) per
+    # user, else per IP (signup/login) or Socket.IO session; sqlite:///path
+    # shares the buckets between the workers on a host
+    app.config['RATE_LIMIT_URL'] = os.environ.get("NAMAX_RATE_LIMIT_URL", "memory://")
+    app.config['RATE_LIMITS'] = {
+        rule: os.environ.get(f"NAMAX_RATE_LIMIT_{rule.upper()}", default)
+        for rule, default in (
+            ("signup_ip", "60/minute"),   # logins and signups per client address
+            ("login", "10/minute"),       # attempts per account name
+            ("booking", "20/minute"),     # booking, driver listing and reservation writes
+            ("writes", "30/minute"),      # feedback, message deletes
+            ("messages", "60/minute"),    # private_message events
+            ("events", "300/minute"),     # other Socket.IO events (history, presence, reads)
+        )
+    }
+
+    # Write-behind chat: emit first, insert in batches from a background thread
+    app.config['CHAT_WRITE_BEHIND'] = os.environ.get("NAMAX_CHAT_WRITE_BEHIND") == "1"
+    app.config['CHAT_BATCH_SIZE'] = int(os.environ.get("NAMAX_CHAT_BATCH_SIZE", 200))
+    app.config['CHAT_FLUSH_INTERVAL'] = float(os.environ.get("NAMAX_CHAT_FLUSH_INTERVAL", 0.05))
+
+    # Password hashing runs in a small native thread pool (eventlet.tpool) so
+    # logins don't stall the event loop; past workers + queue, logins get a 503.
+    # Changing the method rehashes users' passwords as they log in.
+    app.config['PASSWORD_HASH_METHOD'] = os.environ.get("NAMAX_PASSWORD_HASH_METHOD", "scrypt")
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get("NAMAX_PASSWORD_HASH_WORKERS", 2))
+    app.config['PASSWORD_HASH_QUEUE'] = int(os.environ.get("NAMAX_PASSWORD_HASH_QUEUE", 32))
+
+    # Instrumentation: /metrics is always on; the Server-Timing header per
+    # response is for development (on by default with FLASK_DEBUG)
+    app.config['METRICS_TIMING_HEADER'] = os.environ.get("NAMAX_METRICS_TIMING_HEADER", "1" if app.debug else "") == "1"
+    app.config['N_PLUS_ONE_THRESHOLD'] = int(os.environ.get("NAMAX_N_PLUS_ONE_THRESHOLD", 10))
@@ -0,0 +1,82 @@
+"""Shared data versions: how a worker learns about writes made elsewhere.
+
+The route index, the user-state cache and a memory:// response cache
+each belong to one process. A write that other processes must see (a
+web request in another worker, ``flask assign-bookings`` from cron)
+bumps its scope's row in ``data_version``. The row lives in the main
+database, so every worker and job shares it. Each worker reads the few
+rows at most once per ``interval`` seconds, before a request or event,
+and runs the callbacks registered for every scope whose version moved.
+
+A bump this process made itself, with no other write in between, is
+not reported back to it: its own caches were already updated in place.
+Each row records which process bumped it last, to tell the cases apart.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from sqlalchemy import select, update, insert
+from sqlalchemy.exc import IntegrityError
+
+
+class DataVersions:
+    def __init__(self, table, interval=1.0):
+        self.table = table
+        self.interval = interval
+        self._listeners = defaultdict(list)
+        self._seen = {}
+        self._next_poll = 0.0
+        self._lock = threading.Lock()
+        self._token = None
+        self._pid = None
+
+    @property
+    def token(self):
+        """Identifies this process (a forked worker gets its own)."""
+        if self._pid != os.getpid():
+            self._pid, self._token = os.getpid(), uuid.uuid4().hex
+        return self._token
+
+    def on_change(self, scope, callback):
+        """Call ``callback(scope)`` when another process bumps ``scope`` (once, however often registered)."""
+        if callback not in self._listeners[scope]:
+            self._listeners[scope].append(callback)
+
+    def bump(self, conn, *scopes):
+        """Advance ``scopes`` in ``conn``'s transaction (a Connection or Session)."""
+        t = self.table
+        for scope in scopes:
+            bumped = conn.execute(
+                update(t).where(t.c.scope == scope).values(version=t.c.version + 1, writer=self.token)
+            ).rowcount
+            if bumped:
+                continue
+            try:
+                with conn.begin_nested():
+                    conn.execute(insert(t).values(scope=scope, version=1, writer=self.token))
+            except IntegrityError:
+                # Another process created the row in the meantime
+                self.bump(conn, scope)
+
+    def poll(self, engine, force=False):
+        """Run the callbacks of scopes bumped elsewhere since the last poll."""
+        now = time.monotonic()
+        if not force and now < self._next_poll:
+            return
+        self._next_poll = now + self.interval
+        t = self.table
+        with engine.connect() as conn:
+            rows = conn.execute(select(t.c.scope, t.c.version, t.c.writer)).all()
+        changed = []
+        with self._lock:
+            for scope, version, writer in rows:
+                seen = self._seen.get(scope)
+                if version != seen and not (seen is not None and version == seen + 1 and writer == self.token):
+                    changed.append(scope)
+                self._seen[scope] = version
+        for scope in changed:
+            for callback in self._listeners[scope]:
+                callback(scope)
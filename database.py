@@ -0,0 +1,80 @@
+"""Engine configuration: SQLite pragmas, pool sizing and read-replica routing.
+
+``engine_options`` builds ``SQLALCHEMY_ENGINE_OPTIONS`` for the primary
+URL. ``tune_sqlite`` sets WAL, busy_timeout, synchronous and mmap_size
+on every new SQLite connection. In WAL mode readers never block the
+writer. busy_timeout makes a second writer wait for the lock instead of
+failing with "database is locked".
+
+With a ``replica`` bind configured, views decorated with ``read_only``
+run their queries against it. A client that has just written something
+is pinned to the primary for ``pin_seconds``, so it sees its own writes
+despite replication lag.
+"""
+import functools
+import time
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+REPLICA = "replica"  # bind key of the read replica
+
+
+def engine_options(url, pool_size=10, max_overflow=20, pool_pre_ping=True, pool_recycle=1800):
+    """``create_engine`` keyword arguments for ``url``."""
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}  # in-memory SQLite uses a single-connection pool
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_pre_ping": pool_pre_ping,
+        "pool_recycle": pool_recycle,
+    }
+
+
+def tune_sqlite(engine, busy_timeout_ms=5000, synchronous="NORMAL", mmap_size=256 * 1024 * 1024):
+    """Apply the pragmas to every connection ``engine`` opens; no-op for other databases."""
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+        cursor.close()
+
+
+class RoutingSession(Session):
+    """Sends queries from ``read_only`` views to the replica bind, if there is one."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_request_context() and g.get("_use_replica"):
+            engines = self._db.engines
+            if REPLICA in engines:
+                return engines[REPLICA]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _pin_to_primary(db_session):
+    if has_request_context() and REPLICA in db_session._db.engines:
+        session["_db_write"] = time.time()
+
+
+def read_only(view):
+    """Run a view's GET queries on the replica unless this client wrote recently."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        pin_seconds = current_app.config.get("DATABASE_REPLICA_PIN_SECONDS", 5)
+        g._use_replica = (
+            request.method in ("GET", "HEAD")
+            and time.time() - session.get("_db_write", 0) > pin_seconds
+        )
+        return view(*args, **kwargs)
+    return wrapper
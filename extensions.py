@@ -0,0 +1,24 @@
+"""Extension objects shared by every module; bound to an app in create_app()."""
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import DeclarativeBase
+
+from database import RoutingSession
+from ratelimit import RateLimiter
+from response_cache import ResponseCache
+from socket_events import SocketIO
+
+
+# Base model for SQLAlchemy
+class Base(DeclarativeBase):
+    pass
+
+
+db = SQLAlchemy(model_class=Base, session_options={"class_": RoutingSession})
+socketio = SocketIO()
+
+# Page cache scopes: "drivers" (Driver rows), "bookings" (Namakwaland rows), "feedback".
+# The backend is chosen from config in create_app().
+response_cache = ResponseCache()
+
+# Request/event rate limits; the backend is chosen from config in create_app()
+limiter = RateLimiter()
@@ -0,0 +1,160 @@
+"""Feedback list: keyset pages, full-text search and per-day/per-user counts.
+
+Pages run newest first on the (timestamp, id) index of the hot table
+and then continue into ``feedback_archive``, so a page costs the same
+however much feedback has piled up.
+
+On SQLite with FTS5 the ``feedback_fts`` table indexes every message.
+Triggers on ``feedback`` and ``feedback_archive`` keep it in step with
+each insert, including the rollover's bulk moves. Hot rows use their
+``id`` as the FTS rowid and archived rows use ``-archive_id``. On other
+databases, or without FTS5, search falls back to one case-insensitive
+LIKE per word.
+
+``feedback_count`` holds one row per (day, user). ``record`` bumps it in
+the same transaction as the insert, so the aggregate view reads a few
+hundred rows at most rather than counting the whole feedback history.
+"""
+import re
+
+from sqlalchemy import select, update, insert, func, literal, column, table, tuple_, inspect, text
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from chat_history import encode_cursor, decode_cursor
+
+PAGE_SIZE = 20
+
+FTS_TABLE = "feedback_fts"
+fts = table(FTS_TABLE, column("rowid"), column("message"))
+
+FTS_SCHEMA = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(message, tokenize='unicode61 remove_diacritics 2')",
+    f"""CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON feedback BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, message) VALUES (new.id, new.message);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON feedback BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_archive_insert AFTER INSERT ON feedback_archive BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, message) VALUES (-new.archive_id, new.message);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_archive_delete AFTER DELETE ON feedback_archive BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = -old.archive_id;
+    END""",
+]
+
+_has_fts = {}  # database URL -> whether feedback_fts exists there
+
+
+def create_fts(conn):
+    """Create and fill ``feedback_fts`` on SQLite builds with FTS5; returns whether it exists."""
+    if conn.dialect.name != "sqlite":
+        return False
+    if inspect(conn).has_table(FTS_TABLE):
+        return True
+    try:
+        with conn.begin_nested():
+            for statement in FTS_SCHEMA:
+                conn.exec_driver_sql(statement)
+    except OperationalError:
+        return False  # no FTS5 in this SQLite build: search uses LIKE
+    conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE} (rowid, message) SELECT id, message FROM feedback")
+    conn.exec_driver_sql(
+        f"INSERT INTO {FTS_TABLE} (rowid, message) SELECT -archive_id, message FROM feedback_archive"
+    )
+    return True
+
+
+def uses_fts(session):
+    bind = session.get_bind()
+    key = str(bind.url)
+    if key not in _has_fts:
+        _has_fts[key] = bind.dialect.name == "sqlite" and inspect(bind).has_table(FTS_TABLE)
+    return _has_fts[key]
+
+
+def search_words(q):
+    return re.findall(r"[^\W_]+", q or "")[:8]  # the words FTS5 would tokenize
+
+
+def fts_query(words):
+    """Every word as a quoted prefix term, so user input can't form FTS syntax."""
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def _match(session, rows, rowid, words):
+    """Restrict ``rows`` to messages containing every word in ``words``."""
+    if uses_fts(session):
+        hits = select(fts.c.rowid).where(text(f"{FTS_TABLE} MATCH :q").bindparams(q=fts_query(words)))
+        return rows.where(rowid.in_(hits))
+    return rows.where(*[rows.selected_columns.message.icontains(word, autoescape=True) for word in words])
+
+
+# --------------------------
+# Writes
+# --------------------------
+def record(conn, counts, user_name, day):
+    """Count one more feedback entry by ``user_name`` on ``day`` (call in the insert's transaction)."""
+    updated = conn.execute(
+        update(counts)
+        .where(counts.c.day == day, counts.c.user_name == user_name)
+        .values(count=counts.c.count + 1)
+    ).rowcount
+    if updated:
+        return
+    try:
+        with conn.begin_nested():
+            conn.execute(insert(counts).values(day=day, user_name=user_name, count=1))
+    except IntegrityError:
+        # Another worker created the row in the meantime
+        record(conn, counts, user_name, day)
+
+
+# --------------------------
+# Reads
+# --------------------------
+def fetch_page(session, hot, archive, before=None, q=None, limit=PAGE_SIZE):
+    """Newest feedback older than ``before`` matching ``q``, and the cursor for the next page.
+
+    Archived rows carry ``archived = True``. The cursor is None on the
+    last page.
+    """
+    position = decode_cursor(before) if before else None
+    words = search_words(q)
+
+    def newest(source, rowid, archived, limit):
+        rows = select(source, literal(archived).label("archived"))
+        if position:
+            rows = rows.where(tuple_(source.c.timestamp, source.c.id) < tuple_(*position))
+        if words:
+            rows = _match(session, rows, rowid, words)
+        return session.execute(
+            rows.order_by(source.c.timestamp.desc(), source.c.id.desc()).limit(limit)
+        ).all()
+
+    rows = newest(hot, hot.c.id, False, limit + 1)
+    if len(rows) <= limit:
+        rows += newest(archive, -archive.c.archive_id, True, limit + 1 - len(rows))
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, (encode_cursor(rows[-1]) if has_more else None)
+
+
+def stats(session, counts, days=30, users=20):
+    """Totals per day (latest ``days``) and per user (top ``users``), plus the overall total."""
+    total = func.sum(counts.c.count)
+    return {
+        "total": session.execute(select(func.coalesce(total, 0))).scalar(),
+        "per_day": session.execute(
+            select(counts.c.day, total.label("count"))
+            .group_by(counts.c.day)
+            .order_by(counts.c.day.desc())
+            .limit(days)
+        ).all(),
+        "per_user": session.execute(
+            select(counts.c.user_name, total.label("count"))
+            .group_by(counts.c.user_name)
+            .order_by(total.desc(), counts.c.user_name)
+            .limit(users)
+        ).all(),
+    }
@@ -1,4 +1,6 @@
 from flask_wtf import FlaskForm
+from jinja2.utils import htmlsafe_json_dumps
+from markupsafe import Markup, escape
 from wtforms import StringField, SubmitField,SelectField,PasswordField,IntegerField
 from wtforms.validators import DataRequired,ValidationError,Length,NumberRange
 
@@ -7,9 +9,26 @@ TOWNS = [
     "Garies","Steinkopf","Vioolsdrif","Nababeep","Kleinzee","Port Nolloth","Okiep",
     "Bulletrap","Aggeneys","Kamieskroon","Bergsig","Carolusberg","Pella",
     "Springbok","Concordia(Dorpie)","Komaggas","Buffelsrivier","Alexanderbaai",
-    "Lekkersing","Eksteenfontein","Pofadder","Bergsig","Matjieskloof","Hondeklipbaai","Koingnaas"
+    "Lekkersing","Eksteenfontein","Pofadder","Matjieskloof","Hondeklipbaai","Koingnaas"
 ]
 
+
+def _town_options(selected):
+    return Markup("".join(
+        f'<option value="{escape(t)}"{" selected" if t == selected else ""}>{escape(t)}</option>' for t in TOWNS
+    ))
+
+
+# <option> markup for a town <select>, built once per selected town
+TOWN_OPTIONS = {town: _town_options(town) for town in TOWNS}
+TOWN_OPTIONS[None] = _town_options(None)
+TOWNS_JSON = htmlsafe_json_dumps(TOWNS)  # what {{ TOWNS|tojson }} renders
+
+
+def town_options(selected=None):
+    return TOWN_OPTIONS.get(selected, TOWN_OPTIONS[None])
+
+
 class BookingForm(FlaskForm):
     pickup = SelectField(
         'Pickup Location',
@@ -0,0 +1,72 @@
+"""``{% cache %}`` blocks: rendered template fragments kept in an in-process LRU.
+
+    {% cache "drivers", driver.id, detours.get(driver.id) %}
+      <tr>...</tr>
+    {% endcache %}
+
+The first argument is the data scope (or a tuple of scopes) the fragment
+is built from, as in response_cache.py. The rest identify the fragment.
+The key also holds the template name and line and the scope's current
+version. A write route that bumps the scope therefore retires every
+fragment built from the old data, in every worker, with nothing to
+delete. Scope versions are looked up once per request.
+
+Pages that differ per viewer (the drivers list leaves out the viewer's
+own listing) can share their rows this way even when the whole-response
+cache can't share the page.
+"""
+from flask import g, has_app_context
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+from user_state import TTLCache
+
+
+class FragmentCache(Extension):
+    tags = {"cache"}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None, fragment_versions=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [nodes.Const(f"{parser.name}:{lineno}"), parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(self.call_method("_render", [nodes.List(args)]), [], [], body).set_lineno(lineno)
+
+    def _render(self, args, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+        where, scopes, *key = args
+        scopes = (scopes,) if isinstance(scopes, str) else tuple(scopes)
+        full_key = (where, tuple(scope_version(self.environment, scope) for scope in scopes), *key)
+        fragment = cache.get(full_key)
+        if fragment is None:
+            fragment = caller()
+            cache.set(full_key, fragment)
+        return fragment
+
+
+def scope_version(environment, scope):
+    """The data version of ``scope``, memoized for the current request."""
+    if not has_app_context():
+        return environment.fragment_versions(scope)
+    versions = g.setdefault("_fragment_versions", {})
+    if scope not in versions:
+        versions[scope] = environment.fragment_versions(scope)
+    return versions[scope]
+
+
+def init_app(app, versions):
+    """Enable ``{% cache %}`` in ``app``'s templates; ``versions(scope)`` gives a scope's data version.
+
+    FRAGMENT_CACHE_SIZE = 0 renders every block without caching.
+    """
+    app.jinja_env.add_extension(FragmentCache)
+    size = app.config['FRAGMENT_CACHE_SIZE']
+    app.jinja_env.fragment_cache = TTLCache(size, app.config['FRAGMENT_CACHE_TTL']) if size else None
+    app.jinja_env.fragment_versions = versions
@@ -0,0 +1,210 @@
+"""Town coordinates, an all-pairs distance/ETA matrix and "on the way" ranking.
+
+The matrix is computed once with NumPy and cached on disk (keyed by a
+hash of the coordinate table). Ranking scores every candidate driver at
+once: a driver's route is its pickups followed by its dropoffs, and the
+detour for a rider is the cheapest extra distance to insert the rider's
+pickup and then dropoff into that route.
+"""
+import hashlib
+import json
+import os
+from itertools import chain
+
+import numpy as np
+
+from matching import split_stops
+
+
+# Approximate town centres (latitude, longitude)
+TOWN_COORDS = {
+    "Garies": (-30.5667, 17.9833),
+    "Steinkopf": (-29.2667, 17.7333),
+    "Vioolsdrif": (-28.7667, 17.6167),
+    "Nababeep": (-29.5833, 17.7833),
+    "Kleinzee": (-29.6833, 17.0667),
+    "Port Nolloth": (-29.2500, 16.8667),
+    "Okiep": (-29.6000, 17.8833),
+    "Bulletrap": (-29.5167, 17.7333),
+    "Aggeneys": (-29.2000, 18.8500),
+    "Kamieskroon": (-30.2000, 17.9333),
+    "Bergsig": (-29.6700, 17.8700),
+    "Carolusberg": (-29.6200, 17.9500),
+    "Pella": (-29.0333, 19.1500),
+    "Springbok": (-29.6643, 17.8865),
+    "Concordia(Dorpie)": (-29.5333, 18.0333),
+    "Komaggas": (-29.8000, 17.4833),
+    "Buffelsrivier": (-29.6900, 17.5700),
+    "Alexanderbaai": (-28.6000, 16.4833),
+    "Lekkersing": (-28.9667, 17.0500),
+    "Eksteenfontein": (-28.8167, 17.2500),
+    "Pofadder": (-29.1333, 19.3833),
+    "Matjieskloof": (-29.6833, 17.8667),
+    "Hondeklipbaai": (-30.3167, 17.2667),
+    "Koingnaas": (-30.2000, 17.2667),
+}
+
+MAX_STOPS = 10           # be_a_driver keeps at most 5 pickups and 5 dropoffs
+EARTH_RADIUS_KM = 6371.0
+ROAD_FACTOR = 1.3        # straight-line to road distance
+AVERAGE_SPEED_KMH = 80.0
+
+
+def haversine_matrix(coords):
+    """Great-circle distances in km between every pair of (lat, lon) rows."""
+    lat, lon = np.radians(coords[:, 0]), np.radians(coords[:, 1])
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class TownMatrix:
+    """Road-distance (km) and ETA (minutes) between every pair of towns.
+
+    One extra "anywhere" row/column with zero cost lets a route be padded
+    at both ends, so inserting a stop before the first or after the last
+    town costs just the one leg.
+    """
+
+    def __init__(self, towns, km):
+        self.towns = list(towns)
+        self.index = {town: i for i, town in enumerate(self.towns)}
+        self.anywhere = len(self.towns)
+        self.km = km
+        self.minutes = km / AVERAGE_SPEED_KMH * 60
+        self._padded = np.zeros((len(towns) + 1, len(towns) + 1))
+        self._padded[:-1, :-1] = km
+        self._routes = {}
+        self._stop_pairs = {}
+
+    @classmethod
+    def build(cls, coords=TOWN_COORDS):
+        towns = list(coords)
+        km = haversine_matrix(np.array([coords[t] for t in towns])) * ROAD_FACTOR
+        return cls(towns, km)
+
+    @classmethod
+    def load(cls, cache_dir, coords=TOWN_COORDS):
+        """Load from ``cache_dir`` if the cached matrix matches ``coords``, else build and save."""
+        key = hashlib.sha1(json.dumps([coords, ROAD_FACTOR], sort_keys=True).encode()).hexdigest()[:12]
+        path = os.path.join(cache_dir, f"town_matrix_{key}.npz")
+        if os.path.exists(path):
+            with np.load(path) as data:
+                return cls([str(t) for t in data["towns"]], data["km"])
+        matrix = cls.build(coords)
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez(path, towns=np.array(matrix.towns), km=matrix.km)
+        return matrix
+
+    def distance(self, a, b):
+        return float(self.km[self.index[a], self.index[b]])
+
+    def _route(self, pickup_csv, dropoff_csv):
+        """Fixed-width route row: anywhere, stops..., then anywhere as padding."""
+        key = (pickup_csv, dropoff_csv)
+        row = self._routes.get(key)
+        if row is None:
+            stops = [self.index[t] for t in split_stops(pickup_csv) + split_stops(dropoff_csv) if t in self.index]
+            stops = stops[:MAX_STOPS]
+            row = (self.anywhere, *stops) + (self.anywhere,) * (MAX_STOPS + 1 - len(stops))
+            if len(self._routes) >= 4096:
+                self._routes.clear()
+            self._routes[key] = row
+        return row
+
+    def route_array(self, drivers):
+        """Route rows for ``drivers``; reuse it across several ``detours`` calls."""
+        rows = [self._route(d.pickup, d.dropoff) for d in drivers]
+        route = np.fromiter(chain.from_iterable(rows), dtype=np.intp, count=len(rows) * (MAX_STOPS + 2))
+        return route.reshape(len(rows), MAX_STOPS + 2)
+
+    def detours(self, drivers, pickup, dropoff, route=None):
+        """Extra km each driver would drive to carry a rider from pickup to dropoff."""
+        if not drivers or pickup not in self.index or dropoff not in self.index:
+            return np.full(len(drivers), np.inf)
+
+        if route is None:
+            route = self.route_array(drivers)
+        n = self.anywhere
+        D = self._padded
+        a, b = self.index[pickup], self.index[dropoff]
+        start, end = route[:, :-1], route[:, 1:]
+        # anywhere -> anywhere legs are padding (or a driver with no known towns)
+        valid = (start != n) | (end != n)
+        leg = D[start, end]
+
+        to_a, from_a = D[:, a][start], D[a][end]
+        to_b, from_b = D[:, b][start], D[b][end]
+        insert_a = np.where(valid, to_a + from_a - leg, np.inf)
+        insert_b = np.where(valid, to_b + from_b - leg, np.inf)
+        both = np.where(valid, to_a + D[a, b] + from_b - leg, np.inf)
+
+        # Pickup in an earlier leg than dropoff: best pickup leg so far + dropoff leg
+        best_a_before = np.minimum.accumulate(insert_a, axis=1)[:, :-1]
+        split = (best_a_before + insert_b[:, 1:]).min(axis=1)
+        return np.maximum(np.minimum(split, both.min(axis=1)), 0.0)
+
+    def served_routes(self, pickup_csv, dropoff_csv, max_detour_km):
+        """``{(pickup, dropoff): detour_minutes}`` for every town pair one driver serves within the cap.
+
+        The same insertion costs as ``detours``, for one route and every
+        rider pickup and dropoff at once.
+        """
+        route = np.array(self._route(pickup_csv, dropoff_csv))
+        start, end = route[:-1], route[1:]
+        towns = len(self.towns)
+        D = self._padded
+        valid = (start != self.anywhere) | (end != self.anywhere)
+        leg = D[start, end]
+        to_t, from_t = D[start, :towns].T, D[:towns, end]               # (town, leg)
+        insert = np.where(valid, to_t + from_t - leg, np.inf)
+        both = np.where(valid, to_t[:, None, :] + self.km[:, :, None] + from_t[None, :, :] - leg, np.inf)
+        best_pickup_before = np.minimum.accumulate(insert, axis=1)[:, :-1]
+        split = (best_pickup_before[:, None, :] + insert[None, :, 1:]).min(axis=2)
+        km = np.maximum(np.minimum(split, both.min(axis=2)), 0.0)
+        np.fill_diagonal(km, np.inf)
+        return {
+            (self.towns[a], self.towns[b]): float(km[a, b]) / AVERAGE_SPEED_KMH * 60
+            for a, b in zip(*np.nonzero(km <= max_detour_km))
+        }
+
+    def stop_pairs(self, town, max_detour_km):
+        """Unordered stop pairs ``(s, e)`` a driver can take in ``town`` between, within the cap.
+
+        ``(s, s)`` means ``town`` is within reach of the single stop ``s``
+        (before a route's first stop or after its last). Any detour for a
+        rider is at least the cost of inserting each of its towns alone,
+        so a driver without such a pair for both towns cannot be ranked
+        within the cap: the pairs are a safe prefilter (Driver.near_route).
+        """
+        key = (town, max_detour_km)
+        pairs = self._stop_pairs.get(key)
+        if pairs is None:
+            pairs = []
+            if town in self.index:
+                to_t = self.km[:, self.index[town]]
+                insert = to_t[:, None] + to_t[None, :] - self.km
+                np.fill_diagonal(insert, to_t)
+                first, second = np.nonzero(np.triu(insert <= max_detour_km))
+                pairs = [(self.towns[a], self.towns[b]) for a, b in zip(first.tolist(), second.tolist())]
+            self._stop_pairs[key] = pairs
+        return pairs
+
+    def reach(self, pickup_csv, dropoff_csv, max_detour_km):
+        """Towns for which a driver with these stops has a pair in ``stop_pairs`` (the same prefilter, in memory)."""
+        stops = sorted({self.index[t] for t in split_stops(pickup_csv) + split_stops(dropoff_csv) if t in self.index})
+        if not stops:
+            return set()
+        to_t = self.km[stops]                                            # (stop, town)
+        single = to_t.min(axis=0)
+        between = (to_t[:, None, :] + to_t[None, :, :] - self.km[np.ix_(stops, stops)][:, :, None]).min(axis=(0, 1))
+        return {self.towns[i] for i in np.nonzero(np.minimum(single, between) <= max_detour_km)[0].tolist()}
+
+    def rank(self, drivers, pickup, dropoff, max_detour_km=None):
+        """``(driver, detour_km, detour_minutes)`` sorted by detour, optionally capped."""
+        costs = self.detours(drivers, pickup, dropoff)
+        order = np.argsort(costs, kind="stable")
+        limit = np.inf if max_detour_km is None else max_detour_km
+        keep = order[costs[order] <= limit]
+        return [(drivers[i], km, km / AVERAGE_SPEED_KMH * 60) for i, km in zip(keep.tolist(), costs[keep].tolist())]
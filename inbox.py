@@ -0,0 +1,92 @@
+"""Per-user conversation summaries: last message and unread count.
+
+``conversation_summary`` has one row per (owner, other) pair, so each
+message touches two rows: the recipient's (unread + 1) and the sender's
+(unread unchanged). Both rows are written in the same transaction as
+the message itself. The inbox and the unread badge then read only the
+owner's rows through the primary key, however much chat history exists.
+
+Every function takes a Connection or a Session and the summary Table.
+"""
+from sqlalchemy import select, update, insert, func
+from sqlalchemy.exc import IntegrityError
+
+
+def _upsert(conn, table, owner, other, values, unread_add):
+    updated = conn.execute(
+        update(table)
+        .where(table.c.owner == owner, table.c.other == other)
+        .values(unread=table.c.unread + unread_add, **values)
+    ).rowcount
+    if updated:
+        return
+    try:
+        with conn.begin_nested():
+            conn.execute(insert(table).values(owner=owner, other=other, unread=unread_add, **values))
+    except IntegrityError:
+        # Another worker created the row in the meantime
+        _upsert(conn, table, owner, other, values, unread_add)
+
+
+def summarize(messages):
+    """Summary rows (as dicts) for message dicts with sender, recipient, message, id, timestamp, conversation.
+
+    Messages are grouped per (owner, other), so a burst in one
+    conversation becomes one row per participant.
+    """
+    summaries = {}
+    for m in messages:
+        for owner, other, unread in ((m["recipient"], m["sender"], 1), (m["sender"], m["recipient"], 0)):
+            last, count = summaries.get((owner, other), (None, 0))
+            if last is None or (m["timestamp"], m["id"]) >= (last["timestamp"], last["id"]):
+                last = m
+            summaries[(owner, other)] = (last, count + unread)
+
+    return [
+        {
+            "owner": owner,
+            "other": other,
+            "conversation": last["conversation"],
+            "last_message": last["message"],
+            "last_sender": last["sender"],
+            "last_message_id": last["id"],
+            "last_timestamp": last["timestamp"],
+            "unread": unread,
+        }
+        for (owner, other), (last, unread) in summaries.items()
+    ]
+
+
+def record_messages(conn, table, messages):
+    """Fold new messages into the summaries: two statements per conversation touched."""
+    for row in summarize(messages):
+        owner, other, unread = row.pop("owner"), row.pop("other"), row.pop("unread")
+        _upsert(conn, table, owner, other, row, unread)
+
+
+def mark_read(conn, table, owner, other):
+    """Zero ``owner``'s unread count for ``other``; returns how many were unread."""
+    unread = conn.execute(
+        select(table.c.unread).where(table.c.owner == owner, table.c.other == other)
+    ).scalar()
+    if unread:
+        conn.execute(
+            update(table).where(table.c.owner == owner, table.c.other == other).values(unread=0)
+        )
+    return unread or 0
+
+
+def unread_total(conn, table, owner):
+    return conn.execute(
+        select(func.coalesce(func.sum(table.c.unread), 0)).where(table.c.owner == owner)
+    ).scalar()
+
+
+def conversations(conn, table, owner, limit=50):
+    """``owner``'s conversations, most recent first."""
+    return conn.execute(
+        select(table)
+        .where(table.c.owner == owner)
+        .order_by(table.c.last_timestamp.desc())
+        .limit(limit)
+    ).all()
@@ -0,0 +1,216 @@
+"""Batch jobs (assignment, daily rollover, schema migration) and their CLI commands."""
+from collections import defaultdict
+from datetime import datetime, date, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func, select, update
+from werkzeug.security import generate_password_hash
+
+import assets
+import services
+from archive import move_rows, snapshot_rows
+from extensions import db, socketio
+from migrations import run_migrations
+from models import (Namakwaland, NamakwaUsers, Driver, ChatMessage, Feedback,
+                    namakwaland_archive, driver_archive, chat_message_archive, feedback_archive)
+
+
+@click.command("migrate")
+@with_appcontext
+def migrate_command():
+    """Create tables and apply schema migrations and backfills."""
+    run_migrations(db)
+    print("Database is up to date.")
+
+
+@click.command("build-assets")
+@with_appcontext
+def build_assets_command():
+    """Fingerprint and precompress static/ into static/dist/."""
+    manifest = assets.build(current_app.static_folder)
+    print(f"Built {len(manifest['files'])} assets, version {manifest['version']}.")
+
+
+@click.command("compile-templates")
+@with_appcontext
+def compile_templates_command():
+    """Compile every template into the Jinja bytecode cache (NAMAX_JINJA_BYTECODE_CACHE)."""
+    env = current_app.jinja_env
+    names = env.list_templates()
+    for name in names:
+        env.get_template(name)
+    print(f"Compiled {len(names)} templates.")
+
+
+# --------------------------
+# Booking Assignment
+# --------------------------
+def run_assignment():
+    """Assign today's pending bookings to drivers with free seats; returns how many."""
+    from assignment import assign  # NumPy; only needed when the job runs
+
+    today = date.today()
+    bookings = db.session.execute(
+        select(Namakwaland.id, Namakwaland.pickup, Namakwaland.dropoff)
+        .where(Namakwaland.service_date == today, Namakwaland.status == "Pending")
+        .order_by(Namakwaland.timestamp, Namakwaland.id)
+    ).all()
+    drivers = db.session.execute(
+        select(
+            Driver.id, Driver.pickup, Driver.dropoff,
+            (func.coalesce(Driver.seats, 0) - Driver.seats_taken).label("free_seats")
+        ).where(Driver.service_date == today, Driver.is_available == True)
+    ).all()
+
+    assignments, seats_used = assign(bookings, drivers, services.town_matrix(), current_app.config['MAX_DETOUR_KM'])
+    if not assignments:
+        return 0
+
+    # Write-back per driver, in one transaction. A booking only counts if
+    # it was still pending, and a driver's seats are only taken while they
+    # fit: a seat reservation may have filled the car since we read it.
+    # Otherwise that driver's bookings are rolled back to pending.
+    bookings_table = Namakwaland.__table__
+    drivers_table = Driver.__table__
+    by_driver = defaultdict(list)
+    for a in assignments:
+        by_driver[a.driver_id].append(a.booking_id)
+
+    assigned = 0
+    for driver_id, booking_ids in by_driver.items():
+        with db.session.begin_nested() as savepoint:
+            confirmed = sum(
+                db.session.execute(
+                    update(bookings_table)
+                    .where(bookings_table.c.id == booking_id, bookings_table.c.status == "Pending")
+                    .values(driver_id=driver_id, status="Confirmed")
+                ).rowcount
+                for booking_id in booking_ids
+            )
+            if not confirmed:
+                continue
+            seated = db.session.execute(
+                update(drivers_table)
+                .where(
+                    drivers_table.c.id == driver_id,
+                    drivers_table.c.seats_taken + confirmed <= func.coalesce(drivers_table.c.seats, 0)
+                )
+                .values(seats_taken=drivers_table.c.seats_taken + confirmed)
+            ).rowcount
+            if not seated:
+                savepoint.rollback()
+                continue
+            assigned += confirmed
+
+    if assigned:
+        services.data_changed(db.session, "drivers", "bookings")
+    db.session.commit()
+    if assigned:
+        services.route_index.invalidate()
+        services.user_state.clear()
+    return assigned
+
+
+@click.command("assign-bookings")
+@with_appcontext
+def assign_bookings_command():
+    """Assign today's pending bookings to available drivers."""
+    print(f"Assigned {run_assignment()} bookings.")
+
+
+def start_assignment_scheduler(app, interval):
+    """Run the assignment job every ``interval`` seconds in this process."""
+    def loop():
+        while True:
+            socketio.sleep(interval)
+            with app.app_context():
+                try:
+                    run_assignment()
+                except Exception:
+                    db.session.rollback()
+                    app.logger.exception("Booking assignment failed")
+
+    return socketio.start_background_task(loop)
+
+
+# --------------------------
+# Daily Rollover
+# --------------------------
+def run_rollover(today=None):
+    """Move past rows into the archive tables and stand down yesterday's drivers."""
+    today = today or date.today()
+    midnight = datetime.combine(today, datetime.min.time())
+    bookings, drivers = Namakwaland.__table__, Driver.__table__
+    chats, feedback_rows = ChatMessage.__table__, Feedback.__table__
+
+    moved = {
+        "bookings": move_rows(db.engine, bookings, namakwaland_archive, bookings.c.service_date < today),
+        "drivers": snapshot_rows(
+            db.engine, drivers, driver_archive,
+            (drivers.c.service_date < today) & (drivers.c.is_available == True),
+            is_available=False, seats_taken=0
+        ),
+        "chat": move_rows(
+            db.engine, chats, chat_message_archive,
+            chats.c.timestamp < midnight - timedelta(days=current_app.config['ARCHIVE_CHAT_AFTER_DAYS'])
+        ),
+        "feedback": move_rows(
+            db.engine, feedback_rows, feedback_archive,
+            feedback_rows.c.timestamp < midnight - timedelta(days=current_app.config['ARCHIVE_FEEDBACK_AFTER_DAYS'])
+        ),
+    }
+    # The rows moved in batches of their own; the bump gets one more
+    services.data_changed(db.session, "drivers", "bookings", "feedback")
+    db.session.commit()
+    services.route_index.invalidate()
+    services.user_state.clear()
+    return moved
+
+
+@click.command("rollover")
+@with_appcontext
+def rollover_command():
+    """Archive past days' rows and reset stale driver availability."""
+    for name, count in run_rollover().items():
+        print(f"{name}: {count} archived")
+
+
+def start_rollover_scheduler(app):
+    """Run the rollover a minute after every midnight in this process."""
+    def loop():
+        while True:
+            now = datetime.now()
+            next_run = datetime.combine(now.date() + timedelta(days=1), datetime.min.time()) + timedelta(minutes=1)
+            socketio.sleep((next_run - now).total_seconds())
+            with app.app_context():
+                try:
+                    run_rollover()
+                except Exception:
+                    db.session.rollback()
+                    app.logger.exception("Daily rollover failed")
+
+    return socketio.start_background_task(loop)
+
+
+# --------------------------
+# Test Data Function
+# --------------------------
+def create_test_data():
+
+    # Create test users if they don't exist
+    if not NamakwaUsers.query.filter_by(name="Rider1").first():
+        rider = NamakwaUsers(name="Rider1", password=generate_password_hash("Pass123"))
+        driver = NamakwaUsers(name="Driver1", password=generate_password_hash("Pass123"))
+        db.session.add_all([rider, driver])
+        db.session.commit()
+
+    # Create a booking for Rider1 if it doesn't exist
+    if not Namakwaland.query.filter_by(user_name="Rider1", dropoff="Nababeep").first():
+        booking = Namakwaland(user_name="Rider1", pickup="Steinkopf", dropoff="Nababeep", status="Pending")
+        db.session.add(booking)
+        db.session.commit()
+
+
+COMMANDS = (migrate_command, build_assets_command, compile_templates_command, assign_bookings_command, rollover_command)
@@ -0,0 +1,220 @@
+"""In-memory route index for today's available drivers and pending bookings.
+
+Riders are indexed under their booked (pickup, dropoff) pair, so a
+driver's lookup only touches the riders on their stops. Drivers are
+indexed under every route they may serve within the detour limit, not
+just the pairs of their own stops, so a route lookup only touches the
+drivers worth ranking by detour (geo.py). Driver route buckets are
+filled lazily, one indexed prefilter query per (pickup, dropoff) per day.
+"""
+import threading
+import time
+from collections import namedtuple, defaultdict
+from datetime import date
+
+
+DriverEntry = namedtuple("DriverEntry", "id user_name pickup dropoff seats timestamp")
+RiderEntry = namedtuple("RiderEntry", "id user_name pickup dropoff status timestamp")
+
+
+def split_stops(value):
+    """Split a comma-joined stop list (as stored on Driver) into towns."""
+    if not value:
+        return []
+    return [town.strip() for town in str(value).split(",") if town.strip()]
+
+
+def route_keys(pickups, dropoffs):
+    """Every (pickup, dropoff) pair a driver with these stops can serve."""
+    return {(p, d) for p in pickups for d in dropoffs if p != d}
+
+
+class RouteIndex:
+    """Today's drivers and pending bookings, keyed by (pickup, dropoff).
+
+    The loaders are called inside an app context and return today's rows:
+    ``rider_loader()`` once per day, ``driver_loader()`` the first time the
+    full driver list is needed and ``driver_route_loader(pickup, dropoff)``
+    the first time a route is looked up. ``driver_reach(pickup_csv,
+    dropoff_csv)`` gives the towns a driver may serve, with the same rule
+    as the route loader; a driver written later is added to every loaded
+    route between two of those towns. Without both, or for a town not in
+    ``towns``, route lookups fall back to the full driver list. After
+    loading, the index is kept current by this process's write routes
+    calling ``add_*``/``remove_*``.
+    Writes made by other processes invalidate it through the shared data
+    versions (see data_version.py); as a backstop it is also reloaded once
+    it is ``max_age`` seconds old.
+    """
+
+    def __init__(self, driver_loader, rider_loader, driver_route_loader=None, driver_reach=None,
+                 towns=(), max_age=None):
+        self._driver_loader = driver_loader
+        self._rider_loader = rider_loader
+        self._driver_route_loader = driver_route_loader
+        self.driver_reach = driver_reach
+        self.towns = set(towns)
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._day = None
+        self._expires = None
+        self._drivers = {}
+        self._all_drivers_loaded = False
+        self._sorted_drivers = None
+        self._driver_routes = {}  # (pickup, dropoff) -> {driver id: entry}
+        self._driver_keys = {}    # driver id -> loaded routes it is in
+        self._riders = {}
+        self._rider_routes = defaultdict(dict)
+
+    # --------------------------
+    # Loading
+    # --------------------------
+    def _is_current(self, today):
+        return self._day == today and (self._expires is None or time.monotonic() < self._expires)
+
+    def _ensure_loaded(self):
+        today = date.today()
+        if self._is_current(today):
+            return
+        with self._lock:
+            if self._is_current(today):
+                return
+            self._drivers.clear()
+            self._all_drivers_loaded = False
+            self._sorted_drivers = None
+            self._driver_routes.clear()
+            self._driver_keys.clear()
+            self._riders.clear()
+            self._rider_routes.clear()
+            riders = self._rider_loader()
+            self._day = today
+            self._expires = time.monotonic() + self.max_age if self.max_age else None
+            for row in riders:
+                self._put_rider(row)
+
+    def _load_all_drivers(self):
+        with self._lock:
+            if self._all_drivers_loaded:
+                return
+            rows = self._driver_loader()
+            self._all_drivers_loaded = True
+            for row in rows:
+                self._put_driver(row)
+
+    def _driver_bucket(self, key):
+        with self._lock:
+            bucket = self._driver_routes.get(key)
+            if bucket is not None:
+                return bucket
+            rows = self._driver_route_loader(*key)
+            self._driver_routes[key] = {}
+            for row in rows:
+                self._put_driver(row)
+            # A driver already indexed but missed by the query is not on this route
+            return self._driver_routes[key]
+
+    def invalidate(self):
+        """Drop everything; the next lookup reloads from the database."""
+        with self._lock:
+            self._day = None
+
+    def _is_today(self, row):
+        return row.service_date == self._day
+
+    # --------------------------
+    # Writes
+    # --------------------------
+    def _put_driver(self, row):
+        self._drop_driver(row.id)
+        if not row.is_available or not self._is_today(row):
+            return
+        free_seats = (row.seats or 0) - (row.seats_taken or 0)
+        entry = DriverEntry(row.id, row.user_name, row.pickup, row.dropoff, free_seats, row.timestamp)
+        self._drivers[row.id] = entry
+        self._sorted_drivers = None
+        if not self._driver_routes:
+            return
+        reach = self.driver_reach(row.pickup, row.dropoff)
+        keys = [key for key in self._driver_routes if key[0] in reach and key[1] in reach]
+        for key in keys:
+            self._driver_routes[key][row.id] = entry
+        self._driver_keys[row.id] = keys
+
+    def _drop_driver(self, driver_id):
+        if self._drivers.pop(driver_id, None) is None:
+            return
+        self._sorted_drivers = None
+        for key in self._driver_keys.pop(driver_id, ()):
+            self._driver_routes[key].pop(driver_id, None)
+
+    def _put_rider(self, row):
+        self._drop_rider(row.id)
+        if row.status != "Pending" or not self._is_today(row):
+            return
+        entry = RiderEntry(row.id, row.user_name, row.pickup, row.dropoff, row.status, row.timestamp)
+        self._riders[row.id] = entry
+        self._rider_routes[(row.pickup, row.dropoff)][row.id] = entry
+
+    def _drop_rider(self, booking_id):
+        entry = self._riders.pop(booking_id, None)
+        if entry is None:
+            return
+        key = (entry.pickup, entry.dropoff)
+        bucket = self._rider_routes.get(key)
+        if bucket is not None:
+            bucket.pop(booking_id, None)
+            if not bucket:
+                del self._rider_routes[key]
+
+    def add_driver(self, row):
+        """Insert or replace a committed Driver row."""
+        with self._lock:
+            if self._day is not None:
+                self._put_driver(row)
+
+    def remove_driver(self, driver_id):
+        with self._lock:
+            self._drop_driver(driver_id)
+
+    def add_rider(self, row):
+        """Insert or replace a committed Namakwaland booking."""
+        with self._lock:
+            if self._day is not None:
+                self._put_rider(row)
+
+    def remove_rider(self, booking_id):
+        with self._lock:
+            self._drop_rider(booking_id)
+
+    # --------------------------
+    # Lookups
+    # --------------------------
+    def drivers_today(self, exclude=None):
+        self._ensure_loaded()
+        self._load_all_drivers()
+        with self._lock:
+            if self._sorted_drivers is None:
+                self._sorted_drivers = sorted(self._drivers.values(), key=lambda d: d.timestamp)
+            drivers = self._sorted_drivers
+        return [d for d in drivers if d.user_name != exclude]
+
+    def drivers_for_route(self, pickup, dropoff, exclude=None):
+        """Drivers who may serve ``pickup`` -> ``dropoff`` within the detour limit; rank them to be sure."""
+        if self._driver_route_loader is None or self.driver_reach is None:
+            return self.drivers_today(exclude)
+        if pickup not in self.towns or dropoff not in self.towns:
+            return []
+        self._ensure_loaded()
+        with self._lock:
+            bucket = self._driver_bucket((pickup, dropoff))
+            drivers = [d for d in bucket.values() if d.user_name != exclude]
+        return sorted(drivers, key=lambda d: d.timestamp)
+
+    def riders_for_stops(self, pickups, dropoffs):
+        """Pending riders whose booking lies on any of the given stop pairs."""
+        self._ensure_loaded()
+        found = {}
+        with self._lock:
+            for key in route_keys(pickups, dropoffs):
+                found.update(self._rider_routes.get(key, {}))
+        return sorted(found.values(), key=lambda r: r.timestamp)
@@ -0,0 +1,258 @@
+"""Request, SQL and Socket.IO instrumentation in Prometheus text format.
+
+``Registry`` holds counters, histograms and callback gauges and renders
+them for ``/metrics``. ``instrument_app`` times every Flask request and
+every SQL statement (through SQLAlchemy engine events). SQL statements
+are also counted per request, and a statement that repeats
+``n_plus_one`` times within one request or Socket.IO event is logged as a
+likely N+1. ``socketio_timer`` is a socket_events middleware that times
+handlers per event name.
+
+The hot path is a couple of ``perf_counter`` calls, a bisect and a
+short lock per observation, cheap enough to leave on in production.
+"""
+import bisect
+import logging
+import threading
+import time
+from collections import Counter as _Tally
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            yield self.name, _labels(self.labels, label_values), value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, *label_values):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for label_values, counts in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else _number(bound)
+                yield (f"{self.name}_bucket", _labels(self.labels + ("le",), label_values + (le,)), cumulative)
+            yield f"{self.name}_sum", _labels(self.labels, label_values), counts[-1]
+            yield f"{self.name}_count", _labels(self.labels, label_values), cumulative
+
+
+class Callback:
+    """A value read at scrape time: ``fn`` returns a number or {label values: number}."""
+
+    def __init__(self, name, help, fn, kind="gauge", labels=()):
+        self.name, self.help, self.fn, self.kind, self.labels = name, help, fn, kind, tuple(labels)
+
+    def samples(self):
+        value = self.fn()
+        values = value if isinstance(value, dict) else {(): value}
+        for label_values, v in sorted(values.items()):
+            yield self.name, _labels(self.labels, label_values), v
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name, help, fn, labels=()):
+        return self._add(Callback(name, help, fn, "gauge", labels))
+
+    def counter_from(self, name, help, fn, labels=()):
+        """A counter kept by some other object (cache hits etc.), read at scrape time."""
+        return self._add(Callback(name, help, fn, "counter", labels))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception:
+                logger.exception("Metric %s failed to collect", metric.name)
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {_number(value)}" for name, labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+class _RequestStats:
+    __slots__ = ("start", "sql_count", "sql_seconds", "statements", "warned")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.statements = _Tally()
+        self.warned = False
+
+
+def _request_stats():
+    if not has_request_context():
+        return None
+    stats = g.get("_metrics")
+    if stats is None:
+        # Socket.IO events run in a request context but skip before_request
+        stats = g._metrics = _RequestStats()
+    return stats
+
+
+def _route():
+    rule = request.url_rule
+    if rule is not None:
+        return rule.rule
+    event_info = getattr(request, "event", None)
+    if event_info:
+        return f"socketio:{event_info['message']}"
+    return "<unmatched>"
+
+
+def instrument_app(app, engines, registry, n_plus_one=10, timing_header=False):
+    """Time requests on ``app`` and SQL statements on ``engines`` (``{bind: engine}``) into ``registry``.
+
+    With ``timing_header`` each response gets a ``Server-Timing`` header
+    with its total time, SQL time and statement count.
+    """
+    request_seconds = registry.histogram(
+        "namax_request_seconds", "HTTP request latency by route.", ("route", "method"))
+    requests_total = registry.counter(
+        "namax_requests_total", "HTTP responses by route and status.", ("route", "method", "status"))
+    request_statements = registry.histogram(
+        "namax_request_sql_statements", "SQL statements issued per HTTP request.", ("route",), COUNT_BUCKETS)
+    sql_seconds = registry.histogram("namax_sql_seconds", "SQL statement execution time by bind.", ("bind",))
+    n_plus_one_total = registry.counter(
+        "namax_sql_repeated_statement_total", "Requests that repeated one statement past the N+1 threshold.",
+        ("route",))
+
+    @app.before_request
+    def start_request_timer():
+        g._metrics = _RequestStats()
+
+    @app.after_request
+    def record_request(response):
+        stats = g.get("_metrics")
+        if stats is None:
+            return response
+        elapsed = time.perf_counter() - stats.start
+        route = _route()
+        request_seconds.observe(elapsed, route, request.method)
+        requests_total.inc(route, request.method, response.status_code)
+        request_statements.observe(stats.sql_count, route)
+        if timing_header:
+            response.headers["Server-Timing"] = (
+                f'app;dur={elapsed * 1000:.1f}, '
+                f'sql;dur={stats.sql_seconds * 1000:.1f};desc="{stats.sql_count} queries"'
+            )
+        return response
+
+    for bind, engine in engines.items():
+        _instrument_engine(engine, bind, sql_seconds, n_plus_one, n_plus_one_total)
+
+
+def _instrument_engine(engine, bind, sql_seconds, n_plus_one, n_plus_one_total):
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_metrics_start", []).append((context, time.perf_counter()))
+
+    @event.listens_for(engine, "handle_error")
+    def discard_statement_timer(error):
+        # A failed statement never reaches after_cursor_execute
+        if error.connection is None:
+            return
+        starts = error.connection.info.get("_metrics_start")
+        if starts and starts[-1][0] is error.execution_context:
+            starts.pop()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["_metrics_start"].pop()[1]
+        sql_seconds.observe(elapsed, bind)
+        stats = _request_stats()
+        if stats is None:
+            return
+        stats.sql_count += 1
+        stats.sql_seconds += elapsed
+        stats.statements[statement] += 1
+        if stats.statements[statement] == n_plus_one and not stats.warned:
+            stats.warned = True
+            route = _route()
+            n_plus_one_total.inc(route)
+            logger.warning("Possible N+1 in %s: statement ran %d times: %s",
+                           route, n_plus_one, " ".join(statement.split())[:200])
+
+
+def socketio_timer(registry):
+    """socket_events middleware recording handler latency per event name."""
+    event_seconds = registry.histogram(
+        "namax_socketio_event_seconds", "Socket.IO event handler latency by event.", ("event",))
+
+    def middleware(event_name, handler, *args):
+        start = time.perf_counter()
+        try:
+            return handler(*args)
+        finally:
+            event_seconds.observe(time.perf_counter() - start, event_name)
+
+    return middleware
@@ -0,0 +1,233 @@
+"""Idempotent schema migrations for existing databases.
+
+``db.create_all()`` only creates missing tables; it never adds columns,
+indexes on existing tables, or backfills data. Each step below checks
+what is already there, so the whole list is safe to run on every start
+and against the old ``instance/namax.db``.
+"""
+from datetime import date, timezone
+
+from sqlalchemy import MetaData, inspect, select, func, case, union_all, bindparam
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from feedback_store import create_fts
+from inbox import summarize
+
+
+MIGRATIONS = []
+
+
+def migration(fn):
+    MIGRATIONS.append(fn)
+    return fn
+
+
+def run_migrations(db):
+    """Create missing tables, apply every migration step, then add indexes."""
+    db.create_all()
+    with db.engine.begin() as conn:
+        for step in MIGRATIONS:
+            step(conn, db.metadata)
+        create_missing_indexes(conn, db.metadata)
+
+
+def local_day(utc_timestamp):
+    """The local calendar day (as ``date.today()`` counts days) of a naive UTC timestamp."""
+    return utc_timestamp.replace(tzinfo=timezone.utc).astimezone().date()
+
+
+def has_column(conn, table, column):
+    return any(c["name"] == column for c in inspect(conn).get_columns(table))
+
+
+def add_column(conn, table, column):
+    """ALTER TABLE ... ADD COLUMN for a model column missing from the database."""
+    if has_column(conn, table.name, column.name):
+        return False
+    col_type = column.type.compile(dialect=conn.dialect)
+    conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}')
+    return True
+
+
+def rebuild_table(conn, table):
+    """Recreate ``table`` from its model, keeping its rows, indexes and triggers (SQLite).
+
+    For table options SQLite cannot ALTER, such as AUTOINCREMENT. The new
+    table is filled under a temporary name and then renamed, so foreign
+    keys in other tables keep pointing at ``table.name``.
+    """
+    triggers = conn.exec_driver_sql(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (table.name,)
+    ).all()
+    kept = {c["name"] for c in inspect(conn).get_columns(table.name)}
+    columns = ", ".join(f'"{c.name}"' for c in table.columns if c.name in kept)
+    new = table.to_metadata(MetaData(), name=f"{table.name}_new")
+    conn.execute(CreateTable(new))
+    conn.exec_driver_sql(f'INSERT INTO "{new.name}" ({columns}) SELECT {columns} FROM "{table.name}"')
+    conn.exec_driver_sql(f'DROP TABLE "{table.name}"')
+    conn.exec_driver_sql(f'ALTER TABLE "{new.name}" RENAME TO "{table.name}"')
+    for index in table.indexes:
+        conn.execute(CreateIndex(index))
+    for _, sql in triggers:
+        conn.exec_driver_sql(sql)
+
+
+def create_missing_indexes(conn, metadata):
+    """Indexes declared on models but absent from tables that already existed."""
+    inspector = inspect(conn)
+    for table in metadata.sorted_tables:
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                conn.execute(CreateIndex(index))
+
+
+# --------------------------
+# Steps
+# --------------------------
+@migration
+def backfill_driver_stops(conn, metadata):
+    """Copy the comma-joined Driver.pickup/dropoff lists into driver_stop."""
+    driver = metadata.tables["driver"]
+    stop = metadata.tables["driver_stop"]
+
+    has_stops = select(stop.c.driver_id).distinct()
+    rows = conn.execute(
+        select(driver.c.id, driver.c.pickup, driver.c.dropoff)
+        .where(driver.c.id.not_in(has_stops))
+    ).all()
+
+    new_stops = []
+    for driver_id, pickups, dropoffs in rows:
+        for kind, csv in (("pickup", pickups), ("dropoff", dropoffs)):
+            towns = [t.strip() for t in (csv or "").split(",") if t.strip()]
+            for position, town in enumerate(towns):
+                new_stops.append({"driver_id": driver_id, "town": town, "kind": kind, "position": position})
+
+    if new_stops:
+        conn.execute(stop.insert(), new_stops)
+
+
+@migration
+def add_service_date(conn, metadata):
+    """Stored service day for bookings and drivers, backfilled from timestamp.
+
+    New rows default to the local ``date.today()``, while ``timestamp`` is
+    UTC; the backfill converts so a late-evening row lands on the same
+    day either way.
+    """
+    for name in ("namakwaland", "driver"):
+        table = metadata.tables[name]
+        add_column(conn, table, table.c.service_date)
+        rows = conn.execute(
+            select(table.c.id, table.c.timestamp)
+            .where(table.c.service_date.is_(None), table.c.timestamp.is_not(None))
+        ).all()
+        if rows:
+            conn.execute(
+                table.update().where(table.c.id == bindparam("row_id")).values(service_date=bindparam("day")),
+                [{"row_id": row_id, "day": local_day(timestamp)} for row_id, timestamp in rows]
+            )
+
+
+@migration
+def add_chat_conversation(conn, metadata):
+    """Order-independent sender/recipient key, matching chat_history.conversation_key."""
+    chat = metadata.tables["chat_message"]
+    add_column(conn, chat, chat.c.conversation)
+    conn.execute(
+        chat.update()
+        .where(chat.c.conversation.is_(None))
+        .values(conversation=case(
+            (chat.c.sender < chat.c.recipient, chat.c.sender + "|" + chat.c.recipient),
+            else_=chat.c.recipient + "|" + chat.c.sender
+        ))
+    )
+
+
+@migration
+def add_assignment_columns(conn, metadata):
+    """Booking -> driver assignment and the seats it has used up."""
+    bookings = metadata.tables["namakwaland"]
+    drivers = metadata.tables["driver"]
+    add_column(conn, bookings, bookings.c.driver_id)
+    if add_column(conn, drivers, drivers.c.seats_taken):
+        conn.execute(drivers.update().values(seats_taken=0))
+
+
+@migration
+def add_reservation_columns(conn, metadata):
+    """RiderBooking doubles as the seat reservation record."""
+    bookings = metadata.tables["rider_booking"]
+    add_column(conn, bookings, bookings.c.driver_id)
+    add_column(conn, bookings, bookings.c.request_key)
+
+
+@migration
+def scope_request_key_to_rider(conn, metadata):
+    """Request keys are unique per rider, not across riders (see reservations.py)."""
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_rider_booking_request_key")
+
+
+@migration
+def backfill_conversation_summary(conn, metadata):
+    """Inbox rows for conversations that predate the summary table, all marked read."""
+    summary = metadata.tables["conversation_summary"]
+    chat = metadata.tables["chat_message"]
+    if conn.execute(select(summary.c.owner).limit(1)).first() is not None:
+        return
+    messages = conn.execute(
+        select(chat.c.id, chat.c.sender, chat.c.recipient, chat.c.message, chat.c.timestamp, chat.c.conversation)
+    ).mappings().all()
+    rows = [{**row, "unread": 0} for row in summarize(messages)]
+    if rows:
+        conn.execute(summary.insert(), rows)
+
+
+@migration
+def backfill_feedback_count(conn, metadata):
+    """Per-day/per-user feedback counts for entries written before the count table."""
+    counts = metadata.tables["feedback_count"]
+    if conn.execute(select(counts.c.day).limit(1)).first() is not None:
+        return
+    entries = union_all(*[
+        select(t.c.timestamp, t.c.user_name) for t in (metadata.tables["feedback"], metadata.tables["feedback_archive"])
+    ]).subquery()
+    day = func.date(entries.c.timestamp)
+    rows = conn.execute(
+        select(day, func.coalesce(entries.c.user_name, "Anonymous"), func.count())
+        .where(entries.c.timestamp.is_not(None))
+        .group_by(day, func.coalesce(entries.c.user_name, "Anonymous"))
+    ).all()
+    if rows:
+        conn.execute(counts.insert(), [
+            {"day": d if isinstance(d, date) else date.fromisoformat(d), "user_name": user_name, "count": count}
+            for d, user_name, count in rows
+        ])
+
+
+@migration
+def add_feedback_search(conn, metadata):
+    """Full-text index of feedback messages (SQLite with FTS5 only; see feedback_store.py)."""
+    create_fts(conn)
+
+
+@migration
+def autoincrement_hot_tables(conn, metadata):
+    """Never reuse the id of a row the rollover archived (SQLite reuses the top rowid otherwise)."""
+    if conn.dialect.name != "sqlite":
+        return
+    for name in ("namakwaland", "driver", "chat_message", "feedback"):
+        sql = conn.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        ).scalar()
+        if "AUTOINCREMENT" in sql.upper():
+            continue
+        table, archive = metadata.tables[name], metadata.tables[f"{name}_archive"]
+        rebuild_table(conn, table)
+        top = max(
+            conn.execute(select(func.max(table.c.id))).scalar() or 0,
+            conn.execute(select(func.max(archive.c.id))).scalar() or 0,
+        )
+        conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = ?", (name,))
+        conn.exec_driver_sql("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (name, top))
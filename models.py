@@ -0,0 +1,187 @@
+"""Database models and the archive tables of the daily rollover."""
+from datetime import datetime, date
+
+from sqlalchemy import Integer, String, select, tuple_
+from sqlalchemy.orm import Mapped, mapped_column, aliased
+
+from archive import archive_table
+from extensions import db
+
+
+# --------------------------
+# Database Models
+# --------------------------
+class Namakwaland(db.Model):
+    __table_args__ = (
+        db.Index("ix_namakwaland_day_route", "service_date", "pickup", "dropoff"),
+        db.Index("ix_namakwaland_user_day", "user_name", "service_date"),
+        {"sqlite_autoincrement": True},  # archived ids are never handed out again
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_name: Mapped[str] = mapped_column(String(250), nullable=False)
+    pickup: Mapped[str] = mapped_column(Integer, nullable=True)
+    dropoff: Mapped[str] = mapped_column(String(500), nullable=False)
+    status: Mapped[str] = mapped_column(Integer, nullable=True)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    service_date = db.Column(db.Date, default=date.today)
+    driver_id = db.Column(db.Integer, index=True)  # set when assigned to a driver
+
+
+class NamakwaUsers(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    password = db.Column(db.String(200), nullable=False)
+
+
+    def __repr__(self):
+        return f"<NamakwaUsers {self.name}>"
+
+
+class RiderBooking(db.Model):
+    __table_args__ = (
+        db.Index("ux_rider_booking_user_request", "user_name", "request_key", unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_name = db.Column(db.String(100))
+    pickup = db.Column(db.String(100))
+    dropoff = db.Column(db.String(100))
+    seats = db.Column(db.Integer)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    date = db.Column(db.Date, default=date.today)
+    driver_id = db.Column(db.Integer, index=True)
+    request_key = db.Column(db.String(64))  # idempotency key of the reservation, unique per rider
+
+class Driver(db.Model):
+    __table_args__ = (
+        db.Index("ix_driver_day_available", "service_date", "is_available"),
+        {"sqlite_autoincrement": True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_name = db.Column(db.String(100), unique=True)
+    pickup = db.Column(db.String(100))
+    dropoff = db.Column(db.String(100))
+    seats = db.Column(db.Integer)
+    seats_taken = db.Column(db.Integer, default=0, nullable=False)
+    is_available = db.Column(db.Boolean, default=True)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    service_date = db.Column(db.Date, default=date.today)
+    stops = db.relationship(
+        "DriverStop",
+        cascade="all, delete-orphan",
+        order_by="(DriverStop.kind, DriverStop.position)"
+    )
+
+    def set_stops(self, pickups, dropoffs):
+        """Store the stop lists both as CSV (for display) and as DriverStop rows."""
+        self.pickup = ",".join(pickups)
+        self.dropoff = ",".join(dropoffs)
+        self.stops = (
+            [DriverStop(town=t, kind="pickup", position=i) for i, t in enumerate(pickups)] +
+            [DriverStop(town=t, kind="dropoff", position=i) for i, t in enumerate(dropoffs)]
+        )
+
+    @classmethod
+    def near_route(cls, pickup_pairs, dropoff_pairs):
+        """Drivers with a pair of stops in ``pickup_pairs`` and a pair in ``dropoff_pairs``.
+
+        The pairs come from TownMatrix.stop_pairs: stops a town can be
+        inserted between within the detour limit. Each side is one indexed
+        self-join of driver_stop.
+        """
+        return cls.query.filter(cls.id.in_(_with_stop_pair(pickup_pairs)), cls.id.in_(_with_stop_pair(dropoff_pairs)))
+
+
+def _with_stop_pair(pairs):
+    first, second = aliased(DriverStop), aliased(DriverStop)
+    return (
+        select(first.driver_id)
+        .join(second, second.driver_id == first.driver_id)
+        .where(first.town.in_({a for a, _ in pairs}), tuple_(first.town, second.town).in_(pairs))
+    )
+
+
+class DriverStop(db.Model):
+    """One town in a driver's pickup or dropoff list."""
+    __table_args__ = (
+        db.Index("ix_driver_stop_kind_town", "kind", "town", "driver_id"),
+        db.Index("ix_driver_stop_driver", "driver_id", "kind", "position"),
+        db.Index("ix_driver_stop_town", "town", "driver_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    driver_id = db.Column(db.Integer, db.ForeignKey("driver.id", ondelete="CASCADE"), nullable=False)
+    town = db.Column(db.String(100), nullable=False)
+    kind = db.Column(db.String(10), nullable=False)  # "pickup" or "dropoff"
+    position = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ChatMessage(db.Model):
+    __table_args__ = (
+        db.Index("ix_chat_message_conversation", "conversation", "timestamp", "id"),
+        {"sqlite_autoincrement": True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    sender = db.Column(db.String(100), nullable=False)
+    recipient = db.Column(db.String(100), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    conversation = db.Column(db.String(201))  # conversation_key(sender, recipient)
+
+
+class ConversationSummary(db.Model):
+    """One user's view of one conversation, kept up to date by inbox.record_messages."""
+    __table_args__ = (
+        db.Index("ix_conversation_summary_recent", "owner", "last_timestamp"),
+    )
+
+    owner = db.Column(db.String(100), primary_key=True)
+    other = db.Column(db.String(100), primary_key=True)
+    conversation = db.Column(db.String(201), nullable=False)
+    last_message = db.Column(db.Text, nullable=False)
+    last_sender = db.Column(db.String(100), nullable=False)
+    last_message_id = db.Column(db.Integer)
+    last_timestamp = db.Column(db.DateTime, nullable=False)
+    unread = db.Column(db.Integer, nullable=False, default=0)
+
+
+class DataVersion(db.Model):
+    """Version of each data scope, bumped by writes that other processes must see (see data_version.py)."""
+    scope = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    writer = db.Column(db.String(32))  # process that bumped it last
+
+
+class IdBlock(db.Model):
+    """Next unreserved primary key per table, for IDs handed out before insert."""
+    name = db.Column(db.String(50), primary_key=True)
+    next_id = db.Column(db.Integer, nullable=False)
+
+
+class Feedback(db.Model):
+    __table_args__ = (
+        db.Index("ix_feedback_timestamp_id", "timestamp", "id"),
+        {"sqlite_autoincrement": True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_name = db.Column(db.String(100))
+    message = db.Column(db.Text, nullable=False)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class FeedbackCount(db.Model):
+    """Feedback entries per UTC day and user, kept up to date by feedback_store.record."""
+    day = db.Column(db.Date, primary_key=True)
+    user_name = db.Column(db.String(100), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+# Cold copies of past days' rows, filled by the daily rollover (see archive.py)
+namakwaland_archive = archive_table(Namakwaland.__table__, db.metadata, [("user_name", "timestamp")])
+driver_archive = archive_table(Driver.__table__, db.metadata, [("user_name", "service_date")])
+chat_message_archive = archive_table(ChatMessage.__table__, db.metadata, [("conversation", "timestamp", "id")])
+feedback_archive = archive_table(Feedback.__table__, db.metadata, [("timestamp", "id")])
@@ -0,0 +1,117 @@
+"""Password hashing off the event loop.
+
+scrypt/pbkdf2 take tens of milliseconds of CPU. Under eventlet that
+time is spent on the hub's only OS thread, so every green thread on the
+worker (chat events, page requests) waits for each login. Under eventlet
+``PasswordHasher`` runs the hash in ``eventlet.tpool``'s native threads.
+hashlib releases the GIL while hashing, so the hub keeps serving other
+green threads in the meantime. Without eventlet it hashes in the calling
+thread, which is already a real thread.
+
+At most ``workers`` hashes run at once and at most ``max_queue`` more
+wait. Beyond that ``HashQueueFull`` is raised, so a login storm is shed
+instead of queueing without bound.
+
+``verify`` also rehashes passwords stored with an older method or cost.
+Changing ``method`` upgrades users as they log in.
+"""
+import sys
+import threading
+import time
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HashQueueFull(Exception):
+    """Too many password hashes already running or waiting."""
+
+
+def _eventlet_patched():
+    eventlet = sys.modules.get("eventlet")
+    return eventlet is not None and eventlet.patcher.is_monkey_patched("thread")
+
+
+class PasswordHasher:
+    def __init__(self, method="scrypt", workers=2, max_queue=32):
+        self.method = method
+        self.workers = workers
+        self.max_queue = max_queue
+        self._slots = threading.BoundedSemaphore(workers)
+        self._lock = threading.Lock()
+        self._prefix = None  # stored-hash prefix of ``method``, e.g. "scrypt:32768:8:1"
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.hash_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    def _run(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HashQueueFull()
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+        queued = time.perf_counter()
+        try:
+            with self._slots:
+                started = time.perf_counter()
+                if _eventlet_patched():
+                    from eventlet import tpool
+                    result = tpool.execute(fn, *args)
+                else:
+                    result = fn(*args)
+                finished = time.perf_counter()
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        with self._lock:
+            self.completed += 1
+            self.wait_seconds += started - queued
+            self.hash_seconds += finished - started
+        return result
+
+    def _current_prefix(self):
+        if self._prefix is None:
+            self._prefix = generate_password_hash("", self.method).split("$", 1)[0]
+        return self._prefix
+
+    def needs_rehash(self, pwhash):
+        return pwhash.split("$", 1)[0] != self._current_prefix()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def _verify(self, pwhash, password):
+        if not check_password_hash(pwhash, password):
+            return False, None
+        if self.needs_rehash(pwhash):
+            return True, generate_password_hash(password, self.method)
+        return True, None
+
+    def verify(self, pwhash, password):
+        """Check ``password``; returns ``(ok, new_hash)``.
+
+        ``new_hash`` is set when the stored hash should be replaced because
+        it uses an outdated method or cost.
+        """
+        ok, new_hash = self._run(self._verify, pwhash, password)
+        if new_hash:
+            with self._lock:
+                self.rehashed += 1
+        return ok, new_hash
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+                "hash_seconds": self.hash_seconds,
+                "wait_seconds": self.wait_seconds,
+            }
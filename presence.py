@@ -0,0 +1,205 @@
+"""Who is connected over Socket.IO, and on which session IDs.
+
+``InProcessPresence`` is enough for a single worker. ``SQLitePresence``
+keeps the same data in a small SQLite file that every worker on the host
+opens, so recipients connected to another worker can still be found and
+the online count covers all of them. Emits to those sessions only reach
+them when Socket.IO is also given a message queue (see app.py).
+
+Each worker using ``SQLitePresence`` stamps its row in ``presence_worker``
+every ``heartbeat`` seconds while it holds connections. Sessions of a
+worker that has not stamped for three heartbeats (it crashed or was
+killed) are ignored by every read and purged by the next live heartbeat.
+"""
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+LIVE_WORKER = "worker IN (SELECT worker FROM presence_worker WHERE last_seen >= ?)"
+
+
+class InProcessPresence:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sids = {}  # sid -> user_name (None for anonymous visitors)
+        self._by_user = {}  # user_name -> {sid, ...}
+
+    def connect(self, sid, user_name=None):
+        with self._lock:
+            self._forget(sid)
+            self._sids[sid] = user_name
+            self._by_user.setdefault(user_name, set()).add(sid)
+
+    def disconnect(self, sid):
+        with self._lock:
+            self._forget(sid)
+
+    def _forget(self, sid):
+        if sid not in self._sids:
+            return
+        user_name = self._sids.pop(sid)
+        sids = self._by_user[user_name]
+        sids.discard(sid)
+        if not sids:
+            del self._by_user[user_name]
+
+    def sids_for(self, user_name):
+        with self._lock:
+            return list(self._by_user.get(user_name, ()))
+
+    def is_online(self, user_name):
+        return bool(self.sids_for(user_name))
+
+    def count(self):
+        with self._lock:
+            return len(self._sids)
+
+
+class SQLitePresence:
+    """Presence shared by every worker process through one SQLite file.
+
+    Rows are tagged with the worker that owns the connection. A worker
+    clears its own leftovers when it starts, and the heartbeat retires the
+    rows of workers that died without coming back under the same pid.
+    ``socketio`` runs the heartbeat loop; without it call ``beat`` yourself.
+    """
+
+    def __init__(self, path, heartbeat=15.0, socketio=None):
+        self.path = path
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self.heartbeat = heartbeat
+        self.socketio = socketio
+        self._task = None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS presence ("
+            "sid TEXT PRIMARY KEY, user_name TEXT, worker TEXT NOT NULL, connected_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_presence_user ON presence (user_name)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_presence_worker ON presence (worker)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS presence_worker (worker TEXT PRIMARY KEY, last_seen REAL NOT NULL)"
+        )
+        self._execute("DELETE FROM presence WHERE worker = ?", (self.worker,))
+        self.beat()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _live(self):
+        """Oldest heartbeat still counted as a live worker."""
+        return time.time() - 3 * self.heartbeat
+
+    def beat(self):
+        """Stamp this worker as alive and purge sessions of workers that stopped stamping."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO presence_worker (worker, last_seen) VALUES (?, ?)", (self.worker, now)
+                )
+                self._conn.execute("DELETE FROM presence_worker WHERE last_seen < ?", (self._live(),))
+                self._conn.execute(
+                    "DELETE FROM presence WHERE worker NOT IN (SELECT worker FROM presence_worker)"
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.heartbeat)
+            self.beat()
+
+    def connect(self, sid, user_name=None):
+        if self._task is None and self.socketio is not None:
+            self.beat()  # the stamp may have gone stale while this worker sat idle
+            self._task = self.socketio.start_background_task(self._run)
+        self._execute(
+            "INSERT OR REPLACE INTO presence (sid, user_name, worker, connected_at) VALUES (?, ?, ?, ?)",
+            (sid, user_name, self.worker, time.time())
+        )
+
+    def disconnect(self, sid):
+        self._execute("DELETE FROM presence WHERE sid = ?", (sid,))
+
+    def sids_for(self, user_name):
+        return [row[0] for row in self._execute(
+            f"SELECT sid FROM presence WHERE user_name = ? AND {LIVE_WORKER}", (user_name, self._live())
+        )]
+
+    def is_online(self, user_name):
+        return bool(self._execute(
+            f"SELECT 1 FROM presence WHERE user_name = ? AND {LIVE_WORKER} LIMIT 1", (user_name, self._live())
+        ))
+
+    def count(self):
+        return self._execute(f"SELECT COUNT(*) FROM presence WHERE {LIVE_WORKER}", (self._live(),))[0][0]
+
+
+def make_presence(url=None, heartbeat=15.0, socketio=None):
+    """Build a registry from a URL: empty/``memory://`` or ``sqlite:///path``."""
+    if not url or url == "memory://":
+        return InProcessPresence()
+    if url.startswith("sqlite:///"):
+        return SQLitePresence(url[len("sqlite:///"):], heartbeat, socketio)
+    raise ValueError(f"Unsupported presence backend: {url}")
+
+
+class PresenceBroadcaster:
+    """Coalesce presence changes into at most one ``update_users`` frame per interval.
+
+    Frames only go to the ``presence`` room, which clients join with the
+    ``subscribe_presence`` event. Each frame carries the online count and
+    the online/offline state of every user whose presence changed since
+    the previous frame.
+    """
+
+    ROOM = "presence"
+
+    def __init__(self, socketio, registry, interval=1.0):
+        self.socketio = socketio
+        self.registry = registry
+        self.interval = interval
+        self.frames_sent = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._changed = set()
+        self._task = None
+
+    def touch(self, user_name=None):
+        """Record a connect/disconnect; it goes out with the next frame."""
+        with self._lock:
+            self._dirty = True
+            if user_name:
+                self._changed.add(user_name)
+            if self._task is None:
+                self._task = self.socketio.start_background_task(self._run)
+
+    def snapshot(self, users=()):
+        return {
+            "count": self.registry.count(),
+            "online": {name: self.registry.is_online(name) for name in users},
+        }
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            changed = self._changed
+            self._dirty = False
+            self._changed = set()
+        self.socketio.emit("update_users", self.snapshot(changed), to=self.ROOM)
+        self.frames_sent += 1
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.interval)
+            self.flush()
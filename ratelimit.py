@@ -0,0 +1,191 @@
+"""Token-bucket rate limiting for routes and Socket.IO events.
+
+A rule is a name ("booking", "messages", ...) whose limit comes from
+``app.config['RATE_LIMITS']`` as ``"<count>/<second|minute|hour>"``: a
+bucket of ``count`` tokens refilled at ``count`` per period, so short
+bursts pass and sustained floods are cut to the average rate. An empty
+limit turns the rule off.
+
+Buckets are keyed per rule and per caller (user, IP or Socket.IO
+session). ``MemoryBackend`` keeps them per process; ``SQLiteBackend``
+keeps them in one SQLite file every worker on the host opens, so the
+limit holds however requests are spread over workers.
+
+Over the limit a route answers 429 with Retry-After before the view
+runs, and an event handler is skipped: the client gets a
+``rate_limited`` event and the ack ``{"status": "rate_limited"}``.
+``dropped`` counts the shed calls per rule.
+"""
+import functools
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict, namedtuple
+
+from flask import current_app, jsonify, request, session
+
+Limit = namedtuple("Limit", "rate burst")  # tokens per second, bucket size
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+
+def parse_limit(text):
+    """``"30/minute"`` -> Limit(0.5, 30); empty -> None (no limit)."""
+    if not text:
+        return None
+    count, _, period = text.partition("/")
+    count = int(count)
+    return Limit(count / PERIODS[period.strip()], count)
+
+
+def refill(tokens, updated, limit, now):
+    return min(limit.burst, tokens + (now - updated) * limit.rate)
+
+
+class MemoryBackend:
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, limit, cost=1):
+        """Take ``cost`` tokens; returns 0 if allowed, else seconds until they would be."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (limit.burst, now))
+            tokens = refill(tokens, updated, limit, now)
+            wait = 0 if tokens >= cost else (cost - tokens) / limit.rate
+            if not wait:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            # A bucket untouched for a while is full again, same as a missing one
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class SQLiteBackend:
+    """Buckets shared by every worker on the host through one SQLite file."""
+
+    def __init__(self, path, expire=3600.0):
+        self.expire = expire
+        self._lock = threading.Lock()
+        self._takes = 0
+        self._conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def take(self, key, limit, cost=1):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT tokens, updated FROM rate_limit WHERE key = ?", (key,)).fetchone()
+                tokens = refill(*row, limit, now) if row else limit.burst
+                wait = 0 if tokens >= cost else (cost - tokens) / limit.rate
+                if not wait:
+                    tokens -= cost
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO rate_limit (key, tokens, updated) VALUES (?, ?, ?)", (key, tokens, now)
+                )
+                self._takes += 1
+                if self._takes % 1000 == 0:
+                    self._conn.execute("DELETE FROM rate_limit WHERE updated < ?", (now - self.expire,))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+
+def make_backend(url=None):
+    """Build a backend from a URL: empty/``memory://`` or ``sqlite:///path``."""
+    if not url or url == "memory://":
+        return MemoryBackend()
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported rate limit backend: {url}")
+
+
+# --------------------------
+# Keys
+# --------------------------
+def client_ip():
+    return request.remote_addr or "-"
+
+
+def user_or_ip():
+    """The logged-in user, else the client address."""
+    user_name = session.get("user_name")
+    return f"user:{user_name}" if user_name else f"ip:{client_ip()}"
+
+
+def user_or_sid():
+    """For Socket.IO events: the logged-in user, else the Socket.IO session."""
+    user_name = session.get("user_name")
+    return f"user:{user_name}" if user_name else f"sid:{request.sid}"
+
+
+class RateLimiter:
+    def __init__(self, backend=None):
+        self.backend = backend  # may be set later, before the first request
+        self.dropped = defaultdict(int)
+        self._limits = {}
+
+    def _limit(self, rule):
+        text = current_app.config['RATE_LIMITS'].get(rule)
+        if text not in self._limits:
+            self._limits[text] = parse_limit(text)
+        return self._limits[text]
+
+    def hit(self, rule, key):
+        """Take a token from ``rule``'s bucket for ``key``; returns 0 or the seconds to wait."""
+        limit = self._limit(rule)
+        if limit is None or key is None:
+            return 0
+        wait = self.backend.take(f"{rule}:{key}", limit)
+        if wait:
+            self.dropped[rule] += 1
+        return wait
+
+    def limit(self, rule, key=user_or_ip, methods=("POST",)):
+        """Route decorator: answer 429 once ``key()`` exceeds ``rule`` (only for ``methods``)."""
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if request.method in methods:
+                    wait = self.hit(rule, key())
+                    if wait:
+                        return self.too_many(wait)
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def too_many(wait):
+        retry_after = max(1, math.ceil(wait))
+        if request.accept_mimetypes.best == "application/json" or request.is_json:
+            response = jsonify({"error": "rate limited", "retry_after": retry_after})
+        else:
+            response = current_app.response_class(
+                "Te veel versoeke. Probeer asseblief oor 'n oomblik weer.", mimetype="text/plain"
+            )
+        response.status_code = 429
+        response.headers["Retry-After"] = str(retry_after)
+        return response
+
+    def socketio_middleware(self, socketio, rules, key=user_or_sid):
+        """socket_events middleware applying ``rules`` ({event: rule}) to incoming events."""
+        def middleware(event, handler, *args):
+            rule = rules.get(event)
+            if rule is not None:
+                wait = self.hit(rule, key())
+                if wait:
+                    reply = {"status": "rate_limited", "event": event, "retry_after": round(wait, 1)}
+                    socketio.emit("rate_limited", reply, to=request.sid)
+                    return reply
+            return handler(*args)
+        return middleware
@@ -0,0 +1,75 @@
+"""Claiming seats in a specific driver's car.
+
+A claim is one conditional UPDATE on the driver row (only succeeds while
+``seats_taken + n <= seats``) followed by the RiderBooking insert, in a
+single transaction, so concurrent riders can never overbook a car. The
+``request_key`` is unique per rider on RiderBooking: replaying a request
+returns the original reservation instead of claiming again, and another
+rider sending the same key gets a reservation of their own.
+"""
+from collections import namedtuple
+from datetime import date
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+
+MAX_SEATS_PER_REQUEST = 10
+
+Reservation = namedtuple("Reservation", "status booking_id seats_left")
+# status is "reserved", "duplicate" (replayed request key) or "full"
+
+
+def _existing(conn, bookings, user_name, request_key):
+    row = conn.execute(
+        select(bookings.c.id).where(bookings.c.user_name == user_name, bookings.c.request_key == request_key)
+    ).first()
+    return Reservation("duplicate", row.id, None) if row else None
+
+
+def reserve_seats(engine, drivers, bookings, driver_id, user_name, seats, request_key,
+                  pickup=None, dropoff=None, before_commit=None):
+    """Claim ``seats`` in driver ``driver_id`` for ``user_name``, at most once per key.
+
+    ``before_commit(conn)``, if given, runs in the claim's transaction once
+    the seats and booking are written.
+    """
+    with engine.connect() as conn:
+        found = _existing(conn, bookings, user_name, request_key)
+        if found:
+            return found
+
+    try:
+        with engine.begin() as conn:
+            seats_left = conn.execute(
+                drivers.update()
+                .where(
+                    drivers.c.id == driver_id,
+                    drivers.c.is_available == True,  # noqa: E712
+                    drivers.c.service_date == date.today(),
+                    drivers.c.seats_taken + seats <= drivers.c.seats,
+                )
+                .values(seats_taken=drivers.c.seats_taken + seats)
+                .returning(drivers.c.seats - drivers.c.seats_taken)
+            ).scalar()
+            if seats_left is None:
+                return Reservation("full", None, None)
+
+            booking_id = conn.execute(
+                bookings.insert()
+                .values(
+                    user_name=user_name, driver_id=driver_id, seats=seats,
+                    pickup=pickup, dropoff=dropoff, request_key=request_key
+                )
+                .returning(bookings.c.id)
+            ).scalar()
+            if before_commit is not None:
+                before_commit(conn)
+        return Reservation("reserved", booking_id, seats_left)
+    except IntegrityError:
+        # The same rider's key won a race with us; our seat claim rolled back with it
+        with engine.connect() as conn:
+            found = _existing(conn, bookings, user_name, request_key)
+        if found is None:
+            raise
+        return found
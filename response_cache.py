@@ -0,0 +1,200 @@
+"""Whole-response cache for read-heavy pages, with strong ETags.
+
+A cached page is keyed by its path, query string, the day, whatever the
+view says it varies on (usually the logged-in user) and the current
+version of each data scope it reads ("drivers", "bookings", ...). Write
+handlers ``bump`` a scope instead of deleting entries, so every page
+built from the old data simply stops being looked up.
+
+Every cached response carries an ETag (SHA-1 of the body) and
+``Cache-Control: private, no-cache``: browsers keep their copy and
+revalidate it, and an unchanged page costs a 304 with no body.
+
+``MemoryBackend`` is per process. ``SQLiteBackend`` keeps versions and
+bodies in one SQLite file every worker on the host opens, so a write in
+one worker invalidates the others' pages too.
+"""
+import functools
+import hashlib
+import math
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timezone
+
+from flask import Response, make_response, request
+
+from user_state import TTLCache
+
+
+class MemoryBackend:
+    shared = False  # versions are this process's own
+
+    def __init__(self, maxsize=2000, ttl=3600.0):
+        self._entries = TTLCache(maxsize, ttl)
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._changed = {}
+        self._started = time.time()
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def set(self, key, entry):
+        self._entries.set(key, entry)
+
+    def version(self, scope):
+        return self._versions.get(scope, 0)
+
+    def changed(self, scope):
+        return self._changed.get(scope, self._started)
+
+    def bump(self, scope):
+        with self._lock:
+            self._versions[scope] = self._versions.get(scope, 0) + 1
+            self._changed[scope] = time.time()
+
+
+class SQLiteBackend:
+    """Versions and bodies shared by every worker through one SQLite file.
+
+    Entries older than ``ttl`` are ignored, and once there are more than
+    ``maxsize`` of them the oldest are deleted.
+    """
+    shared = True
+
+    def __init__(self, path, maxsize=2000, ttl=3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            "key TEXT PRIMARY KEY, etag TEXT NOT NULL, mimetype TEXT NOT NULL, body BLOB NOT NULL, "
+            "stored_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_response_cache_stored ON response_cache (stored_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_version (scope TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_changed (scope TEXT PRIMARY KEY, changed_at REAL NOT NULL)"
+        )
+        self._started = time.time()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def get(self, key):
+        rows = self._execute(
+            "SELECT etag, mimetype, body FROM response_cache WHERE key = ? AND stored_at > ?",
+            (key, time.time() - self.ttl)
+        )
+        return tuple(rows[0]) if rows else None
+
+    def set(self, key, entry):
+        etag, mimetype, body = entry
+        self._execute(
+            "INSERT OR REPLACE INTO response_cache (key, etag, mimetype, body, stored_at) VALUES (?, ?, ?, ?, ?)",
+            (key, etag, mimetype, body, time.time())
+        )
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self._execute(
+                "DELETE FROM response_cache WHERE key NOT IN "
+                "(SELECT key FROM response_cache ORDER BY stored_at DESC LIMIT ?)",
+                (self.maxsize,)
+            )
+
+    def version(self, scope):
+        rows = self._execute("SELECT version FROM cache_version WHERE scope = ?", (scope,))
+        return rows[0][0] if rows else 0
+
+    def bump(self, scope):
+        self._execute(
+            "INSERT INTO cache_version (scope, version) VALUES (?, 1) "
+            "ON CONFLICT (scope) DO UPDATE SET version = version + 1",
+            (scope,)
+        )
+        self._execute("INSERT OR REPLACE INTO cache_changed (scope, changed_at) VALUES (?, ?)", (scope, time.time()))
+
+    def changed(self, scope):
+        rows = self._execute("SELECT changed_at FROM cache_changed WHERE scope = ?", (scope,))
+        return rows[0][0] if rows else self._started
+
+
+def make_backend(url=None, maxsize=2000, ttl=3600.0):
+    """Build a backend from a URL: empty/``memory://`` or ``sqlite:///path``."""
+    if not url or url == "memory://":
+        return MemoryBackend(maxsize, ttl)
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):], maxsize, ttl)
+    raise ValueError(f"Unsupported response cache backend: {url}")
+
+
+class ResponseCache:
+    def __init__(self, backend=None):
+        self.backend = backend  # may be set later, before the first request
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def bump(self, *scopes):
+        """Invalidate every cached page that reads any of ``scopes``."""
+        for scope in scopes:
+            self.backend.bump(scope)
+
+    def last_modified(self, *scopes):
+        """When any of ``scopes`` was last bumped (process start if never), as a UTC datetime."""
+        changed = max(self.backend.changed(scope) for scope in scopes)
+        return datetime.fromtimestamp(math.ceil(changed), timezone.utc)
+
+    def _key(self, scopes, vary):
+        parts = [
+            request.path,
+            sorted(request.args.items(multi=True)),
+            date.today().isoformat(),
+            [(scope, self.backend.version(scope)) for scope in scopes],
+            vary() if vary else None,
+        ]
+        return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+    def cached(self, *scopes, vary=None):
+        """Cache a view's GET responses until one of ``scopes`` is bumped.
+
+        ``vary`` is called per request and returns anything else the page
+        depends on, e.g. the session's user name. Only 200 responses are
+        stored; redirects and errors always run the view.
+        """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if request.method != "GET":
+                    return view(*args, **kwargs)
+
+                key = self._key(scopes, vary)
+                entry = self.backend.get(key)
+                if entry is not None:
+                    self.hits += 1
+                    etag, mimetype, body = entry
+                    response = Response(body, mimetype=mimetype)
+                else:
+                    self.misses += 1
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.direct_passthrough:
+                        return response
+                    body = response.get_data()
+                    etag = hashlib.sha1(body).hexdigest()
+                    self.backend.set(key, (etag, response.mimetype, body))
+
+                response.set_etag(etag)
+                response.headers["Cache-Control"] = "private, no-cache"
+                response.make_conditional(request)
+                if response.status_code == 304:
+                    self.not_modified += 1
+                return response
+            return wrapper
+        return decorator
@@ -0,0 +1,133 @@
+"""Socket.IO rooms carrying availability deltas for a route's drivers and riders.
+
+Pages showing drivers or riders for a route join its rooms with
+``watch_routes`` and then patch their table from ``route_delta`` events
+instead of reloading. A delta is ``{"op": "add"|"update"|"remove",
+"kind": "driver"|"rider", "item": {...}}``; removes only carry the id.
+
+Rider deltas go to the room of the booking's (pickup, dropoff) route.
+drivers_today lists every driver within the detour limit of the rider's
+route, which can be hundreds of routes for one driver, so driver deltas
+go to one room per pickup town instead: the item's ``detours`` maps
+each dropoff the driver serves from that town to its detour minutes,
+and a page whose dropoff is missing drops the driver. Driver deltas are
+also sent to the ``*`` room for the unfiltered list.
+"""
+from collections import defaultdict
+
+from matching import route_keys, split_stops
+
+
+ALL_ROUTES = "*"
+MAX_WATCHED = 25  # a driver with 5 pickups and 5 dropoffs covers 25 routes
+
+
+def room_for(pickup, dropoff):
+    return f"route:{pickup}|{dropoff}"
+
+
+def drivers_room(pickup):
+    return f"drivers:{pickup}"
+
+
+def driver_item(driver):
+    return {
+        "id": driver.id,
+        "user_name": driver.user_name,
+        "pickup": driver.pickup,
+        "dropoff": driver.dropoff,
+        "seats": (driver.seats or 0) - (driver.seats_taken or 0),  # free seats, as RouteIndex lists them
+        "time": driver.timestamp.strftime("%H:%M") if driver.timestamp else "",
+    }
+
+
+def rider_item(booking):
+    return {
+        "id": booking.id,
+        "user_name": booking.user_name,
+        "pickup": booking.pickup,
+        "dropoff": booking.dropoff,
+        "time": booking.timestamp.strftime("%H:%M") if booking.timestamp else "",
+    }
+
+
+class RoutePublisher:
+    """``served_routes(pickup_csv, dropoff_csv)`` returns ``{(pickup, dropoff): detour_minutes}``
+    for the routes a driver is listed under; without it, only the exact
+    pairs of the driver's stops (detour 0).
+    """
+
+    def __init__(self, socketio, towns, served_routes=None):
+        self.socketio = socketio
+        self.towns = set(towns)
+        self.served_routes = served_routes
+
+    def driver_keys(self, driver):
+        """``{route: detour_minutes}`` a Driver row is listed under right now (none if unavailable)."""
+        if not driver.is_available:
+            return {}
+        if self.served_routes is not None:
+            return self.served_routes(driver.pickup, driver.dropoff)
+        return dict.fromkeys(route_keys(split_stops(driver.pickup), split_stops(driver.dropoff)), 0.0)
+
+    def rooms_for(self, routes, kind=None):
+        """Validated room names for a client's ``[[pickup, dropoff], ...]`` list.
+
+        ``kind`` ("driver" or "rider") joins only the rooms carrying that kind.
+        """
+        rooms = []
+        for route in list(routes or [])[:MAX_WATCHED]:
+            if route == ALL_ROUTES:
+                rooms.append(room_for(ALL_ROUTES, ALL_ROUTES))
+                continue
+            try:
+                pickup, dropoff = route
+            except (TypeError, ValueError):
+                continue
+            if pickup in self.towns and dropoff in self.towns and pickup != dropoff:
+                if kind != "driver":
+                    rooms.append(room_for(pickup, dropoff))
+                if kind != "rider":
+                    rooms.append(drivers_room(pickup))
+        return list(dict.fromkeys(rooms))
+
+    def _emit(self, op, kind, item, keys):
+        for pickup, dropoff in keys:
+            self.socketio.emit("route_delta", {"op": op, "kind": kind, "item": item}, to=room_for(pickup, dropoff))
+
+    # --------------------------
+    # Drivers
+    # --------------------------
+    def _emit_to_towns(self, op, item, pickups):
+        for pickup in pickups:
+            self.socketio.emit("route_delta", {"op": op, "kind": "driver", "item": item}, to=drivers_room(pickup))
+
+    def driver_saved(self, driver, old_keys=()):
+        """Publish a committed driver; ``old_keys`` are its routes before the change."""
+        old_pickups = {pickup for pickup, _ in old_keys}
+        detours = defaultdict(dict)
+        for (pickup, dropoff), minutes in self.driver_keys(driver).items():
+            detours[pickup][dropoff] = round(minutes, 1)
+        item = driver_item(driver)
+        self._emit_to_towns("remove", {"id": driver.id}, old_pickups - set(detours))
+        for pickup, dropoffs in detours.items():
+            self._emit_to_towns("update" if pickup in old_pickups else "add", {**item, "detours": dropoffs}, [pickup])
+
+        everywhere = [(ALL_ROUTES, ALL_ROUTES)]
+        if detours:
+            self._emit("update" if old_keys else "add", "driver", item, everywhere)
+        elif old_keys:
+            self._emit("remove", "driver", {"id": driver.id}, everywhere)
+
+    def driver_removed(self, driver_id, old_keys):
+        self._emit_to_towns("remove", {"id": driver_id}, {pickup for pickup, _ in old_keys})
+        self._emit("remove", "driver", {"id": driver_id}, [(ALL_ROUTES, ALL_ROUTES)])
+
+    # --------------------------
+    # Riders
+    # --------------------------
+    def rider_added(self, booking):
+        self._emit("add", "rider", rider_item(booking), [(booking.pickup, booking.dropoff)])
+
+    def rider_removed(self, booking_id, pickup, dropoff):
+        self._emit("remove", "rider", {"id": booking_id}, [(pickup, dropoff)])
@@ -0,0 +1,176 @@
+"""Process-wide runtime objects used by the views, built by ``init_app``.
+
+Views import this module and look objects up as ``services.presence``
+etc., so they always see the instances of the current process. Anything
+holding connections or threads (presence, the write-behind chat queue)
+is rebuilt by ``reopen`` in a forked worker. The town matrix, which
+pulls in NumPy, is only loaded the first time a route is ranked.
+"""
+import threading
+from datetime import date
+
+from flask import current_app
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, scoped_session
+
+from chat_writer import ChatWriter, IdAllocator
+from data_version import DataVersions
+from database import RoutingSession
+from extensions import db, socketio, response_cache
+from forms import TOWNS
+from inbox import record_messages
+from matching import RouteIndex
+from models import Namakwaland, Driver, ChatMessage, ConversationSummary, DataVersion, IdBlock, namakwaland_archive
+from passwords import PasswordHasher
+from presence import make_presence, PresenceBroadcaster
+from route_rooms import RoutePublisher
+from user_state import UserState, UserStateCache
+
+
+def load_todays_drivers():
+    return Driver.query.filter(
+        Driver.service_date == date.today(),
+        Driver.is_available == True
+    ).all()
+
+
+def load_todays_drivers_near_route(pickup, dropoff):
+    """Today's available drivers whose stops could take the route within MAX_DETOUR_KM (a prefilter)."""
+    matrix, limit = town_matrix(), current_app.config['MAX_DETOUR_KM']
+    return Driver.near_route(matrix.stop_pairs(pickup, limit), matrix.stop_pairs(dropoff, limit)).filter(
+        Driver.service_date == date.today(),
+        Driver.is_available == True
+    ).all()
+
+
+def load_todays_riders():
+    return Namakwaland.query.filter(
+        Namakwaland.service_date == date.today(),
+        Namakwaland.status == "Pending"
+    ).all()
+
+
+def load_user_state(user_name):
+    """Snapshot of what the booking/driver pages need to know about a user."""
+    booking_today = db.session.execute(
+        select(Namakwaland.id, Namakwaland.pickup, Namakwaland.dropoff, Namakwaland.status, Namakwaland.timestamp)
+        .where(Namakwaland.user_name == user_name, Namakwaland.service_date == date.today())
+        .limit(1)
+    ).first()
+    has_bookings = booking_today is not None or db.session.execute(
+        select(select(Namakwaland.id).where(Namakwaland.user_name == user_name).exists())
+    ).scalar() or db.session.execute(
+        select(select(namakwaland_archive.c.id).where(namakwaland_archive.c.user_name == user_name).exists())
+    ).scalar()
+    driver = db.session.execute(
+        select(Driver.id, Driver.pickup, Driver.dropoff, Driver.seats, Driver.is_available, Driver.service_date)
+        .where(Driver.user_name == user_name)
+        .limit(1)
+    ).first()
+    return UserState(bool(has_bookings), booking_today, driver)
+
+
+def has_booking_today(user_name, excluding=()):
+    """Whether ``user_name`` already booked today, ignoring the ids in ``excluding``.
+
+    Writes check this rather than the cached user state, which may be
+    up to USER_STATE_TTL seconds old.
+    """
+    query = select(Namakwaland.id).where(Namakwaland.user_name == user_name, Namakwaland.service_date == date.today())
+    if excluding:
+        query = query.where(Namakwaland.id.not_in(excluding))
+    return db.session.execute(select(query.exists())).scalar()
+
+
+route_index = RouteIndex(load_todays_drivers, load_todays_riders, load_todays_drivers_near_route, towns=TOWNS)
+route_publisher = RoutePublisher(socketio, TOWNS)
+
+data_versions = DataVersions(DataVersion.__table__)
+presence = None  # Socket.IO session IDs per user, across workers
+presence_broadcaster = None
+chat_writer = None
+user_state = None
+password_hasher = None
+
+_town_matrix = None
+_town_matrix_lock = threading.Lock()
+_instance_path = None
+
+
+def town_matrix():
+    """The town distance matrix, loaded (and cached on disk) on first use."""
+    global _town_matrix
+    with _town_matrix_lock:
+        if _town_matrix is None:
+            from geo import TownMatrix
+            _town_matrix = TownMatrix.load(_instance_path)
+        return _town_matrix
+
+
+def data_changed(conn, *scopes):
+    """In a write's transaction, before it commits: tell the other processes ``scopes`` changed.
+
+    ``conn`` is the Session or Connection making the write. This process's
+    pages for ``scopes`` are dropped once a Session commits; after a
+    Connection's transaction, call ``response_cache.bump`` yourself.
+    """
+    data_versions.bump(conn, *scopes)
+    if isinstance(conn, (Session, scoped_session)):
+        conn.info.setdefault("changed_scopes", set()).update(scopes)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _pages_changed(db_session):
+    response_cache.bump(*db_session.info.pop("changed_scopes", ()))
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _nothing_changed(db_session):
+    db_session.info.pop("changed_scopes", None)
+
+
+def _changed_elsewhere(scope):
+    """Another process wrote ``scope``: drop what this process cached from it."""
+    if scope in ("drivers", "bookings"):
+        route_index.invalidate()
+        user_state.clear()
+    if not response_cache.backend.shared:
+        response_cache.bump(scope)
+
+
+def reopen(app):
+    """(Re)create the objects that own connections or threads in this process."""
+    global presence, presence_broadcaster, chat_writer
+    presence = make_presence(app.config['PRESENCE_URL'], app.config['PRESENCE_HEARTBEAT'], socketio)
+    presence_broadcaster = PresenceBroadcaster(socketio, presence, app.config['PRESENCE_BROADCAST_INTERVAL'])
+
+    chat_writer = None
+    if app.config['CHAT_WRITE_BEHIND']:
+        with app.app_context():
+            chat_writer = ChatWriter(
+                db.engine,
+                ChatMessage.__table__,
+                IdAllocator(db.engine, IdBlock.__table__, ChatMessage.__table__),
+                batch_size=app.config['CHAT_BATCH_SIZE'],
+                flush_interval=app.config['CHAT_FLUSH_INTERVAL'],
+                after_write=lambda conn, rows: record_messages(conn, ConversationSummary.__table__, rows)
+            )
+
+
+def init_app(app):
+    global user_state, password_hasher, _instance_path
+    _instance_path = app.instance_path
+    data_versions.interval = app.config['DATA_VERSION_INTERVAL']
+    route_index.max_age = app.config['ROUTE_INDEX_MAX_AGE']
+    max_detour_km = app.config['MAX_DETOUR_KM']
+    route_index.driver_reach = lambda pickup, dropoff: town_matrix().reach(pickup, dropoff, max_detour_km)
+    route_publisher.served_routes = lambda pickup, dropoff: town_matrix().served_routes(pickup, dropoff, max_detour_km)
+    for scope in ("drivers", "bookings", "feedback"):
+        data_versions.on_change(scope, _changed_elsewhere)
+    user_state = UserStateCache(load_user_state, app.config['USER_STATE_SIZE'], app.config['USER_STATE_TTL'])
+    password_hasher = PasswordHasher(
+        app.config['PASSWORD_HASH_METHOD'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_queue=app.config['PASSWORD_HASH_QUEUE']
+    )
+    reopen(app)
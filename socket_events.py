@@ -0,0 +1,51 @@
+"""Flask-SocketIO with a middleware chain around every event handler.
+
+A middleware is ``fn(event, handler, *args)`` and must return
+``handler(*args)`` (or its own reply). Middlewares run in the order they
+were added with ``use``; adding one under a name already in use replaces
+it in place, so building the app again does not stack copies. Handlers are registered with ``socketio.on`` as
+usual; nothing changes for them.
+"""
+import functools
+import inspect
+
+import flask_socketio
+
+
+class SocketIO(flask_socketio.SocketIO):
+    def __init__(self, *args, **kwargs):
+        self.middleware = []
+        self._middleware_names = {}
+        super().__init__(*args, **kwargs)
+
+    def use(self, middleware, name=None):
+        old = self._middleware_names.get(name) if name is not None else None
+        if old in self.middleware:
+            self.middleware[self.middleware.index(old)] = middleware
+        else:
+            self.middleware.append(middleware)
+        if name is not None:
+            self._middleware_names[name] = middleware
+        return middleware
+
+    def _dispatch(self, event, handler, args):
+        call = handler
+        for middleware in reversed(self.middleware):
+            call = functools.partial(middleware, event, call)
+        return call(*args)
+
+    def on(self, message, namespace=None):
+        register = super().on(message, namespace)
+
+        def decorator(handler):
+            # Flask-SocketIO passes ``auth`` to connect handlers and falls
+            # back to no arguments on TypeError; decide up front instead
+            takes_args = bool(inspect.signature(handler).parameters)
+
+            @functools.wraps(handler)
+            def run(*args):
+                return self._dispatch(message, handler, args if takes_args else ())
+
+            register(run)
+            return handler
+        return decorator
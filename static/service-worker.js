@@ -1,22 +1,11 @@
-const CACHE_NAME = 'namax-cache-v1';
-const urlsToCache = [
-  '/',
-  '/static/css/style.css',
-  '/static/NamakwaUber.png'
-];
+// Retired: the service worker is now served from /service-worker.js (see
+// assets.py). Browsers that registered this copy clear its cache-first
+// cache and unregister it on their next update check.
+self.addEventListener('install', () => self.skipWaiting());
 
-self.addEventListener('install', event => {
+self.addEventListener('activate', event => {
   event.waitUntil(
-    caches.open(CACHE_NAME).then(cache => {
-      return cache.addAll(urlsToCache);
-    })
+    caches.delete('namax-cache-v1')
+      .then(() => self.registration.unregister())
   );
 });
-
-self.addEventListener('fetch', event => {
-  event.respondWith(
-    caches.match(event.request).then(response => {
-      return response || fetch(event.request);
-    })
-  );
-});
\ No newline at end of file
@@ -0,0 +1,59 @@
+// Generated by assets.Assets for build {{ version }}; do not edit the served copy.
+const VERSION = '{{ version }}';
+const ASSET_CACHE = 'namax-assets-' + VERSION;
+const PAGE_CACHE = 'namax-pages-' + VERSION;
+const PRECACHE = {{ precache|tojson }};
+
+self.addEventListener('install', event => {
+  event.waitUntil(
+    caches.open(ASSET_CACHE)
+      .then(cache => cache.addAll(PRECACHE))
+      .then(() => self.skipWaiting())
+  );
+});
+
+// Drop every cache from older builds (including the old namax-cache-v1)
+self.addEventListener('activate', event => {
+  event.waitUntil(
+    caches.keys()
+      .then(keys => Promise.all(
+        keys.filter(key => key !== ASSET_CACHE && key !== PAGE_CACHE).map(key => caches.delete(key))
+      ))
+      .then(() => self.clients.claim())
+  );
+});
+
+self.addEventListener('fetch', event => {
+  const request = event.request;
+  const url = new URL(request.url);
+  if (request.method !== 'GET' || url.origin !== self.location.origin) {
+    return;
+  }
+
+  // Fingerprinted assets never change: cache first
+  if (url.pathname.startsWith('/static/dist/')) {
+    event.respondWith(
+      caches.match(request).then(cached => cached || fetch(request).then(response => {
+        if (response.ok && response.status === 200) {
+          const copy = response.clone();
+          caches.open(ASSET_CACHE).then(cache => cache.put(request, copy));
+        }
+        return response;
+      }))
+    );
+    return;
+  }
+
+  // Pages (driver lists, bookings, chat): network first, last copy when offline
+  if (request.mode === 'navigate') {
+    event.respondWith(
+      fetch(request).then(response => {
+        if (response.ok) {
+          const copy = response.clone();
+          caches.open(PAGE_CACHE).then(cache => cache.put(request, copy));
+        }
+        return response;
+      }).catch(() => caches.match(request))
+    );
+  }
+});
@@ -0,0 +1,83 @@
+"""Shared fixtures: an app on its own SQLite file per test, and logged-in clients."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import services  # noqa: E402
+from app import create_app  # noqa: E402
+from extensions import db, socketio  # noqa: E402
+from migrations import run_migrations  # noqa: E402
+from models import Driver  # noqa: E402
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """Build the app on a fresh database; ``migrate=False`` leaves the schema to the test."""
+    monkeypatch.setenv("NAMAX_DATABASE_URL", f"sqlite:///{tmp_path / 'namax.db'}")
+    monkeypatch.setenv("NAMAX_JINJA_BYTECODE_CACHE", "")
+    built = []
+
+    def make(migrate=True, **config):
+        app = create_app({"TESTING": True, "WTF_CSRF_ENABLED": False, **config})
+        # The route index is process-wide; drop what an earlier test loaded
+        services.route_index.invalidate()
+        if migrate:
+            with app.app_context():
+                run_migrations(db)
+        built.append(app)
+        return app
+
+    yield make
+    for app in built:
+        with app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def login(app):
+    """``login(name)``: a test client with ``name`` in its session."""
+    def client_for(user_name):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session["user_name"] = user_name
+        return client
+    return client_for
+
+
+@pytest.fixture
+def socket_client(app):
+    """``socket_client(client)``: a Socket.IO test client sharing ``client``'s session."""
+    clients = []
+
+    def connect(client):
+        sc = socketio.test_client(app, flask_test_client=client)
+        clients.append(sc)
+        return sc
+
+    yield connect
+    for sc in clients:
+        if sc.is_connected():
+            sc.disconnect()
+
+
+@pytest.fixture
+def add_driver(app):
+    """``add_driver(client, pickup, dropoff, seats)``: list the client's user as today's driver; returns the id."""
+    def add(client, pickup="Springbok", dropoff="Garies", seats=3):
+        response = client.post("/be_a_driver", data={"pickup": pickup, "dropoff": dropoff, "seats": seats})
+        assert response.status_code == 302
+        with client.session_transaction() as session:
+            user_name = session["user_name"]
+        with app.app_context():
+            return Driver.query.filter_by(user_name=user_name).one().id
+    return add
@@ -0,0 +1,121 @@
+import pytest
+
+from views.api import MAX_BATCH
+
+
+def book(client, pickup="Okiep", dropoff="Garies"):
+    response = client.post("/api/v1/bookings", json={"create": [{"pickup": pickup, "dropoff": dropoff}]})
+    assert response.status_code == 200, response.json
+    return response.json["created"][0]["id"]
+
+
+# --------------------------
+# Batch writes
+# --------------------------
+@pytest.mark.parametrize("kwargs, status", [
+    ({"data": "create=1"}, 415),
+    ({"json": ["not", "an", "object"]}, 415),
+    ({"json": {"create": {"pickup": "Okiep"}}}, 400),
+    ({"json": {"cancel": 5}}, 400),
+    ({"json": {"cancel": list(range(MAX_BATCH + 1))}}, 413),
+])
+def test_batch_rejects_malformed_bodies(login, kwargs, status):
+    response = login("Riley").post("/api/v1/bookings", **kwargs)
+    assert response.status_code == status
+    assert "error" in response.json
+
+
+def test_batch_requires_login(login):
+    assert login(None).post("/api/v1/bookings", json={"cancel": [1]}).status_code == 401
+
+
+def test_batch_reports_bad_creates_by_position(login):
+    response = login("Riley").post("/api/v1/bookings", json={"create": [
+        {"pickup": "Atlantis", "dropoff": "Garies"},
+        {"pickup": "Okiep", "dropoff": "Okiep"},
+        "Okiep-Garies",
+    ]})
+    assert response.status_code == 400
+    assert [e["create"] for e in response.json["errors"]] == [0, 1, 2]
+    assert response.json["created"] == []
+
+
+@pytest.mark.parametrize("item", ["1", 1.5, None, {"id": 1}, [1], True, False])
+def test_malformed_cancel_items_are_errors_not_crashes(login, item):
+    rider = login("Riley")
+    booking_id = book(rider)
+
+    response = rider.post("/api/v1/bookings", json={"cancel": [item, booking_id]})
+
+    assert response.status_code == 200
+    assert response.json["cancelled"] == [booking_id]
+    assert response.json["errors"] == [{"cancel": 0, "error": "not a booking id"}]
+
+
+def test_batch_applies_the_valid_part(login):
+    rider = login("Riley")
+    booking_id = book(rider)
+    other = book(login("Pat"))
+
+    response = rider.post("/api/v1/bookings", json={
+        "cancel": [booking_id, other, 424242],
+        "create": [{"pickup": "Pella", "dropoff": "Pofadder"}, {"pickup": "Okiep", "dropoff": "Garies"}],
+    })
+
+    assert response.status_code == 200
+    body = response.json
+    assert body["cancelled"] == [booking_id]
+    assert [(b["pickup"], b["dropoff"]) for b in body["created"]] == [("Pella", "Pofadder")]
+    assert body["errors"] == [
+        {"create": 1, "error": "already booked today"},
+        {"cancel": other, "error": "not found"},
+        {"cancel": 424242, "error": "not found"},
+    ]
+
+
+def test_one_booking_per_day(login):
+    rider = login("Riley")
+    book(rider)
+    response = rider.post("/api/v1/bookings", json={"create": [{"pickup": "Pella", "dropoff": "Pofadder"}]})
+    assert response.status_code == 400
+    assert response.json["errors"] == [{"create": 0, "error": "already booked today"}]
+
+
+# --------------------------
+# Reads
+# --------------------------
+def test_field_selection(login, add_driver):
+    add_driver(login("Zed"))
+    rider = login("Riley")
+
+    drivers = rider.get("/api/v1/drivers?fields=user_name,seats").json["drivers"]
+    assert drivers == [{"user_name": "Zed", "seats": 3}]
+    assert rider.get("/api/v1/drivers?fields=password").status_code == 400
+    assert rider.get("/api/v1/today?include=drivers,secrets").status_code == 400
+
+
+def test_etag_and_last_modified_give_304_until_a_write(login, add_driver):
+    add_driver(login("Zed"))
+    rider = login("Riley")
+
+    first = rider.get("/api/v1/drivers")
+    etag, last_modified = first.headers["ETag"], first.headers["Last-Modified"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    unchanged = rider.get("/api/v1/drivers", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304 and unchanged.data == b""
+    assert rider.get("/api/v1/drivers", headers={"If-Modified-Since": last_modified}).status_code == 304
+
+    add_driver(login("Pat"), pickup="Pella", dropoff="Pofadder")
+
+    changed = rider.get("/api/v1/drivers", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert {d["user_name"] for d in changed.json["drivers"]} == {"Zed", "Pat"}
+
+
+def test_writes_are_not_conditional(login):
+    rider = login("Riley")
+    response = rider.post("/api/v1/bookings", json={"cancel": []})
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
@@ -0,0 +1,78 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from chat_history import conversation_key, fetch_page
+from extensions import db
+from models import ChatMessage, chat_message_archive
+
+KEY = conversation_key("Zed", "Riley")
+START = datetime(2024, 1, 1, 8, 0)
+
+
+@pytest.fixture
+def conversation(app):
+    """40 archived then 25 hot messages; some share a timestamp so the id breaks ties."""
+    def message(i):
+        return {
+            "id": i, "sender": "Zed" if i % 2 else "Riley", "recipient": "Riley" if i % 2 else "Zed",
+            "message": f"m{i}", "timestamp": START + timedelta(minutes=i // 3), "conversation": KEY,
+        }
+    with app.app_context():
+        db.session.execute(
+            chat_message_archive.insert(), [{**message(i), "archived_on": date.today()} for i in range(1, 41)]
+        )
+        db.session.execute(ChatMessage.__table__.insert(), [message(i) for i in range(41, 66)])
+        db.session.execute(ChatMessage.__table__.insert(), [{**message(99), "conversation": "Pat|Zed"}])
+        db.session.commit()
+    return list(range(1, 66))
+
+
+def read_all(limit):
+    pages, cursor = [], None
+    while True:
+        rows, cursor = fetch_page(ChatMessage, KEY, before=cursor, limit=limit, archive=chat_message_archive)
+        pages.append([row.id for row in rows])
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("limit", [1, 7, 25, 26, 65, 100])
+def test_cursors_walk_the_hot_table_then_the_archive(app, conversation, limit):
+    with app.test_request_context():
+        pages = read_all(limit)
+
+    assert [i for page in reversed(pages) for i in page] == conversation
+    assert all(len(page) == limit for page in pages[:-1])
+    for page in pages:
+        assert page == sorted(page)  # oldest first within a page
+
+
+def test_without_archive_the_page_ends_at_the_hot_table(app, conversation):
+    with app.test_request_context():
+        rows, cursor = fetch_page(ChatMessage, KEY, limit=25)
+        assert [row.id for row in rows] == conversation[40:]
+        assert cursor is None
+
+
+def test_malformed_cursor_starts_from_the_newest(app, conversation):
+    with app.test_request_context():
+        rows, _ = fetch_page(ChatMessage, KEY, before="yesterday", limit=5, archive=chat_message_archive)
+        assert [row.id for row in rows] == conversation[-5:]
+
+
+def test_history_api_pages_back_into_the_archive(login, conversation):
+    rider = login("Riley")
+    seen, before = [], None
+    while True:
+        body = rider.get("/api/v1/messages/Zed", query_string={"before": before} if before else {}).json
+        seen = [m["id"] for m in body["messages"]] + seen
+        before = body["before"]
+        if before is None:
+            break
+    assert seen == conversation
+
+
+def test_history_event_without_payload(login, socket_client):
+    sc = socket_client(login("Riley"))
+    assert sc.emit("chat_history", callback=True) == {"messages": [], "before": None}
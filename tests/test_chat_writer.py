@@ -0,0 +1,93 @@
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, select
+from sqlalchemy.exc import OperationalError
+
+from chat_writer import ChatWriter, IdAllocator
+
+metadata = MetaData()
+messages = Table(
+    "chat_message", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("sender", String(100), nullable=False),
+    Column("recipient", String(100), nullable=False),
+    Column("message", String, nullable=False),
+    Column("timestamp", String),
+)
+blocks = Table(
+    "id_block", metadata,
+    Column("name", String(50), primary_key=True),
+    Column("next_id", Integer, nullable=False),
+)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'chat.db'}")
+    metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def stored(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(messages.c.id, messages.c.message).order_by(messages.c.id)).all()
+
+
+def make_writer(engine, **kwargs):
+    allocator = IdAllocator(engine, blocks, messages, block_size=10)
+    return ChatWriter(engine, messages, allocator, flush_interval=0.01, retry_backoff=0, **kwargs)
+
+
+def test_batches_are_written_with_their_allocated_ids(engine):
+    writer = make_writer(engine)
+    ids = [writer.submit("Zed", "Riley", f"m{i}") for i in range(25)]
+    writer.close()
+
+    assert ids == list(range(1, 26))
+    assert stored(engine) == [(i, f"m{i - 1}") for i in ids]
+    assert (writer.written, writer.dropped) == (25, 0)
+
+
+def test_failed_batch_is_retried(engine):
+    failures = []
+
+    def flaky(conn, rows):
+        if not failures:
+            failures.append(len(rows))
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+    writer = make_writer(engine, after_write=flaky)
+    for i in range(3):
+        writer.submit("Zed", "Riley", f"m{i}")
+    writer.close()
+
+    assert failures == [3]
+    assert [m for _, m in stored(engine)] == ["m0", "m1", "m2"]
+    assert (writer.written, writer.dropped) == (3, 0)
+
+
+def test_a_bad_row_is_dropped_alone_after_the_retries(engine):
+    attempts = []
+    writer = make_writer(engine, max_retries=2, after_write=lambda conn, rows: attempts.append(len(rows)))
+    writer.submit("Zed", "Riley", "before")
+    writer.submit("Zed", "Riley", None)  # NOT NULL: fails the batch every time
+    writer.submit("Zed", "Riley", "after")
+    writer.close()
+
+    assert [m for _, m in stored(engine)] == ["before", "after"]
+    assert (writer.written, writer.dropped) == (2, 1)
+    assert attempts == [1, 1]  # only the single-row fallback writes got this far
+
+
+def test_closed_writer_refuses_messages(engine):
+    writer = make_writer(engine)
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.submit("Zed", "Riley", "late")
+
+
+def test_allocator_skips_ids_already_in_use(engine):
+    with engine.begin() as conn:
+        conn.execute(messages.insert(), [{"id": 41, "sender": "a", "recipient": "b", "message": "old"}])
+    allocator = IdAllocator(engine, blocks, messages, block_size=10)
+    assert [allocator.next_id() for _ in range(3)] == [42, 43, 44]
@@ -0,0 +1,84 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import inspect, text
+
+from extensions import db
+from migrations import run_migrations, local_day
+
+# The tables as the first release created them, before any migration step
+LEGACY_SCHEMA = """
+CREATE TABLE namakwaland (
+    id INTEGER PRIMARY KEY, user_name VARCHAR(250) NOT NULL, pickup INTEGER,
+    dropoff VARCHAR(500) NOT NULL, status INTEGER, timestamp DATETIME
+);
+CREATE TABLE namakwa_users (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL UNIQUE, password VARCHAR(200) NOT NULL);
+CREATE TABLE rider_booking (
+    id INTEGER PRIMARY KEY, user_name VARCHAR(100), pickup VARCHAR(100), dropoff VARCHAR(100),
+    seats INTEGER, timestamp DATETIME, date DATE
+);
+CREATE TABLE driver (
+    id INTEGER PRIMARY KEY, user_name VARCHAR(100) UNIQUE, pickup VARCHAR(100), dropoff VARCHAR(100),
+    seats INTEGER, is_available BOOLEAN, timestamp DATETIME
+);
+CREATE TABLE chat_message (
+    id INTEGER PRIMARY KEY, sender VARCHAR(100) NOT NULL, recipient VARCHAR(100) NOT NULL,
+    message TEXT NOT NULL, timestamp DATETIME
+);
+CREATE TABLE feedback (id INTEGER PRIMARY KEY, user_name VARCHAR(100), message TEXT NOT NULL, timestamp DATETIME);
+"""
+
+
+def table_sql(conn, name):
+    return conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).scalar()
+
+
+def test_fresh_database_migrates_and_reruns(app):
+    with app.app_context():
+        run_migrations(db)  # the fixture already ran it once
+        inspector = inspect(db.engine)
+        assert "ix_driver_stop_town" in {ix["name"] for ix in inspector.get_indexes("driver_stop")}
+        assert "ix_chat_message_conversation" in {ix["name"] for ix in inspector.get_indexes("chat_message")}
+
+
+def test_legacy_database_is_upgraded_in_place(make_app):
+    app = make_app(migrate=False)
+    late_evening = datetime.utcnow().replace(hour=23, minute=30) - timedelta(days=1)
+    with app.app_context():
+        with db.engine.begin() as conn:
+            for statement in LEGACY_SCHEMA.split(";"):
+                if statement.strip():
+                    conn.exec_driver_sql(statement)
+            conn.execute(text(
+                "INSERT INTO driver (id, user_name, pickup, dropoff, seats, is_available, timestamp) "
+                "VALUES (7, 'Zed', 'Springbok,Okiep', 'Garies', 3, 1, :ts)"
+            ), {"ts": late_evening})
+            conn.execute(text(
+                "INSERT INTO namakwaland (id, user_name, pickup, dropoff, status, timestamp) "
+                "VALUES (4, 'Riley', 'Okiep', 'Garies', 'Pending', :ts)"
+            ), {"ts": late_evening})
+            conn.execute(text(
+                "INSERT INTO chat_message (id, sender, recipient, message, timestamp) "
+                "VALUES (1, 'Zed', 'Riley', 'hi', :ts)"
+            ), {"ts": late_evening})
+
+        run_migrations(db)
+        run_migrations(db)
+
+        with db.engine.connect() as conn:
+            stops = conn.execute(text(
+                "SELECT kind, position, town FROM driver_stop WHERE driver_id = 7 ORDER BY kind DESC, position"
+            )).all()
+            assert stops == [("pickup", 0, "Springbok"), ("pickup", 1, "Okiep"), ("dropoff", 0, "Garies")]
+            driver = conn.execute(text("SELECT seats_taken, service_date FROM driver WHERE id = 7")).one()
+            assert driver.seats_taken == 0
+            assert date.fromisoformat(driver.service_date) == local_day(late_evening)
+            booking = conn.execute(text("SELECT service_date FROM namakwaland WHERE id = 4")).scalar()
+            assert date.fromisoformat(booking) == local_day(late_evening)
+            assert conn.execute(text("SELECT conversation FROM chat_message WHERE id = 1")).scalar() == "Riley|Zed"
+            assert conn.execute(text("SELECT unread FROM conversation_summary WHERE owner = 'Riley'")).scalar() == 0
+
+            # Rebuilt with AUTOINCREMENT, rows kept, and foreign keys still aimed at the live table
+            assert "AUTOINCREMENT" in table_sql(conn, "driver").upper()
+            assert "driver_new" not in table_sql(conn, "driver_stop")
+            assert conn.execute(text("SELECT seq FROM sqlite_sequence WHERE name = 'driver'")).scalar() == 7
+            assert {ix["name"] for ix in inspect(conn).get_indexes("driver")} >= {"ix_driver_day_available"}
@@ -0,0 +1,68 @@
+import pytest
+
+from extensions import limiter, socketio
+from ratelimit import Limit, MemoryBackend, SQLiteBackend, parse_limit
+
+
+RULES = ("signup_ip", "login", "booking", "writes", "messages", "events")
+
+
+def limits(**rules):
+    """RATE_LIMITS with every rule off except ``rules``."""
+    return {"RATE_LIMITS": {**dict.fromkeys(RULES, ""), **rules}}
+
+
+def client_for(app, user_name):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_name"] = user_name
+    return client
+
+
+def test_parse_limit():
+    assert parse_limit("30/minute") == Limit(0.5, 30)
+    assert parse_limit("2/second") == Limit(2, 2)
+    assert parse_limit("") is None
+
+
+@pytest.mark.parametrize("make_backend", [MemoryBackend, lambda: SQLiteBackend(":memory:")])
+def test_bucket_allows_a_burst_then_asks_to_wait(make_backend):
+    backend = make_backend()
+    limit = Limit(rate=1.0, burst=3)
+    assert [backend.take("k", limit) for _ in range(3)] == [0, 0, 0]
+    assert 0 < backend.take("k", limit) <= 1.0
+    assert backend.take("other", limit) == 0
+
+
+def test_route_answers_429_with_retry_after(make_app):
+    app = make_app(**limits(booking="3/minute"))
+    client = client_for(app, "Riley")
+
+    codes = [client.post("/api/v1/bookings", json={"cancel": []}).status_code for _ in range(4)]
+
+    assert codes == [200, 200, 200, 429]
+    limited = client.post("/api/v1/bookings", json={"cancel": []})
+    assert limited.json["error"] == "rate limited"
+    assert int(limited.headers["Retry-After"]) >= 1
+    # Reads are not limited, and other users have their own bucket
+    assert client.get("/api/v1/bookings").status_code == 200
+    assert client_for(app, "Pat").post("/api/v1/bookings", json={"cancel": []}).status_code == 200
+
+
+def test_socket_event_over_the_limit_is_skipped(make_app):
+    app = make_app(**limits(events="2/minute"))
+    sc = socketio.test_client(app, flask_test_client=client_for(app, "Riley"))
+    dropped = limiter.dropped["events"]
+
+    acks = [sc.emit("unread_count", callback=True) for _ in range(3)]
+
+    assert acks[2]["status"] == "rate_limited"
+    assert "status" not in acks[0]
+    assert any(p["name"] == "rate_limited" for p in sc.get_received())
+    assert limiter.dropped["events"] == dropped + 1
+    sc.disconnect()
+
+
+def test_empty_limit_turns_a_rule_off(make_app):
+    client = client_for(make_app(**limits()), "Riley")
+    assert {client.post("/api/v1/bookings", json={"cancel": []}).status_code for _ in range(30)} == {200}
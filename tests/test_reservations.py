@@ -0,0 +1,81 @@
+from extensions import db
+from models import Driver, RiderBooking
+
+
+def seats_taken(app, driver_id):
+    with app.app_context():
+        return db.session.get(Driver, driver_id).seats_taken
+
+
+def test_replayed_request_key_reserves_once(app, login, add_driver):
+    driver_id = add_driver(login("Zed"), seats=3)
+    rider = login("Riley")
+
+    first = rider.post(f"/reserve/{driver_id}", json={"seats": 2, "request_key": "k1"})
+    again = rider.post(f"/reserve/{driver_id}", json={"seats": 2}, headers={"Idempotency-Key": "k1"})
+
+    assert first.status_code == again.status_code == 200
+    assert first.json["status"] == "reserved" and first.json["seats_left"] == 1
+    assert again.json == {"status": "duplicate", "booking_id": first.json["booking_id"], "seats_left": None}
+    assert seats_taken(app, driver_id) == 2
+    with app.app_context():
+        assert RiderBooking.query.count() == 1
+
+
+def test_request_key_is_per_rider(app, login, add_driver):
+    driver_id = add_driver(login("Zed"), seats=3)
+    mine = login("Riley").post(f"/reserve/{driver_id}", json={"request_key": "same"})
+    theirs = login("Pat").post(f"/reserve/{driver_id}", json={"request_key": "same"})
+
+    assert mine.json["status"] == theirs.json["status"] == "reserved"
+    assert mine.json["booking_id"] != theirs.json["booking_id"]
+    assert seats_taken(app, driver_id) == 2
+
+
+def test_full_car_answers_409_and_claims_nothing(app, login, add_driver):
+    driver_id = add_driver(login("Zed"), seats=2)
+    assert login("Riley").post(f"/reserve/{driver_id}", json={"seats": 2}).status_code == 200
+
+    response = login("Pat").post(f"/reserve/{driver_id}", json={"seats": 1})
+
+    assert response.status_code == 409
+    assert response.json["status"] == "full"
+    assert seats_taken(app, driver_id) == 2
+    with app.app_context():
+        assert RiderBooking.query.filter_by(user_name="Pat").count() == 0
+
+
+def test_invalid_reservations(login, add_driver):
+    driver_id = add_driver(login("Zed"))
+    rider = login("Riley")
+
+    assert rider.post(f"/reserve/{driver_id}", json={"seats": -1}).status_code == 400
+    assert rider.post(f"/reserve/{driver_id}", json={"seats": "two"}).status_code == 400
+    assert rider.post("/reserve/999", json={"seats": 1}).status_code == 409
+    assert login(None).post(f"/reserve/{driver_id}", json={}).status_code == 401
+
+
+def test_reservation_over_socketio_acks_the_result(login, add_driver, socket_client):
+    driver_id = add_driver(login("Zed"), seats=1)
+    sc = socket_client(login("Riley"))
+
+    ack = sc.emit("reserve_seat", {"driver_id": driver_id, "request_key": "ws"}, callback=True)
+    replay = sc.emit("reserve_seat", {"driver_id": driver_id, "request_key": "ws"}, callback=True)
+
+    assert ack["status"] == "reserved" and ack["seats_left"] == 0
+    assert replay["status"] == "duplicate" and replay["booking_id"] == ack["booking_id"]
+
+
+def test_driver_delta_carries_free_seats_like_the_list(login, add_driver, socket_client):
+    driver_id = add_driver(login("Zed"), seats=3)
+    rider = login("Riley")
+    watcher = socket_client(login("Pat"))
+    watcher.emit("watch_routes", {"routes": ["*"], "kind": "driver"}, callback=True)
+    watcher.get_received()
+
+    rider.post(f"/reserve/{driver_id}", json={"seats": 1})
+
+    deltas = [p["args"][0] for p in watcher.get_received() if p["name"] == "route_delta"]
+    assert [d["item"]["seats"] for d in deltas if d["item"]["id"] == driver_id] == [2]
+    listed = login("Pat").get("/api/v1/drivers").json["drivers"]
+    assert [d["seats"] for d in listed if d["id"] == driver_id] == [2]
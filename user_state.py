@@ -0,0 +1,75 @@
+"""Per-user page state behind a small LRU/TTL cache.
+
+``namax``, ``be_a_driver`` and friends only need to know whether a user
+has any bookings, their booking for today and their driver row. That is
+loaded once per user per day (``loader`` returns a ``UserState``) and
+served from memory until a write route invalidates it or the TTL runs
+out. The TTL bounds staleness when several workers each hold a cache.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import date
+
+
+UserState = namedtuple("UserState", "has_bookings booking_today driver")
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize=10000, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class UserStateCache:
+    def __init__(self, loader, maxsize=10000, ttl=60.0):
+        self._loader = loader
+        self.cache = TTLCache(maxsize, ttl)
+
+    def get(self, user_name):
+        key = (user_name, date.today())
+        state = self.cache.get(key)
+        if state is None:
+            state = self._loader(user_name)
+            self.cache.set(key, state)
+        return state
+
+    def invalidate(self, user_name):
+        if user_name:
+            self.cache.delete((user_name, date.today()))
+
+    def clear(self):
+        self.cache.clear()
@@ -0,0 +1,4 @@
+"""Blueprints, one per area of the app; registered by create_app()."""
+from views import api, auth, booking, chat, driver
+
+BLUEPRINTS = (auth.bp, booking.bp, driver.bp, chat.bp, api.bp)
@@ -0,0 +1,275 @@
+"""JSON API (v1) for the PWA: compact lists with field selection and batch booking writes.
+
+Every list takes ``fields=a,b`` (or ``fields[drivers]=a,b`` on /today) to
+trim each row to the fields the client shows. GET responses carry an
+ETag and, for driver/booking data, a Last-Modified from the last write
+to that data, so a client that sends If-None-Match/If-Modified-Since
+gets a bodiless 304 until something changes. POSTs must be JSON, which
+a cross-site form cannot send.
+"""
+import hashlib
+import json
+from datetime import date, datetime
+
+from flask import Blueprint, current_app, request, session
+from sqlalchemy import desc
+
+import services
+from archive import read_archive
+from chat_history import conversation_key, fetch_page
+from extensions import db, response_cache, limiter
+from forms import TOWNS
+from matching import split_stops
+from models import Namakwaland, ChatMessage, namakwaland_archive, chat_message_archive
+from views.booking import MY_BOOKINGS_LIMIT
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to compact stdlib json
+    orjson = None
+
+bp = Blueprint("api", __name__, url_prefix="/api/v1")
+
+MAX_BATCH = 20
+
+FIELDS = {
+    "drivers": ("id", "user_name", "pickup", "dropoff", "seats", "timestamp", "detour_minutes"),
+    "riders": ("id", "user_name", "pickup", "dropoff", "status", "timestamp"),
+    "bookings": ("id", "pickup", "dropoff", "status", "timestamp", "service_date", "driver_id", "archived"),
+    "messages": ("id", "sender", "recipient", "message", "timestamp"),
+}
+DEFAULTS = {"archived": False}  # only archive rows carry the attribute
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+@bp.errorhandler(ApiError)
+def handle_api_error(error):
+    return json_response({"error": error.message}, error.status)
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default)
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=_default).encode()
+
+
+def json_response(payload, status=200, scopes=()):
+    """Serialize ``payload``; GETs get an ETag, Last-Modified for ``scopes`` and 304 handling."""
+    response = current_app.response_class(dumps(payload), status=status, mimetype="application/json")
+    if request.method == "GET" and status == 200:
+        response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+        if scopes:
+            response.last_modified = response_cache.last_modified(*scopes)
+        response.headers["Cache-Control"] = "private, no-cache"
+        response.make_conditional(request)
+    return response
+
+
+def api_user():
+    user_name = session.get("user_name")
+    if not user_name:
+        raise ApiError(401, "login required")
+    return user_name
+
+
+def selected_fields(resource):
+    """The fields to return for ``resource``: ``fields[resource]``, else ``fields``, else all."""
+    raw = request.args.get(f"fields[{resource}]") or request.args.get("fields")
+    if not raw:
+        return FIELDS[resource]
+    fields = tuple(f for f in raw.split(",") if f)
+    unknown = [f for f in fields if f not in FIELDS[resource]]
+    if unknown:
+        raise ApiError(400, f"unknown {resource} fields: {', '.join(unknown)}")
+    return fields
+
+
+def project(rows, resource, extra=None):
+    """Rows (ORM objects, Core rows or namedtuples) as dicts of the selected fields."""
+    fields = selected_fields(resource)
+    extra = extra or {}
+    return [
+        {f: extra[f].get(row.id) if f in extra else getattr(row, f, DEFAULTS.get(f)) for f in fields}
+        for row in rows
+    ]
+
+
+# --------------------------
+# Reads
+# --------------------------
+def list_drivers(user_name):
+    pickup = request.args.get("pickup")
+    dropoff = request.args.get("dropoff")
+    detours = {}
+    if not (pickup and dropoff):
+        drivers = services.route_index.drivers_today(exclude=user_name)
+    else:
+        drivers = services.route_index.drivers_for_route(pickup, dropoff, exclude=user_name)
+        ranked = services.town_matrix().rank(drivers, pickup, dropoff, max_detour_km=current_app.config['MAX_DETOUR_KM'])
+        drivers = [driver for driver, _, _ in ranked]
+        detours = {driver.id: round(minutes, 1) for driver, _, minutes in ranked}
+    return project(drivers, "drivers", {"detour_minutes": detours})
+
+
+def list_riders():
+    pickup = request.args.get("pickup")
+    dropoff = request.args.get("dropoff")
+    if not pickup or not dropoff:
+        raise ApiError(400, "pickup and dropoff are required")
+    return project(services.route_index.riders_for_stops(split_stops(pickup), split_stops(dropoff)), "riders")
+
+
+def list_bookings(user_name):
+    bookings = (
+        Namakwaland.query.filter_by(user_name=user_name)
+        .order_by(desc(Namakwaland.timestamp))
+        .limit(MY_BOOKINGS_LIMIT)
+        .all()
+    )
+    bookings += read_archive(
+        db.session, namakwaland_archive, namakwaland_archive.c.user_name == user_name,
+        [namakwaland_archive.c.timestamp.desc()], limit=MY_BOOKINGS_LIMIT - len(bookings)
+    )
+    return project(bookings, "bookings")
+
+
+@bp.route("/drivers")
+def drivers():
+    return json_response({"drivers": list_drivers(api_user())}, scopes=("drivers",))
+
+
+@bp.route("/riders")
+def riders():
+    api_user()
+    return json_response({"riders": list_riders()}, scopes=("bookings",))
+
+
+@bp.route("/bookings")
+def bookings():
+    return json_response({"bookings": list_bookings(api_user())}, scopes=("bookings",))
+
+
+@bp.route("/today")
+def today():
+    """Several lists in one round trip: ``include=drivers,riders,bookings``."""
+    user_name = api_user()
+    include = [name for name in (request.args.get("include") or "drivers,bookings").split(",") if name]
+    readers = {
+        "drivers": lambda: list_drivers(user_name),
+        "riders": list_riders,
+        "bookings": lambda: list_bookings(user_name),
+    }
+    unknown = [name for name in include if name not in readers]
+    if unknown:
+        raise ApiError(400, f"unknown lists: {', '.join(unknown)}")
+
+    payload = {name: readers[name]() for name in include}
+    scopes = {"drivers"} if "drivers" in include else set()
+    if "riders" in include or "bookings" in include:
+        scopes.add("bookings")
+    return json_response(payload, scopes=tuple(sorted(scopes)))
+
+
+@bp.route("/messages/<other>")
+def messages(other):
+    """The latest page of the conversation with ``other`` (oldest first); ``before`` pages back."""
+    user_name = api_user()
+    page, older_cursor = fetch_page(
+        ChatMessage, conversation_key(user_name, other),
+        before=request.args.get("before"), archive=chat_message_archive
+    )
+    return json_response({"messages": project(page, "messages"), "before": older_cursor})
+
+
+# --------------------------
+# Batch writes
+# --------------------------
+def is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+@bp.route("/bookings", methods=["POST"])
+@limiter.limit("booking")
+def write_bookings():
+    """Create and/or cancel several bookings in one transaction.
+
+    Body: ``{"create": [{"pickup": ..., "dropoff": ...}], "cancel": [id, ...]}``.
+    Invalid items are reported in ``errors``: creates and malformed cancels by
+    position, unknown booking ids by id. The rest are applied.
+    As on /booking, a rider gets one booking per day: a create is refused
+    while today's booking stands (unless this batch cancels it), and only
+    the first valid create is applied.
+    """
+    user_name = api_user()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        raise ApiError(415, "expected a JSON object")
+    creates = data.get("create") or []
+    cancels = data.get("cancel") or []
+    if not isinstance(creates, list) or not isinstance(cancels, list):
+        raise ApiError(400, "create and cancel must be lists")
+    if len(creates) + len(cancels) > MAX_BATCH:
+        raise ApiError(413, f"at most {MAX_BATCH} operations per request")
+
+    errors = []
+    valid = [booking_id for booking_id in cancels if is_id(booking_id)]
+    cancel_errors = [
+        {"cancel": index, "error": "not a booking id"} for index, booking_id in enumerate(cancels) if not is_id(booking_id)
+    ]
+    ids = set(valid)
+    cancelled = Namakwaland.query.filter(
+        Namakwaland.id.in_(ids), Namakwaland.user_name == user_name
+    ).all() if ids else []
+    found = {booking.id for booking in cancelled}
+
+    new_bookings = []
+    booked_today = bool(creates) and services.has_booking_today(user_name, excluding=found)
+    for index, item in enumerate(creates):
+        pickup = item.get("pickup") if isinstance(item, dict) else None
+        dropoff = item.get("dropoff") if isinstance(item, dict) else None
+        if pickup not in TOWNS or dropoff not in TOWNS:
+            errors.append({"create": index, "error": "pickup and dropoff must be known towns"})
+        elif pickup == dropoff:
+            errors.append({"create": index, "error": "pickup and dropoff must differ"})
+        elif booked_today:
+            errors.append({"create": index, "error": "already booked today"})
+        else:
+            new_bookings.append(Namakwaland(user_name=user_name, pickup=pickup, dropoff=dropoff, status="Pending"))
+            booked_today = True
+    errors += cancel_errors + [{"cancel": booking_id, "error": "not found"} for booking_id in valid if booking_id not in found]
+
+    if not new_bookings and not cancelled:
+        return json_response({"created": [], "cancelled": [], "errors": errors}, 400 if errors else 200)
+
+    removed = [(booking.id, booking.pickup, booking.dropoff) for booking in cancelled]
+    db.session.add_all(new_bookings)
+    for booking in cancelled:
+        db.session.delete(booking)
+    services.data_changed(db.session, "bookings")
+    db.session.commit()
+
+    services.user_state.invalidate(user_name)
+    for booking_id, pickup, dropoff in removed:
+        services.route_index.remove_rider(booking_id)
+        services.route_publisher.rider_removed(booking_id, pickup, dropoff)
+    for booking in new_bookings:
+        services.route_index.add_rider(booking)
+        services.route_publisher.rider_added(booking)
+
+    return json_response({
+        "created": project(new_bookings, "bookings"),
+        "cancelled": sorted(found),
+        "errors": errors
+    })
@@ -0,0 +1,147 @@
+"""Auth blueprint: home page, signup/login, logout and feedback."""
+from datetime import datetime
+
+from flask import Blueprint, render_template, redirect, url_for, request, flash, session
+
+import services
+import feedback_store
+from database import read_only
+from extensions import db, response_cache, limiter
+from forms import Namakwa_Users
+from models import NamakwaUsers, Feedback, FeedbackCount, feedback_archive
+from passwords import HashQueueFull
+from ratelimit import client_ip
+
+bp = Blueprint("auth", __name__)
+
+
+def login_name():
+    """Login attempts are limited per account name, whichever address they come from."""
+    name = (request.form.get("name") or "").strip().lower()
+    return f"name:{name}" if name else None
+
+
+# --------------------------
+# Routes: Home & Signup
+# --------------------------
+@bp.route("/")
+def home():
+    return render_template("index.html")
+
+
+@bp.route("/signup", methods=["GET", "POST"])
+@limiter.limit("signup_ip", key=client_ip)
+@limiter.limit("login", key=login_name)
+def signup():
+    session["first_time"] = True
+    next_page = request.args.get('next')
+    if "user_id" in session:
+        return redirect(next_page or url_for("booking.namax"))
+
+    user = Namakwa_Users()
+    if user.validate_on_submit():
+        new_name = user.name.data.strip()
+        password = user.password.data.strip()
+
+        # Validate password
+        if len(password) < 4:
+            flash("Wagwoord moet minstens 4 karakters wees.", "danger")
+            return redirect(url_for("auth.signup"))
+
+        existing_user = NamakwaUsers.query.filter_by(name=new_name).first()
+
+        try:
+            if existing_user:
+                password_ok, new_hash = services.password_hasher.verify(existing_user.password, password)
+            else:
+                hashed_pw = services.password_hasher.hash(password)
+        except HashQueueFull:
+            flash("Dit is nou baie besig. Probeer asseblief oor 'n oomblik weer.", "warning")
+            return render_template("signup.html", user=user), 503
+
+        if existing_user:
+            if password_ok:
+                if new_hash:
+                    existing_user.password = new_hash
+                    db.session.commit()
+
+                session.permanent = True
+                session["user_id"] = existing_user.id
+                session["user_name"] = existing_user.name
+
+                session["show_intro"] = True   # <-- ADD THIS
+
+                flash(f"Awe, {existing_user.name}! Jy is klaar deel van Nama X Press 👋", "success")
+                return redirect(next_page or url_for("booking.namax"))
+            else:
+                flash("Oeps! Verkeerde wagwoord. Probeer asseblief weer.", "danger")
+                return redirect(url_for("auth.signup"))
+        else:
+            new_user = NamakwaUsers(name=new_name, password=hashed_pw)
+            db.session.add(new_user)
+            db.session.commit()
+
+            session.permanent = True
+            session["user_id"] = new_user.id
+            session["user_name"] = new_user.name
+
+            session["show_intro"] = True
+
+            flash(f"Welkom by Nama X Press, {new_name}! 🚀 Jy is suksesvol geregistreer.", "success")
+
+            return redirect(next_page or url_for("booking.namax"))
+
+    return render_template("signup.html", user=user)
+
+
+@bp.route("/clear_intro", methods=["POST"])
+def clear_intro():
+    session["show_intro"] = False
+    return "", 204
+
+
+@bp.route("/logout")
+def logout():
+    session.clear()
+    return redirect(url_for("auth.signup"))
+
+
+def pending_flashes():
+    """Cached feedback pages differ only by the flash messages they show."""
+    return session.get("_flashes")
+
+
+@bp.route("/feedback", methods=["GET", "POST"])
+@limiter.limit("writes")
+@response_cache.cached("feedback", vary=pending_flashes)
+@read_only
+def feedback():
+    """Feedback form, then the newest entries a page at a time; ``q`` searches, ``before`` pages back."""
+    user_name = session.get("user_name", "Anonymous")
+
+    if request.method == "POST":
+        msg = (request.form.get("message") or "").strip()
+
+        if msg:
+            now = datetime.utcnow()
+            db.session.add(Feedback(user_name=user_name, message=msg, timestamp=now))
+            feedback_store.record(db.session, FeedbackCount.__table__, user_name, now.date())
+            services.data_changed(db.session, "feedback")
+            db.session.commit()
+            flash("Thanks for your feedback! 😊", "success")
+            return redirect(url_for("auth.feedback"))
+
+        flash("Please write something first.", "danger")
+
+    q = request.args.get("q", "").strip()
+    before = request.args.get("before")
+    feedback_list, older_cursor = feedback_store.fetch_page(
+        db.session, Feedback.__table__, feedback_archive, before=before, q=q
+    )
+    return render_template(
+        "feedback.html",
+        feedback_list=feedback_list,
+        older_cursor=older_cursor,
+        q=q,
+        stats=None if before or q else feedback_store.stats(db.session, FeedbackCount.__table__)
+    )
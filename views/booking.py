@@ -0,0 +1,245 @@
+"""Booking blueprint: a rider's bookings, today's drivers and seat reservations."""
+import uuid
+
+from flask import Blueprint, current_app, render_template, redirect, url_for, request, flash, session, jsonify
+from sqlalchemy import desc
+
+import services
+from archive import read_archive
+from database import read_only
+from extensions import db, socketio, response_cache, limiter
+from forms import BookingForm
+from models import Namakwaland, RiderBooking, Driver, namakwaland_archive
+from reservations import reserve_seats, MAX_SEATS_PER_REQUEST
+
+bp = Blueprint("booking", __name__)
+
+
+def session_user():
+    return session.get("user_name")
+
+
+# --------------------------
+# Routes: Booking
+# --------------------------
+@bp.route("/booking", methods=['GET', 'POST'])
+@limiter.limit("booking")
+def namax():
+    form = BookingForm()
+    user_name = session.get("user_name")
+
+    if not user_name:
+        flash("Jy moet eers aanmeld om bestuurder te word.", "warning")
+        return redirect(url_for("auth.signup", next=url_for('driver.be_a_driver')))
+
+    state = services.user_state.get(user_name)
+    if request.method == "POST" and bool(state.booking_today) != services.has_booking_today(user_name):
+        # The cached state is only good enough for showing the page; a
+        # booking made or cancelled elsewhere must count before we insert
+        services.user_state.invalidate(user_name)
+        state = services.user_state.get(user_name)
+    show_button = state.has_bookings
+
+    # Check if user already booked today
+    booking_today = state.booking_today
+
+    if booking_today:
+        flash("Jy het reeds vandag ’n rit bespreek.", "warning")
+        formatted_time = booking_today.timestamp.strftime("%H:%M:%S")
+        return render_template(
+            "booking.html",
+            form=form,
+            tyd=formatted_time,
+            information=[booking_today],
+            show_button=True,
+            form_submitted=True,
+            user_name=user_name
+        )
+
+    # Handle new booking
+    if form.validate_on_submit():
+        pickup = form.pickup.data
+        dropoff = form.dropoff.data
+
+        if pickup == dropoff:
+            flash("Pickup en Drop-off kan nie dieselfde wees nie!", "danger")
+            return render_template(
+                "booking.html",
+                form=form,
+                tyd=None,
+                information=[],
+                show_button=show_button,
+                form_submitted=False,
+                user_name=user_name
+            )
+
+        new_booking = Namakwaland(user_name=user_name, pickup=pickup, dropoff=dropoff, status="Pending")
+        db.session.add(new_booking)
+        services.data_changed(db.session, "bookings")
+        db.session.commit()
+        services.user_state.invalidate(user_name)
+        services.route_index.add_rider(new_booking)
+        services.route_publisher.rider_added(new_booking)
+
+        flash("Booking successful!", "success")
+
+        formatted_time = new_booking.timestamp.strftime("%H:%M:%S")
+        return render_template(
+            "booking.html",
+            form=form,
+            tyd=formatted_time,
+            information=[new_booking],
+            show_button=True,
+            form_submitted=True,
+            user_name=user_name
+        )
+
+    return render_template(
+        "booking.html",
+        form=form,
+        tyd=None,
+        information=[],
+        show_button=show_button,
+        form_submitted=False,
+        user_name=user_name
+    )
+
+
+# --------------------------
+# Routes: Drivers Today
+# --------------------------
+@bp.route("/drivers_today")
+@response_cache.cached("drivers", vary=session_user)
+def drivers_today():
+    user_name = session.get("user_name")
+    if not user_name:
+        flash("Jy moet eers aanmeld om bestuurders te sien.", "danger")
+        return redirect(url_for("auth.signup"))
+
+    # Drivers available today (exclude current user); for a route, ranked by
+    # how far out of their way the rider's pickup and dropoff are
+    pickup = request.args.get("pickup")
+    dropoff = request.args.get("dropoff")
+    detours = {}
+    if not (pickup and dropoff):
+        drivers = services.route_index.drivers_today(exclude=user_name)
+    else:
+        drivers = services.route_index.drivers_for_route(pickup, dropoff, exclude=user_name)
+        ranked = services.town_matrix().rank(drivers, pickup, dropoff, max_detour_km=current_app.config['MAX_DETOUR_KM'])
+        drivers = [driver for driver, _, _ in ranked]
+        detours = {driver.id: minutes for driver, _, minutes in ranked}
+
+    if not drivers:
+        flash("Geen bestuurders beskikbaar vandag nie.", "info")
+
+    return render_template(
+        "drivers_today.html",
+        drivers=drivers,
+        detours=detours,
+        user_name=user_name,
+        pickup=pickup,
+        dropoff=dropoff
+    )
+
+
+# --------------------------
+# Routes: My Bookings
+# --------------------------
+MY_BOOKINGS_LIMIT = 50  # most recent first; older bookings are not shown
+
+
+@bp.route("/my_bookings")
+@response_cache.cached("bookings", vary=session_user)
+@read_only
+def my_bookings():
+    user_name = request.args.get('user_name') or session.get("user_name")
+    if not user_name:
+        flash("Jy moet eers aanmeld om jou besprekings te sien.", "danger")
+        return redirect(url_for("auth.signup"))
+
+    user_bookings = (
+        Namakwaland.query.filter_by(user_name=user_name)
+        .order_by(desc(Namakwaland.timestamp))
+        .limit(MY_BOOKINGS_LIMIT)
+        .all()
+    )
+    # Past days live in the archive once the daily rollover has run
+    user_bookings += read_archive(
+        db.session, namakwaland_archive, namakwaland_archive.c.user_name == user_name,
+        [namakwaland_archive.c.timestamp.desc()], limit=MY_BOOKINGS_LIMIT - len(user_bookings)
+    )
+    return render_template("my_bookings.html", show_drivers_button=True, bookings=user_bookings, user_name=user_name)
+
+
+@bp.route("/delete_booking/<int:booking_id>", methods=["POST"])
+@limiter.limit("booking")
+def delete_booking(booking_id):
+    booking = Namakwaland.query.get(booking_id)
+    if booking:
+        pickup, dropoff = booking.pickup, booking.dropoff
+        db.session.delete(booking)
+        services.data_changed(db.session, "bookings")
+        db.session.commit()
+        services.user_state.invalidate(booking.user_name)
+        services.route_index.remove_rider(booking_id)
+        services.route_publisher.rider_removed(booking_id, pickup, dropoff)
+        flash("Booking deleted successfully!", "success")
+    else:
+        flash("Booking not found.", "danger")
+    return redirect(url_for("booking.my_bookings", user_name=session.get("user_name")))
+
+
+# --------------------------
+# Seat Reservations
+# --------------------------
+def reserve_for(user_name, data):
+    """Validate a reservation request and claim the seats; returns (status code, body)."""
+    try:
+        driver_id = int(data.get("driver_id"))
+        seats = int(data.get("seats") or 1)
+    except (TypeError, ValueError):
+        return 400, {"status": "invalid", "message": "driver_id and seats must be numbers"}
+    if not 1 <= seats <= MAX_SEATS_PER_REQUEST:
+        return 400, {"status": "invalid", "message": f"seats must be 1-{MAX_SEATS_PER_REQUEST}"}
+    request_key = str(data.get("request_key") or uuid.uuid4().hex)[:64]
+
+    result = reserve_seats(
+        db.engine, Driver.__table__, RiderBooking.__table__,
+        driver_id, user_name, seats, request_key,
+        pickup=data.get("pickup"), dropoff=data.get("dropoff"),
+        before_commit=lambda conn: services.data_changed(conn, "drivers")
+    )
+    if result.status == "full":
+        return 409, {"status": "full", "message": "Not enough free seats with this driver."}
+
+    if result.status == "reserved":
+        driver = db.session.get(Driver, driver_id, populate_existing=True)  # seats_taken was updated in Core
+        services.user_state.invalidate(driver.user_name)
+        response_cache.bump("drivers")
+        services.route_index.add_driver(driver)
+        services.route_publisher.driver_saved(driver, services.route_publisher.driver_keys(driver))
+    return 200, {"status": result.status, "booking_id": result.booking_id, "seats_left": result.seats_left}
+
+
+@bp.route("/reserve/<int:driver_id>", methods=["POST"])
+@limiter.limit("booking")
+def reserve(driver_id):
+    user_name = session.get("user_name")
+    if not user_name:
+        return jsonify({"status": "unauthorized"}), 401
+
+    data = dict(request.get_json(silent=True) or request.form)
+    data["driver_id"] = driver_id
+    data.setdefault("request_key", request.headers.get("Idempotency-Key"))
+    status, body = reserve_for(user_name, data)
+    return jsonify(body), status
+
+
+@socketio.on("reserve_seat")
+def handle_reserve_seat(data):
+    """Same as POST /reserve/<driver_id>; the result comes back as the ack."""
+    user_name = session.get("user_name")
+    if not user_name:
+        return {"status": "unauthorized"}
+    _, body = reserve_for(user_name, data or {})
+    return body
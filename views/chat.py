@@ -0,0 +1,206 @@
+"""Chat blueprint, plus the Socket.IO presence, route-watching and messaging events."""
+from datetime import datetime
+
+from flask import Blueprint, render_template, redirect, url_for, request, flash, session
+from flask_socketio import join_room
+
+import services
+from chat_history import conversation_key, fetch_page
+from database import read_only
+from extensions import db, socketio, limiter
+from inbox import record_messages, mark_read, unread_total, conversations
+from models import ChatMessage, ConversationSummary, chat_message_archive
+from presence import PresenceBroadcaster
+
+bp = Blueprint("chat", __name__)
+
+
+# --------------------------
+# Socket.IO: Real-time Users & Messaging
+# --------------------------
+@socketio.on("connect")
+def handle_connect():
+    user_name = session.get("user_name")
+    services.presence.connect(request.sid, user_name)
+    services.presence_broadcaster.touch(user_name)
+
+
+@socketio.on("disconnect")
+def handle_disconnect():
+    services.presence.disconnect(request.sid)
+    services.presence_broadcaster.touch(session.get("user_name"))
+
+
+@socketio.on("subscribe_presence")
+def handle_subscribe_presence(data=None):
+    """Join the presence room; reply with the count and the listed users' status."""
+    join_room(PresenceBroadcaster.ROOM)
+    users = (data or {}).get("users") or []
+    socketio.emit("update_users", services.presence_broadcaster.snapshot(users[:200]), to=request.sid)
+
+
+@socketio.on("watch_routes")
+def handle_watch_routes(data):
+    """Join the rooms for ``data["routes"]``: ``[[pickup, dropoff], ...]`` or ``["*"]``.
+
+    ``data["kind"]`` ("driver" or "rider") limits them to that kind's deltas.
+    """
+    data = data or {}
+    rooms = services.route_publisher.rooms_for(data.get("routes"), data.get("kind"))
+    for room in rooms:
+        join_room(room)
+    return {"watching": len(rooms)}
+
+
+@socketio.on("private_message")
+def handle_private_message(data):
+    sender = session.get("user_name")
+    recipient = data.get("to")
+    message = data.get("message")
+
+    if not sender or not recipient or not message:
+        return
+
+    # Save message in database (queued for a batched insert in write-behind mode);
+    # the inbox summaries are updated in the same transaction
+    conversation = conversation_key(sender, recipient)
+    if services.chat_writer is not None:
+        message_id = services.chat_writer.submit(sender, recipient, message, conversation=conversation)
+        timestamp = datetime.utcnow()
+    else:
+        timestamp = datetime.utcnow()
+        chat_message = ChatMessage(sender=sender, recipient=recipient, message=message,
+                                   conversation=conversation, timestamp=timestamp)
+        db.session.add(chat_message)
+        db.session.flush()
+        message_id = chat_message.id
+        record_messages(db.session, ConversationSummary.__table__, [{
+            "id": message_id, "sender": sender, "recipient": recipient, "message": message,
+            "timestamp": timestamp, "conversation": conversation
+        }])
+        db.session.commit()
+
+    # Inbox deltas: the recipient has one more unread message, and both
+    # sides' conversation lists get the new last message
+    delta = {"from": sender, "message": message, "id": message_id, "timestamp": timestamp.isoformat()}
+    for sid in services.presence.sids_for(recipient):
+        socketio.emit("inbox_delta", {**delta, "with": sender, "unread_delta": 1}, to=sid)
+    for sid in services.presence.sids_for(sender):
+        socketio.emit("inbox_delta", {**delta, "with": recipient, "unread_delta": 0}, to=sid)
+
+    # Emit message to recipient on every session they have open, on any worker
+    for sid in services.presence.sids_for(recipient):
+        socketio.emit("private_message", {
+            "from": sender,
+            "message": message,
+            "id": message_id
+        }, to=sid)
+
+    # Emit message back to sender so it appears instantly
+    socketio.emit("private_message", {
+        "from": sender,
+        "message": message,
+        "id": message_id
+    }, to=request.sid)
+
+
+@socketio.on("mark_read")
+def handle_mark_read(data):
+    """Mark the conversation with ``data["with"]`` read; every open session gets the delta."""
+    user_name = session.get("user_name")
+    other = (data or {}).get("with")
+    if not user_name or not other:
+        return {"unread": 0}
+
+    if services.chat_writer is not None:
+        services.chat_writer.flush()  # so queued messages are not counted after this
+    was_unread = mark_read(db.session, ConversationSummary.__table__, user_name, other)
+    db.session.commit()
+    if was_unread:
+        for sid in services.presence.sids_for(user_name):
+            socketio.emit("inbox_delta", {"with": other, "unread_delta": -was_unread}, to=sid)
+    return {"unread": 0}
+
+
+@socketio.on("unread_count")
+def handle_unread_count(data=None):
+    """Total unread messages, for the badge; kept current by inbox_delta afterwards."""
+    user_name = session.get("user_name")
+    if not user_name:
+        return {"unread": 0}
+    return {"unread": unread_total(db.session, ConversationSummary.__table__, user_name)}
+
+
+@bp.route("/inbox")
+@read_only
+def inbox():
+    user_name = session.get("user_name")
+    if not user_name:
+        flash("Jy moet eers aanmeld om jou boodskappe te sien.", "danger")
+        return redirect(url_for("auth.signup"))
+
+    return render_template(
+        "inbox.html",
+        conversations=conversations(db.session, ConversationSummary.__table__, user_name),
+        user_name=user_name
+    )
+
+
+@bp.route("/chat/<driver_name>/<rider_name>")
+@read_only
+def chat(driver_name, rider_name):
+    user_name = session.get("user_name")
+    if not user_name:
+        flash("Jy moet eers aanmeld om te kan gesels.", "danger")
+        return redirect(url_for("auth.signup"))
+
+    # Newest page of the conversation; older pages come over Socket.IO
+    messages, older_cursor = fetch_page(
+        ChatMessage, conversation_key(driver_name, rider_name), archive=chat_message_archive
+    )
+
+    return render_template(
+        "chat.html",
+        messages=messages,
+        older_cursor=older_cursor,
+        user_name=user_name,
+        driver_name=driver_name,
+        rider_name=rider_name,
+        chatting_with=driver_name if user_name == rider_name else rider_name
+    )
+
+
+@socketio.on("chat_history")
+def handle_chat_history(data=None):
+    """Return the page of messages before ``data["before"]`` with ``data["with"]``."""
+    data = data or {}
+    user_name = session.get("user_name")
+    other = data.get("with")
+    if not user_name or not other:
+        return {"messages": [], "before": None}
+
+    messages, older_cursor = fetch_page(
+        ChatMessage, conversation_key(user_name, other), before=data.get("before"), archive=chat_message_archive
+    )
+    return {
+        "messages": [
+            {"id": m.id, "from": m.sender, "message": m.message, "timestamp": m.timestamp.isoformat()}
+            for m in messages
+        ],
+        "before": older_cursor
+    }
+
+
+@bp.route("/delete_message/<int:msg_id>", methods=["POST"])
+@limiter.limit("writes")
+def delete_message(msg_id):
+    message = ChatMessage.query.get(msg_id)
+    current_user = session.get("user_name")
+
+    if message and message.sender == current_user:
+        db.session.delete(message)
+        db.session.commit()
+        flash("Message deleted!", "success")
+    else:
+        flash("You can only delete your own messages.", "danger")
+    return redirect(request.referrer or url_for("auth.home"))
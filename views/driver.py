@@ -0,0 +1,164 @@
+"""Driver blueprint: a driver's listing and today's riders on their route."""
+from datetime import datetime, date
+
+from flask import Blueprint, render_template, redirect, url_for, request, flash, session
+
+import services
+from extensions import db, response_cache, limiter
+from forms import DriverSignupForm, TOWNS_JSON, town_options
+from matching import split_stops
+from models import Driver
+from views.booking import session_user
+
+bp = Blueprint("driver", __name__)
+
+
+# --------------------------
+# Routes: Driver Signup & Info
+# --------------------------
+@bp.route("/be_a_driver", methods=["GET", "POST"])
+@limiter.limit("booking")
+def be_a_driver():
+    if "user_name" not in session:
+        flash("Jy moet eers aanmeld om 'n bestuurder te word.", "danger")
+        return redirect(url_for("auth.signup"))
+
+    user_name = session["user_name"]
+    form = DriverSignupForm()
+    # Rendering only needs the cached snapshot; a POST edits the real row
+    driver = services.user_state.get(user_name).driver
+    show_riders_button = bool(driver)
+
+    def normalize_list(main_val, extras):
+        """Return deduped list with main_val first, max length 5."""
+        vals = []
+        if main_val and str(main_val).strip():
+            vals.append(str(main_val).strip())
+        for v in extras:
+            if v and str(v).strip() and str(v).strip() not in vals:
+                vals.append(str(v).strip())
+        return vals[:5]
+
+    if request.method == "POST":
+        driver = Driver.query.filter_by(user_name=user_name).first()
+        main_pickup = request.form.get("pickup") or (form.pickup.data if form.pickup.data else "")
+        main_dropoff = request.form.get("dropoff") or (form.dropoff.data if form.dropoff.data else "")
+        extra_pickups = request.form.getlist("pickup[]")
+        extra_dropoffs = request.form.getlist("dropoff[]")
+
+        pickups_list = normalize_list(main_pickup, extra_pickups)
+        dropoffs_list = normalize_list(main_dropoff, extra_dropoffs)
+
+        try:
+            seats_val = int(request.form.get("seats") or (form.seats.data if form.seats.data else 0))
+        except Exception:
+            seats_val = 0
+
+        if not pickups_list or not dropoffs_list:
+            flash("Kies asseblief ten minste een afhaal- en een aflaai-plek.", "danger")
+            return render_template(
+                "be_a_driver.html",
+                user_name=user_name,
+                form=form,
+                driver=driver,
+                show_riders_button=show_riders_button,
+                town_options=town_options,
+                towns_json=TOWNS_JSON
+            )
+
+        # Routes the driver is listed under today, before this change
+        old_keys = services.route_publisher.driver_keys(driver) if driver and driver.service_date == date.today() else set()
+
+        if driver:
+            if driver.service_date != date.today():
+                driver.seats_taken = 0  # seats filled on an earlier day
+            driver.seats = seats_val
+            driver.is_available = True
+            driver.timestamp = datetime.utcnow()
+            driver.service_date = date.today()
+        else:
+            driver = Driver(
+                user_name=user_name,
+                seats=seats_val,
+                is_available=True
+            )
+            db.session.add(driver)
+        driver.set_stops(pickups_list, dropoffs_list)
+
+        services.data_changed(db.session, "drivers")
+        db.session.commit()
+        services.user_state.invalidate(user_name)
+        services.route_index.add_driver(driver)
+        services.route_publisher.driver_saved(driver, old_keys)
+        flash("Jy is nou beskikbaar as bestuurder!", "success")
+        return redirect(url_for("driver.be_a_driver"))
+
+    return render_template(
+        "be_a_driver.html",
+        user_name=user_name,
+        form=form,
+        driver=driver,
+        show_riders_button=show_riders_button,
+        town_options=town_options,
+        towns_json=TOWNS_JSON
+    )
+
+
+@bp.route("/my_driver_bookings")
+def my_driver_bookings():
+    user_name = session.get("user_name")
+    if not user_name:
+        flash("Jy moet eers aanmeld om jou bestuurder besprekings te sien.", "danger")
+        return redirect(url_for("auth.signup"))
+
+    # Driver booking for the logged-in user
+    driver = services.user_state.get(user_name).driver
+
+    return render_template(
+        "my_driver_bookings.html",
+        driver=driver,  # pass driver directly
+        user_name=user_name
+    )
+
+
+@bp.route("/delete_driver_booking/<int:booking_id>", methods=["POST"])
+@limiter.limit("booking")
+def delete_driver_booking(booking_id):
+    user_name = session.get("user_name")
+    if not user_name:
+        flash("Jy moet eers aanmeld.", "danger")
+        return redirect(url_for("auth.signup"))
+
+    driver = Driver.query.get_or_404(booking_id)
+    if driver.user_name != user_name:
+        flash("Jy kan net jou eie besprekings verwyder.", "danger")
+        return redirect(url_for("driver.my_driver_bookings"))
+
+    old_keys = services.route_publisher.driver_keys(driver)
+    db.session.delete(driver)
+    services.data_changed(db.session, "drivers")
+    db.session.commit()
+    services.user_state.invalidate(user_name)
+    services.route_index.remove_driver(booking_id)
+    services.route_publisher.driver_removed(booking_id, old_keys)
+    flash("Driver booking deleted successfully.", "success")
+    return redirect(url_for("driver.my_driver_bookings"))
+
+
+# --------------------------
+# Routes: Riders Today
+# --------------------------
+@bp.route("/riders_today")
+@response_cache.cached("bookings", vary=session_user)
+def riders_today():
+    pickup = request.args.get("pickup")
+    dropoff = request.args.get("dropoff")
+
+    if not pickup or not dropoff:
+        flash("Geen ritinligting beskikbaar nie.", "warning")
+        return redirect(url_for("driver.be_a_driver"))
+
+    # A driver's pickup/dropoff are comma-joined stop lists; match every pair
+    riders = services.route_index.riders_for_stops(split_stops(pickup), split_stops(dropoff))
+
+    return render_template("riders_today.html", riders=riders, pickup=pickup, dropoff=dropoff)